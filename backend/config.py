@@ -3,16 +3,107 @@
 # Server Configuration
 HOST = "0.0.0.0"
 PORT = 8000
-MAX_WORKERS = 5
+MAX_WORKERS = 5  # size of the upload worker pool
+# "thread" runs uploads on a thread pool; "process" uses a pool of MAX_WORKERS
+# processes, each with its own copy of the models, so uploads scale across cores
+WORKER_MODE = "thread"
 MAX_FILES_PER_REQUEST = 5
 
 # Audio Processing Configuration
 TARGET_SAMPLE_RATE = 22050
 TARGET_DURATION = 30  # seconds
+# Part of each upload that is decoded and analysed: "center" (the middle
+# TARGET_DURATION seconds), "head" (the first TARGET_DURATION seconds) or "full".
+# Windowed modes seek straight to the window, so long uploads cost the same as short ones.
+DECODE_WINDOW = "center"
 NORMALIZE_AUDIO = True
+# Feature backend is read by feature_extraction.py from the FEATURE_BACKEND
+# environment variable at import time: "torch" (default) or "numpy" (torch-free)
+STREAMING_MIN_DURATION = 300  # seconds; with DECODE_WINDOW = "full", longer uploads are analysed in blocks
+STREAMING_BLOCK_SECONDS = 30
+
+# Silence gate: near-silent uploads, live chunks and segment windows skip feature
+# extraction and inference (streamed uploads are gated block by block during their
+# first pass, and skip the second). Audio is quiet when its peak is under SILENCE_PEAK_DB
+# and it is either under SILENCE_RMS_DB or noise-like (flatness above SILENCE_FLATNESS)
+SILENCE_GATE_ENABLED = True
+SILENCE_RMS_DB = -50.0  # dBFS
+SILENCE_PEAK_DB = -30.0  # dBFS
+SILENCE_FLATNESS = 0.5
+SILENCE_DECIMATION = 8
+
+# Segment mode (mode=segment on /upload_audio and /classify_single)
+SEGMENT_WINDOW_SECONDS = 2.0
+SEGMENT_HOP_SECONDS = 1.0
+
+# Live recording: "cascade" runs a streaming onset detector on every buffer and
+# classifies only ONSET_PRE_SECONDS + ONSET_POST_SECONDS around each transient with
+# the gunshot models, plus a wildlife sweep over the last WILDLIFE_SWEEP_SECONDS every
+# WILDLIFE_SWEEP_INTERVAL seconds; "chunks" classifies every 30-second chunk with all models
+LIVE_MODE = "cascade"
+ONSET_THRESHOLD_DB = 12.0  # rise above the running background level
+ONSET_MIN_LEVEL_DB = -40.0  # dBFS, ignores transients in near-silence
+ONSET_PRE_SECONDS = 0.5
+ONSET_POST_SECONDS = 0.5
+ONSET_MIN_INTERVAL = 1.0  # seconds between events
+WILDLIFE_SWEEP_INTERVAL = 30.0  # seconds
+WILDLIFE_SWEEP_SECONDS = 30.0
+
+# Feature Cache Configuration (re-uploaded recordings skip decoding and extraction)
+FEATURE_CACHE_DIR = "feature_cache"
+FEATURE_CACHE_MAX_BYTES = 256 * 1024 * 1024  # on-disk tier
+FEATURE_CACHE_MEMORY_ENTRIES = 512
 
 # Model Configuration
 MODEL_BASE_PATH = "../ml_models"
+# Models load in parallel threads after the server starts accepting connections;
+# /health/live answers at once, /health/ready only once every model is loaded and warmed up
+MODEL_LOAD_WORKERS = None  # None: one thread per model file
+MODEL_MMAP_MODE = "r"  # memory-map large arrays in uncompressed joblib dumps
+# Compile tree ensembles into NumPy node arrays at startup (each is checked against
+# its predict_proba) and use them for batches of up to TREE_ENGINE_MAX_ROWS rows;
+# larger batches are faster in the libraries' native predict_proba
+TREE_ENGINE = True
+TREE_ENGINE_MAX_ROWS = 24
+# Result probabilities (API responses, live broadcasts and the database): only the
+# PROBABILITY_TOP_K most likely classes per model, or None for every class; with
+# PROBABILITY_VECTOR the full distribution is added as base64 float16 (labels in /models/info)
+PROBABILITY_TOP_K = 5
+PROBABILITY_VECTOR = False
+# Each request's models run concurrently on a MODEL_WORKERS-thread pool shared by all
+# requests (0: one after another); models still running MODEL_DEADLINE seconds in come
+# back as timed out, and those not yet started are dropped from the pool
+MODEL_WORKERS = 4
+MODEL_DEADLINE = 2.0
+# Which models score each clip: "all", "cascade" (one model at a time, cheapest first,
+# until one reaches ENSEMBLE_THRESHOLD confidence; ENSEMBLE_ORDER lists models to try
+# first), "gunshot-first" (wildlife models only if no gunshot is confirmed at
+# ENSEMBLE_THRESHOLD) or "wildlife-first" (gunshot models only if no wildlife sound is)
+ENSEMBLE_POLICY = "all"
+ENSEMBLE_THRESHOLD = 0.9
+ENSEMBLE_ORDER = None
+# Latency budget: with a round_calibration.json in the model directory (see round_budget.py),
+# boosted models drop to fewer boosting rounds while the average model time per request or
+# micro-batch is over LATENCY_BUDGET seconds, down to truncations whose top class agreed with
+# the full model on at least ROUND_MIN_AGREEMENT of the held-out rows. None disables it.
+LATENCY_BUDGET = 0.25
+ROUND_MIN_AGREEMENT = 0.97
+# Run the models exported to <group>/onnx (see onnx_models.py) on onnxruntime, with
+# ONNX_INTRA_OP_THREADS threads per run (the model pool already runs models side by side),
+# ONNX_INTER_OP_THREADS for independent nodes and graph optimisation level
+# ONNX_GRAPH_OPTIMIZATION ("disable", "basic", "extended" or "all"). The graphs hold every
+# boosting round, so while LATENCY_BUDGET cuts a model it runs truncated off onnxruntime.
+# Off by default: the graphs have to be exported first (requirements-export.txt)
+ONNX_RUNTIME = False
+ONNX_INTRA_OP_THREADS = 1
+ONNX_INTER_OP_THREADS = 1
+ONNX_GRAPH_OPTIMIZATION = "all"
+# Micro-batching: concurrent uploads (in "thread" worker mode) and live detections queue
+# their feature rows and share one model pass, flushed at BATCH_MAX_ROWS rows or once
+# the oldest row has waited BATCH_MAX_DELAY seconds
+MICRO_BATCHING = True
+BATCH_MAX_ROWS = 32
+BATCH_MAX_DELAY = 0.005
 
 # File Upload Configuration
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Ensemble evaluation policies: which of the loaded models score a clip, in
+what order, and when the rest can be skipped because the clip is already
+decided
+"""
+
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+POLICIES = ('all', 'cascade', 'gunshot-first', 'wildlife-first')
+
+
+def _best(*result_groups: Dict) -> Tuple[Optional[str], float]:
+    """(prediction, confidence) of the most confident model that didn't fail"""
+    best = (None, 0.0)
+    for results in result_groups:
+        for result in results.values():
+            if 'error' not in result and result['confidence'] > best[1]:
+                best = (result['prediction'], result['confidence'])
+    return best
+
+
+class EnsemblePolicy:
+    """
+    Evaluates every model in a single stage. Subclasses split the ensemble
+    into stages (stages) and say when a clip needs no further stage (done);
+    AudioClassifier runs the stages in order and skips the rest once done.
+    """
+    name = 'all'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clips = 0
+        self.evaluations = 0
+        self.skipped = 0
+
+    def stages(self, models: Sequence[Tuple[str, str]], costs: Dict[str, Optional[float]]) -> List[List[str]]:
+        """
+        Model names to evaluate, stage by stage. models lists (group, model
+        name) in load order; costs maps model names to their typical latency
+        in seconds, None if not measured yet.
+        """
+        return [[model_name for _, model_name in models]]
+
+    def done(self, gunshot_results: Dict, wildlife_results: Dict) -> bool:
+        """Whether the results so far decide the clip"""
+        return False
+
+    def record(self, evaluated: int, skipped: int):
+        with self._lock:
+            self.clips += 1
+            self.evaluations += evaluated
+            self.skipped += skipped
+
+    def stats(self):
+        with self._lock:
+            total = self.evaluations + self.skipped
+            return {
+                'policy': self.name,
+                'clips': self.clips,
+                'evaluations': self.evaluations,
+                'skipped': self.skipped,
+                'skipped_fraction': self.skipped / total if total else 0.0
+            }
+
+
+class ConfidenceCascade(EnsemblePolicy):
+    """
+    One model at a time, cheapest first, stopping at the first result with
+    confidence >= threshold. Models named in order go first, in that order;
+    the rest follow by measured latency, unmeasured ones first so each gets
+    timed once.
+    """
+    name = 'cascade'
+
+    def __init__(self, threshold: float = 0.9, order: Optional[Sequence[str]] = None):
+        super().__init__()
+        self.threshold = threshold
+        self.order = list(order or [])
+
+    def stages(self, models, costs):
+        names = [model_name for _, model_name in models]
+        first = [model_name for model_name in self.order if model_name in names]
+        rest = sorted((model_name for model_name in names if model_name not in first),
+                      key=lambda model_name: costs.get(model_name) or 0.0)
+        return [[model_name] for model_name in first + rest]
+
+    def done(self, gunshot_results, wildlife_results):
+        return _best(gunshot_results, wildlife_results)[1] >= self.threshold
+
+
+class GroupFirst(EnsemblePolicy):
+    """
+    One group's models, then the other group's only if the first didn't
+    confirm the clip: its most confident model predicted one of labels
+    (any label when None) with confidence >= threshold
+    """
+    def __init__(self, first: str = 'gunshot', threshold: float = 0.9, labels: Optional[Sequence[str]] = None):
+        super().__init__()
+        self.name = f'{first}-first'
+        self.first = first
+        self.threshold = threshold
+        self.labels = None if labels is None else set(labels)
+
+    def stages(self, models, costs):
+        first = [model_name for group, model_name in models if group == self.first]
+        rest = [model_name for group, model_name in models if group != self.first]
+        return [stage for stage in (first, rest) if stage]
+
+    def done(self, gunshot_results, wildlife_results):
+        prediction, confidence = _best(gunshot_results if self.first == 'gunshot' else wildlife_results)
+        return confidence >= self.threshold and (self.labels is None or prediction in self.labels)
+
+
+def make_policy(name: str = 'all', threshold: float = 0.9, order: Optional[Sequence[str]] = None) -> EnsemblePolicy:
+    """
+    Policy by config name: 'all', 'cascade', 'gunshot-first' (skip the
+    wildlife models once a gunshot is confirmed) or 'wildlife-first' (skip
+    the gunshot models once a wildlife sound is)
+    """
+    if name == 'all':
+        return EnsemblePolicy()
+    if name == 'cascade':
+        return ConfidenceCascade(threshold, order)
+    if name == 'gunshot-first':
+        return GroupFirst('gunshot', threshold, labels=('Gunshot',))
+    if name == 'wildlife-first':
+        return GroupFirst('wildlife', threshold)
+    raise ValueError(f"Unknown ensemble policy {name!r}, expected one of {POLICIES}")
@@ -0,0 +1,181 @@
+"""
+Content-addressed cache of extracted features.
+
+Entries are keyed by a hash of the uploaded audio bytes together with the
+extractor configuration, so a re-uploaded recording skips both decoding and
+feature extraction. A small in-memory LRU tier sits in front of a persistent
+on-disk tier that is evicted, least recently used first, once it grows past
+its byte budget.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from feature_extraction import FEATURE_NAMES, FEATURE_SCHEMA_VERSION, FeatureVector
+
+
+class FeatureCache:
+    """
+    Two-tier (memory + disk) feature cache with hit/miss accounting
+    """
+    def __init__(self, cache_dir="feature_cache", max_bytes=256 * 1024 * 1024, memory_entries=512):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._disk_bytes = sum(size for _, _, size in self._disk_entries())
+
+    @staticmethod
+    def make_key(audio_bytes, **config):
+        """
+        Key for audio_bytes under an extractor configuration (sample rate,
+        duration, backend, ...); the feature schema version is always included
+        """
+        config = dict(config, schema_version=FEATURE_SCHEMA_VERSION)
+        digest = hashlib.sha256(audio_bytes)
+        digest.update(json.dumps(config, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+        Return the cached FeatureVector for key, or None on a miss
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return FeatureVector(self._memory[key])
+
+        vector = self._read_disk(key)
+        with self._lock:
+            if vector is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, vector)
+        return FeatureVector(vector)
+
+    def put(self, key, features):
+        """
+        Store a FeatureVector (or a {name: value} dict) under key
+        """
+        vector = np.array(FeatureVector.from_mapping(features))
+        with self._lock:
+            self._remember(key, vector)
+        self._write_disk(key, vector)
+
+    def stats(self):
+        """
+        Get hit/miss counters per tier and current occupancy
+        """
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                'memory_entries': len(self._memory),
+                'memory_max_entries': self.memory_entries,
+                'disk_bytes': self._disk_bytes,
+                'disk_max_bytes': self.max_bytes,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'memory_hit_ratio': self.memory_hits / total if total else 0.0,
+                'hit_ratio': hits / total if total else 0.0
+            }
+
+    def clear(self):
+        """
+        Drop every entry from both tiers and reset the counters
+        """
+        with self._lock:
+            self._memory.clear()
+            for path, _, _ in self._disk_entries():
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            self._disk_bytes = 0
+            self.memory_hits = 0
+            self.disk_hits = 0
+            self.misses = 0
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def _read_disk(self, key):
+        path = self._path(key)
+        try:
+            vector = np.load(path)
+            # Refresh the access time used for LRU eviction
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return vector if vector.shape == (len(FEATURE_NAMES),) else None
+
+    def _write_disk(self, key, vector):
+        path = self._path(key)
+        if os.path.exists(path):
+            return
+
+        # Write to a temporary file and rename so readers never see a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, vector)
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            return
+
+        with self._lock:
+            self._disk_bytes += os.path.getsize(path)
+            if self._disk_bytes > self.max_bytes:
+                self._evict()
+
+    def _disk_entries(self):
+        """
+        (path, mtime, size) for every entry on disk
+        """
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.npy'):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((entry.path, stat.st_mtime, stat.st_size))
+        return entries
+
+    def _evict(self):
+        """
+        Delete least recently used disk entries until under max_bytes
+        """
+        entries = sorted(self._disk_entries(), key=lambda entry: entry[1])
+        self._disk_bytes = sum(size for _, _, size in entries)
+        for path, _, size in entries:
+            if self._disk_bytes <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            self._disk_bytes -= size
@@ -1,27 +1,1436 @@
-import torch
-import torchaudio
-import torchaudio.transforms as T
-import pandas as pd
 import numpy as np
+import scipy.fft
+import scipy.signal
+import soundfile as sf
 import librosa
-from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+import threading
+import hashlib
+import io
 import os
-from sklearn.preprocessing import StandardScaler, RobustScaler
+import tempfile
 import warnings
 warnings.filterwarnings('ignore')
 
+# Feature backend: 'torch' runs the MFCC/resampling front-end on torchaudio;
+# 'numpy' uses only NumPy/SciPy and soundfile, and never imports torch.
+# The numpy backend matches the torch one to within rtol=1e-3 / atol=1e-4
+# per feature (see test_feature_parity.py).
+FEATURE_BACKEND = os.environ.get('FEATURE_BACKEND', 'torch')
+
+if FEATURE_BACKEND == 'torch':
+    import torch
+    import torchaudio
+    import torchaudio.transforms as T
+else:
+    torch = torchaudio = T = None
+
 # Set device
-device = "cuda" if torch.cuda.is_available() else "cpu"
+device = "cuda" if torch is not None and torch.cuda.is_available() else "cpu"
+
+# Feature layout, in the order the 60-feature models were trained on
+KEY_CHROMA_BINS = [0, 3, 6]
+N_MFCC = 13
+N_DELTA_MFCC = 8
+N_DELTA2_MFCC = 7
+N_CONTRAST_BINS = 6
+
+FEATURE_NAMES = (
+    [f'mfcc_{i}_mean' for i in range(N_MFCC)]
+    + [f'mfcc_{i}_std' for i in range(N_MFCC)]
+    + [f'delta_mfcc_{i}_mean' for i in range(N_DELTA_MFCC)]
+    + [f'delta2_mfcc_{i}_mean' for i in range(N_DELTA2_MFCC)]
+    + [f'chroma_{i}_mean' for i in KEY_CHROMA_BINS]
+    + [f'contrast_{i}_mean' for i in range(N_CONTRAST_BINS)]
+    + [
+        'zcr_mean',
+        'rms_mean',
+        'rms_q75',
+        'spectral_centroid_mean',
+        'spectral_centroid_std',
+        'spectral_bandwidth_mean',
+        'spectral_bandwidth_std',
+        'spectral_flatness_mean',
+        'onset_strength_mean',
+        'onset_strength_max',
+    ]
+)
+# Bump whenever a feature's definition or FEATURE_NAMES changes; cached features are keyed on it
+FEATURE_SCHEMA_VERSION = 1
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURE_NAMES)}
+
+
+class FeaturePlan:
+    """
+    The subset of FEATURE_NAMES that has to be computed, and which spectral
+    intermediates it needs.
+
+    Vectors keep the full FEATURE_NAMES layout; features outside the plan are
+    NaN. Built from ModelLoader.required_features() so only what the loaded
+    models read is extracted.
+    """
+    def __init__(self, names=FEATURE_NAMES):
+        unknown = set(names) - set(FEATURE_NAMES)
+        if unknown:
+            raise ValueError(f"Unknown features in plan: {sorted(unknown)}")
+        names = set(names)
+        self.names = tuple(name for name in FEATURE_NAMES if name in names)
+        self.is_full = len(self.names) == len(FEATURE_NAMES)
+
+        def count(prefix, n):
+            # Coefficient rows needed: up to the highest index the plan reads
+            used = [i for i in range(n) if any(name in names for name in (
+                f'{prefix}_{i}_mean', f'{prefix}_{i}_std'))]
+            return used[-1] + 1 if used else 0
+
+        self.mfcc = any(name.startswith('mfcc_') for name in names)
+        self.n_delta = count('delta_mfcc', N_DELTA_MFCC)
+        self.n_delta2 = count('delta2_mfcc', N_DELTA2_MFCC)
+        self.n_contrast = count('contrast', N_CONTRAST_BINS)
+        self.chroma = any(name.startswith('chroma_') for name in names)
+        self.zcr = 'zcr_mean' in names
+        self.rms = bool(names & {'rms_mean', 'rms_q75'})
+        self.bandwidth = bool(names & {'spectral_bandwidth_mean', 'spectral_bandwidth_std'})
+        # Bandwidth is measured around the centroid
+        self.centroid = self.bandwidth or bool(names & {'spectral_centroid_mean', 'spectral_centroid_std'})
+        self.flatness = 'spectral_flatness_mean' in names
+        self.onset = bool(names & {'onset_strength_mean', 'onset_strength_max'})
+
+        self.mfcc_frontend = self.mfcc or self.n_delta > 0 or self.n_delta2 > 0
+        self.mel = self.n_contrast > 0 or self.onset
+        self.stft = self.mel or self.chroma or self.centroid or self.flatness
+
+        digest = hashlib.sha1(','.join(self.names).encode()).hexdigest()[:12]
+        self.signature = 'full' if self.is_full else digest
+
+    @classmethod
+    def for_features(cls, names):
+        """Plan for the given features; an empty set (no models) falls back to the full vector"""
+        return cls(names) if names else cls()
+
+    def __eq__(self, other):
+        return isinstance(other, FeaturePlan) and self.names == other.names
+
+    def __hash__(self):
+        return hash(self.names)
+
+    def __repr__(self):
+        return f"FeaturePlan({len(self.names)}/{len(FEATURE_NAMES)} features)"
+
+
+FULL_PLAN = FeaturePlan()
+
+
+class FeatureVector(np.ndarray):
+    """
+    One clip's features: a 1-D float32 ndarray in FEATURE_NAMES order with the
+    schema attached. Indexing by feature name and keys()/items() keep it
+    usable wherever the old feature dicts were.
+    """
+    def __new__(cls, values, names=FEATURE_NAMES, schema_version=FEATURE_SCHEMA_VERSION):
+        vector = np.ascontiguousarray(values, dtype=np.float32).reshape(-1).view(cls)
+        if len(vector) != len(names):
+            raise ValueError(f"Expected {len(names)} features, got {len(vector)}")
+        vector.names = tuple(names)
+        vector.schema_version = schema_version
+        return vector
+
+    def __array_finalize__(self, obj):
+        self.names = getattr(obj, 'names', tuple(FEATURE_NAMES))
+        self.schema_version = getattr(obj, 'schema_version', FEATURE_SCHEMA_VERSION)
+
+    def __array_wrap__(self, obj, context=None, return_scalar=False):
+        # Arithmetic results are plain arrays; only the extractor output carries the schema
+        if return_scalar:
+            return obj[()]
+        return obj.view(np.ndarray)
+
+    @classmethod
+    def from_mapping(cls, features, names=FEATURE_NAMES):
+        """
+        Build a vector from a {name: value} mapping, in names order (arrays
+        already in that order are passed through)
+        """
+        if isinstance(features, FeatureVector):
+            return features
+        if isinstance(features, np.ndarray):
+            return cls(features, names)
+        return cls([features[name] for name in names], names)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return np.ndarray.__getitem__(self, self.names.index(key))
+        return np.asarray(self)[key]
+
+    def __bool__(self):
+        return self.size > 0
+
+    def keys(self):
+        return list(self.names)
+
+    def items(self):
+        return list(zip(self.names, np.asarray(self)))
+
+    def get(self, name, default=None):
+        return self[name] if name in self.names else default
+
+    def to_dict(self):
+        return {name: float(value) for name, value in zip(self.names, np.asarray(self))}
+
+    def __reduce__(self):
+        return (FeatureVector, (np.asarray(self), self.names, self.schema_version))
+
+
+def _is_tensor(waveform):
+    return torch is not None and isinstance(waveform, torch.Tensor)
+
+
+def _is_waveform(source):
+    """True for decoded audio (ndarray/tensor) as opposed to a path, bytes or a file object"""
+    return isinstance(source, np.ndarray) or _is_tensor(source)
+
+
+def sniff_audio_format(header):
+    """
+    Identify an audio container from its first bytes: 'wav', 'flac', 'ogg',
+    'aiff', 'mp3', 'm4a', or None if unrecognised
+    """
+    header = bytes(header[:12])
+    if header[:4] in (b'RIFF', b'RF64') and header[8:12] == b'WAVE':
+        return 'wav'
+    if header[:4] == b'fLaC':
+        return 'flac'
+    if header[:4] == b'OggS':
+        return 'ogg'
+    if header[:4] == b'FORM' and header[8:12] in (b'AIFF', b'AIFC'):
+        return 'aiff'
+    if header[:3] == b'ID3' or (len(header) > 1 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0):
+        return 'mp3'
+    if header[4:8] == b'ftyp':
+        return 'm4a'
+    return None
+
+
+# Containers libsndfile decodes straight from memory; anything else goes through librosa/audioread
+SOUNDFILE_FORMATS = {'wav', 'flac', 'ogg', 'aiff'} | ({'mp3'} if 'MP3' in sf.available_formats() else set())
+
+
+def open_audio_source(source):
+    """
+    Normalise a path, bytes-like object or binary file object into something
+    soundfile can open, plus its sniffed format
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            return source, sniff_audio_format(f.read(12))
+
+    position = source.tell()
+    audio_format = sniff_audio_format(source.read(12))
+    source.seek(position)
+    return source, audio_format
+
+
+def decode_audio(source):
+    """
+    Decode a path, bytes-like object or binary file object to a float32
+    (channels, N) array and its sample rate. WAV/FLAC/OGG (and MP3 where
+    libsndfile supports it) decode in memory; other containers fall back to
+    librosa, which needs a file on disk.
+    """
+    source, audio_format = open_audio_source(source)
+    if audio_format in SOUNDFILE_FORMATS or audio_format is None:
+        try:
+            data, sr = sf.read(source, dtype='float32', always_2d=True)
+            return data.T, sr
+        except Exception:
+            if audio_format is not None:
+                raise
+            if not isinstance(source, (str, os.PathLike)):
+                source.seek(0)
+
+    try:
+        if isinstance(source, (str, os.PathLike)):
+            data, sr = librosa.load(source, sr=None, mono=False)
+        else:
+            with tempfile.NamedTemporaryFile(suffix=f".{audio_format or 'audio'}") as temp_file:
+                temp_file.write(source.read())
+                temp_file.flush()
+                data, sr = librosa.load(temp_file.name, sr=None, mono=False)
+    except Exception as e:
+        # audioread's NoBackendError carries no message
+        raise ValueError(f"Could not decode audio ({audio_format or 'unknown format'}): "
+                         f"{str(e) or type(e).__name__}") from e
+    return np.atleast_2d(data).astype(np.float32), sr
+
+
+def _to_numpy(waveform):
+    """Detach a waveform tensor or array-like to a float32 NumPy array"""
+    if _is_tensor(waveform):
+        waveform = waveform.detach().cpu().numpy()
+    return np.asarray(waveform, dtype=np.float32)
+
+
+def _pad_end(waveform, pad_length):
+    """Zero-pad the last axis of a waveform tensor or array"""
+    if _is_tensor(waveform):
+        return torch.nn.functional.pad(waveform, (0, pad_length))
+    return np.pad(waveform, [(0, 0)] * (waveform.ndim - 1) + [(0, pad_length)])
+
+
+def plan_decode(total_frames, sr, target_duration, method='center', max_segments=None):
+    """
+    Frame ranges [(start, stop), ...] of a total_frames-long file to decode so
+    that only target_duration seconds per window are read:
+    'full' (everything), 'center' (centre crop, as handle_duration's crop_pad),
+    'head' (first target_duration seconds) or 'segment' (consecutive full
+    windows, thinned to max_segments evenly spaced ones if given).
+    Files no longer than target_duration are read whole and never padded.
+    """
+    if target_duration is None or method == 'full':
+        return [(0, total_frames)]
+
+    target_length = int(sr * target_duration)
+    if total_frames <= target_length:
+        return [(0, total_frames)]
+
+    if method == 'center':
+        start = (total_frames - target_length) // 2
+        return [(start, start + target_length)]
+    if method == 'head':
+        return [(0, target_length)]
+    if method == 'segment':
+        starts = list(range(0, total_frames - target_length + 1, target_length))
+        if max_segments is not None and len(starts) > max_segments:
+            picks = np.linspace(0, len(starts) - 1, max_segments).round().astype(int)
+            starts = [starts[i] for i in picks]
+        return [(start, start + target_length) for start in starts]
+    raise ValueError(f"Unknown decode method: {method}")
+
+
+def decode_audio_windows(source, target_duration, method='center', max_segments=None):
+    """
+    Decode only the windows plan_decode picks from the file's header: a list
+    of float32 (channels, N) arrays and the sample rate. Seekable containers
+    read just those frame ranges; others are decoded whole and sliced.
+    """
+    source, audio_format = open_audio_source(source)
+    if audio_format in SOUNDFILE_FORMATS or audio_format is None:
+        try:
+            with sf.SoundFile(source) as audio_file:
+                sr = audio_file.samplerate
+                windows = []
+                for start, stop in plan_decode(audio_file.frames, sr, target_duration, method, max_segments):
+                    audio_file.seek(start)
+                    windows.append(audio_file.read(stop - start, dtype='float32', always_2d=True).T)
+                return windows, sr
+        except Exception:
+            if audio_format is not None:
+                raise
+            if not isinstance(source, (str, os.PathLike)):
+                source.seek(0)
+
+    data, sr = decode_audio(source)
+    plan = plan_decode(data.shape[-1], sr, target_duration, method, max_segments)
+    return [data[:, start:stop] for start, stop in plan], sr
+
+
+class TransformCache:
+    """
+    Process-wide, thread-safe LRU cache of prebuilt transforms, filterbanks and
+    window functions, keyed by everything that determines their contents
+    (sample rate, n_fft, n_mels, ...)
+    """
+    def __init__(self, max_size=64):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, factory):
+        """
+        Return the cached object for key, building it with factory() on a miss
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # Build outside the lock; filterbanks and resampling kernels can take a while
+        value = factory()
+
+        with self._lock:
+            value = self._entries.setdefault(key, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return value
+
+    def stats(self):
+        """
+        Get hit/miss counters and current occupancy
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / total if total else 0.0
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+transform_cache = TransformCache()
+
+
+def get_mfcc_transform(sr, n_mfcc=N_MFCC, center=True):
+    """Cached torchaudio MFCC transform (mel filterbank + DCT matrix)"""
+    return transform_cache.get(
+        ('mfcc', sr, n_mfcc, center, device),
+        lambda: T.MFCC(sample_rate=sr, n_mfcc=n_mfcc, melkwargs={'center': center}).to(device)
+    )
+
+
+def get_resampler(orig_sr, target_sr):
+    """Cached torchaudio resampling kernel"""
+    return transform_cache.get(
+        ('resample', orig_sr, target_sr, device),
+        lambda: T.Resample(orig_sr, target_sr).to(device)
+    )
+
+
+def get_resample_filter(orig_sr, target_sr):
+    """Cached polyphase low-pass filter, as designed by scipy.signal.resample_poly"""
+    def build():
+        gcd = np.gcd(orig_sr, target_sr)
+        max_rate = max(orig_sr, target_sr) // gcd
+        return scipy.signal.firwin(2 * 10 * max_rate + 1, 1.0 / max_rate, window=('kaiser', 5.0))
+    return transform_cache.get(('resample_poly', orig_sr, target_sr), build)
+
+
+def get_mfcc_bases(sr, n_mfcc=N_MFCC, n_fft=400, n_mels=128):
+    """
+    Cached NumPy equivalents of torchaudio.transforms.MFCC's window, HTK mel
+    filterbank (n_freqs, n_mels) and orthonormal DCT-II matrix (n_mels, n_mfcc)
+    """
+    def build():
+        window = scipy.signal.get_window('hann', n_fft, fftbins=True).astype(np.float32)
+
+        all_freqs = np.linspace(0, sr // 2, n_fft // 2 + 1)
+        m_pts = np.linspace(0.0, 2595.0 * np.log10(1.0 + (sr / 2) / 700.0), n_mels + 2)
+        f_pts = 700.0 * (10 ** (m_pts / 2595.0) - 1.0)
+        f_diff = f_pts[1:] - f_pts[:-1]
+        slopes = f_pts[None, :] - all_freqs[:, None]
+        down_slopes = -slopes[:, :-2] / f_diff[:-1]
+        up_slopes = slopes[:, 2:] / f_diff[1:]
+        mel_fb = np.maximum(0.0, np.minimum(down_slopes, up_slopes)).astype(np.float32)
+
+        n = np.arange(n_mels)
+        k = np.arange(n_mfcc)[:, None]
+        dct = np.cos(np.pi / n_mels * (n + 0.5) * k)
+        dct[0] *= 1.0 / np.sqrt(2.0)
+        dct *= np.sqrt(2.0 / n_mels)
+        return window, mel_fb, dct.T.astype(np.float32)
+    return transform_cache.get(('mfcc_bases', sr, n_mfcc, n_fft, n_mels), build)
+
+
+def get_window(n_fft):
+    """Cached periodic Hann window, as used by librosa.stft"""
+    return transform_cache.get(
+        ('window', 'hann', n_fft),
+        lambda: librosa.filters.get_window('hann', n_fft, fftbins=True)
+    )
+
+
+def get_mel_basis(sr, n_fft, n_mels):
+    """Cached librosa (Slaney) mel filterbank"""
+    return transform_cache.get(
+        ('mel', sr, n_fft, n_mels),
+        lambda: librosa.filters.mel(sr=sr, n_fft=n_fft, n_mels=n_mels)
+    )
+
+
+def get_chroma_basis(sr, n_fft, tuning, n_chroma=12):
+    """Cached chroma filterbank; tuning is quantised to 0.01 by estimate_tuning"""
+    return transform_cache.get(
+        ('chroma', sr, n_fft, float(tuning), n_chroma),
+        lambda: librosa.filters.chroma(sr=sr, n_fft=n_fft, tuning=tuning, n_chroma=n_chroma)
+    )
+
+
+def get_delta_sum_weights(width, order):
+    """
+    Cached (head, tail) weights, each of length width, such that for any x
+    with at least 2 * width frames
+        librosa.feature.delta(x, width=width, order=order).sum(axis=-1)
+            == x[..., :width] @ head + x[..., -width:] @ tail
+    Savitzky-Golay derivative taps sum to zero, so every frame more than a
+    window away from either end cancels out of the sum.
+    """
+    def build():
+        n = 4 * width
+        weights = librosa.feature.delta(np.eye(n), width=width, order=order, axis=-1).sum(axis=-1)
+        return weights[:width], weights[-width:]
+    return transform_cache.get(('delta_sum', width, order), build)
+
+
+# Summary statistics computed without materialising the per-frame feature matrices
+
+def delta_means_from_edges(head, tail, n_frames, order, width=9):
+    """
+    Mean of librosa.feature.delta over frames, given each clip's first and last
+    width frames (B, C, width) and its frame count (at least 2 * width)
+    """
+    head_weights, tail_weights = get_delta_sum_weights(width, order)
+    total = head @ head_weights + tail @ tail_weights
+    return total / np.asarray(n_frames)[:, None]
+
+
+def delta_means(data, n_frames, order, width=9):
+    """
+    Mean of librosa.feature.delta over the first n_frames frames of each clip in
+    data (B, C, T). Only the frames at either end are read; clips shorter than
+    two windows fall back to computing the delta.
+    """
+    n_frames = np.asarray(n_frames)
+    means = np.empty(data.shape[:2])
+    long = np.flatnonzero(n_frames >= 2 * width)
+    if len(long):
+        tail_index = n_frames[long, None] - width + np.arange(width)
+        tail = data[long[:, None], :, tail_index].transpose(0, 2, 1)
+        means[long] = delta_means_from_edges(data[long, :, :width], tail, n_frames[long], order, width)
+    for i in np.flatnonzero(n_frames < 2 * width):
+        means[i] = librosa.feature.delta(
+            data[i, :, :n_frames[i]], width=width, order=order, axis=-1
+        ).mean(axis=-1)
+    return means
+
+
+# librosa.onset.onset_strength (lag=1, n_fft=2048, hop_length=512, center=True) writes the
+# flux between frames i and i + 1 to frame i + 3 and trims the envelope to the input length
+ONSET_OFFSET = 1 + 2048 // (2 * 512)
+
+
+def onset_strength_stats(mel_db, n_frames, block_frames=1024):
+    """
+    Mean and max of librosa.onset.onset_strength(S=mel_db) over each clip's
+    first n_frames frames, in one pass over blocks of frames so only a
+    (B, n_mels, block_frames) flux temporary is ever allocated
+    """
+    n_frames = np.asarray(n_frames)
+    # Flux values that land inside each clip's trimmed envelope
+    n_flux = np.maximum(0, n_frames - ONSET_OFFSET)
+    total = np.zeros(len(mel_db))
+    # The envelope opens with zero padding, so its max is at least 0
+    peak = np.zeros(len(mel_db))
+    for start in range(0, int(n_flux.max(initial=0)), block_frames):
+        stop = min(start + block_frames, int(n_flux.max()))
+        flux = np.maximum(0.0, mel_db[..., start + 1:stop + 1] - mel_db[..., start:stop]).mean(axis=-2)
+        flux = np.where(start + np.arange(stop - start) < n_flux[:, None], flux, 0.0)
+        total += flux.sum(axis=-1)
+        peak = np.maximum(peak, flux.max(axis=-1))
+    return total / n_frames, peak
+
+
+class SpectralEngine:
+    """
+    Shared spectral front-end for feature extraction.
+
+    The STFT, power/magnitude spectrogram and 128-band mel spectrogram are
+    computed once per clip and every librosa feature is derived from them.
+    MFCCs keep their own torchaudio front-end (n_fft=400, hop=200) because
+    the trained models depend on that resolution.
+
+    Clips are processed as a zero-padded (B, N) batch. Each clip's valid
+    frame count is tracked so padded frames are masked out of every
+    statistic, which keeps batched results equal to single-clip ones.
+
+    A FeaturePlan restricts both passes to the intermediates and features it
+    needs; skipped features are NaN in the summary.
+    """
+    mfcc_n_fft = 400
+    mfcc_hop_length = 200
+    mfcc_n_mels = 128
+    top_db = 80.0
+    amin = 1e-10
+
+    def __init__(self, sr, n_fft=2048, hop_length=512, n_mels=128, n_mfcc=N_MFCC,
+                 backend=FEATURE_BACKEND, plan=None):
+        self.sr = sr
+        self.backend = backend
+        self.plan = plan or FULL_PLAN
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.n_mels = n_mels
+        self.n_mfcc = n_mfcc
+
+    def analyze(self, clips):
+        """
+        Compute the shared intermediates for a list of mono 1-D float32 clips
+        """
+        lengths = np.array([len(y) for y in clips])
+        batch = np.zeros((len(clips), lengths.max()), dtype=np.float32)
+        for i, y in enumerate(clips):
+            batch[i, :len(y)] = y
+
+        plan = self.plan
+        spectra = {
+            'batch': batch,
+            'clips': clips,
+            'lengths': lengths,
+            'mfccs': None,
+            'mfcc_mask': None,
+            'magnitude': None,
+            'power': None,
+            'mel_db': None,
+            # Centred framing gives 1 + N // hop frames, with or without an STFT
+            'frame_mask': self._frame_mask(1 + lengths // self.hop_length, 1 + batch.shape[-1] // self.hop_length),
+        }
+
+        if plan.stft:
+            # librosa pads with zeros when centring, so zero-padding the batch leaves valid frames untouched
+            magnitude = np.abs(librosa.stft(
+                batch, n_fft=self.n_fft, hop_length=self.hop_length, window=get_window(self.n_fft)
+            ))
+            spectra['magnitude'] = magnitude
+            spectra['power'] = magnitude ** 2
+        if plan.mel:
+            mel_basis = get_mel_basis(self.sr, self.n_fft, self.n_mels)
+            mel_spec = np.einsum("...ft,mf->...mt", spectra['power'], mel_basis, optimize=True)
+            spectra['mel_db'] = self._power_to_db(mel_spec, spectra['frame_mask'])
+        if plan.mfcc_frontend:
+            spectra['mfccs'], spectra['mfcc_mask'] = self._mfcc(clips, lengths)
+        return spectra
+
+    def summarize(self, spectra):
+        """
+        Derive the (B, 60) summary feature matrix from the shared intermediates,
+        in FEATURE_NAMES order (NaN for features outside the plan)
+        """
+        sr = self.sr
+        plan = self.plan
+        mfccs = spectra['mfccs']
+        mfcc_mask = spectra['mfcc_mask']
+        magnitude = spectra['magnitude']
+        mel_db = spectra['mel_db']
+        frame_mask = spectra['frame_mask']
+
+        # Equal-length buckets have no padded frames and can skip the NaN-aware reductions
+        if frame_mask.all() and (mfcc_mask is None or mfcc_mask.all()):
+            def masked(x, mask):
+                return x
+            mean, std, percentile = np.mean, np.std, np.percentile
+        else:
+            def masked(x, mask):
+                return np.where(mask[:, None, :], x, np.nan)
+            mean, std, percentile = np.nanmean, np.nanstd, np.nanpercentile
+
+        features = np.full((len(frame_mask), len(FEATURE_NAMES)), np.nan, dtype=np.float32)
+
+        def put(first_name, values):
+            start = FEATURE_INDEX[first_name]
+            features[:, start:start + values.shape[1]] = values
+
+        if plan.mfcc:
+            valid_mfccs = masked(mfccs, mfcc_mask)
+            put('mfcc_0_mean', mean(valid_mfccs, axis=-1))
+            put('mfcc_0_std', std(valid_mfccs, axis=-1))
+        if plan.n_delta:
+            put('delta_mfcc_0_mean', delta_means(mfccs[:, :plan.n_delta], mfcc_mask.sum(axis=1), order=1))
+        if plan.n_delta2:
+            put('delta2_mfcc_0_mean', delta_means(mfccs[:, :plan.n_delta2], mfcc_mask.sum(axis=1), order=2))
+        if plan.chroma:
+            # Chroma is normalised across all 12 bins, so every bin is computed
+            chroma = self._chroma(spectra['power'], frame_mask)
+            put('chroma_0_mean', mean(masked(chroma[:, KEY_CHROMA_BINS], frame_mask), axis=-1))
+        if plan.n_contrast:
+            # All bands are needed: the dB floor is taken across bands
+            contrast = self._spectral_contrast(mel_db, frame_mask)
+            put('contrast_0_mean', mean(masked(contrast[:, :plan.n_contrast], frame_mask), axis=-1))
+        if plan.zcr:
+            # ZCR and RMS are framed in the time domain and never needed an STFT
+            zcr = self._zero_crossing_rate(spectra['clips'], spectra['lengths'])
+            put('zcr_mean', mean(masked(zcr, frame_mask), axis=-1))
+        if plan.rms:
+            rms = masked(librosa.feature.rms(y=spectra['batch']), frame_mask)[:, 0]
+            put('rms_mean', np.stack([mean(rms, axis=-1), percentile(rms, 75, axis=-1)], axis=1))
+        if plan.centroid:
+            spectral_centroid = librosa.feature.spectral_centroid(S=magnitude, sr=sr)
+            if plan.bandwidth:
+                spectral_bandwidth = masked(librosa.feature.spectral_bandwidth(
+                    S=magnitude, sr=sr, centroid=spectral_centroid
+                ), frame_mask)
+                put('spectral_bandwidth_mean', np.concatenate(
+                    [mean(spectral_bandwidth, axis=-1), std(spectral_bandwidth, axis=-1)], axis=1
+                ))
+            spectral_centroid = masked(spectral_centroid, frame_mask)
+            put('spectral_centroid_mean', np.concatenate(
+                [mean(spectral_centroid, axis=-1), std(spectral_centroid, axis=-1)], axis=1
+            ))
+        if plan.flatness:
+            spectral_flatness = librosa.feature.spectral_flatness(S=magnitude)
+            put('spectral_flatness_mean', mean(masked(spectral_flatness, frame_mask), axis=-1))
+        if plan.onset:
+            put('onset_strength_mean', np.stack(onset_strength_stats(mel_db, frame_mask.sum(axis=1)), axis=1))
+
+        if not plan.is_full:
+            # Groups are computed whole; drop the members the plan didn't ask for
+            features[:, ~np.isin(FEATURE_NAMES, plan.names)] = np.nan
+        return features
+
+    @staticmethod
+    def _frame_mask(n_frames, total_frames):
+        return np.arange(total_frames)[None, :] < np.asarray(n_frames)[:, None]
+
+    def _power_to_db(self, S, mask):
+        """
+        librosa.power_to_db with the top_db floor taken per clip over valid frames only
+        """
+        log_spec = self._log_power(S)
+        peak = np.where(mask[:, None, :], log_spec, -np.inf).max(axis=(-2, -1))
+        return np.maximum(log_spec, (peak - self.top_db)[:, None, None])
+
+    def _log_power(self, S):
+        return 10.0 * np.log10(np.maximum(self.amin, S))
+
+    def _mfcc(self, clips, lengths):
+        """
+        torchaudio-compatible MFCCs for every clip in one batched transform
+        """
+        # Reproduce torchaudio's reflect centring per clip so padding never leaks into a frame
+        pad = self.mfcc_n_fft // 2
+        batch = np.zeros((len(clips), lengths.max() + 2 * pad), dtype=np.float32)
+        for i, y in enumerate(clips):
+            batch[i, :len(y) + 2 * pad] = np.pad(y, pad, mode='reflect')
+
+        mel_spec = self._mfcc_mel_power(batch)
+        mask = self._frame_mask(1 + lengths // self.mfcc_hop_length, mel_spec.shape[-1])
+
+        # AmplitudeToDB("power", top_db=80), with the floor taken per clip over valid frames
+        return self._dct(self._power_to_db(mel_spec, mask)), mask
+
+    def _mfcc_mel_power(self, batch):
+        """
+        HTK mel power spectrogram (B, n_mels, T) of pre-centred clips, as computed
+        inside torchaudio.transforms.MFCC
+        """
+        if self.backend == 'torch':
+            mfcc_transform = get_mfcc_transform(self.sr, self.n_mfcc, center=False)
+            with torch.no_grad():
+                mel_spec = mfcc_transform.MelSpectrogram(torch.from_numpy(batch).to(device))
+            return mel_spec.cpu().numpy()
+
+        # NumPy/SciPy port of the same transform
+        window, mel_fb, _ = get_mfcc_bases(self.sr, self.n_mfcc, self.mfcc_n_fft, self.mfcc_n_mels)
+        frames = np.lib.stride_tricks.sliding_window_view(
+            batch, self.mfcc_n_fft, axis=-1
+        )[:, ::self.mfcc_hop_length]
+        power = np.abs(scipy.fft.rfft(frames * window, axis=-1)) ** 2
+        return np.matmul(power, mel_fb).transpose(0, 2, 1)
+
+    def _dct(self, mel_db):
+        """
+        Orthonormal DCT-II over mel bands, keeping the first n_mfcc coefficients
+        """
+        _, _, dct_mat = get_mfcc_bases(self.sr, self.n_mfcc, self.mfcc_n_fft, self.mfcc_n_mels)
+        return np.matmul(mel_db.transpose(0, 2, 1), dct_mat).transpose(0, 2, 1)
+
+    def _chroma(self, power, mask):
+        """
+        chroma_stft on the shared power spectrogram, tuned per clip, with cached filterbanks
+        """
+        pitch, mag = self._piptrack(power)
+        tunings = np.empty(len(power))
+        for i, n in enumerate(mask.sum(axis=1)):
+            # Same reduction as librosa.estimate_tuning, restricted to this clip's frames
+            clip_pitch, clip_mag = pitch[i, :, :n], mag[i, :, :n]
+            pitch_mask = clip_pitch > 0
+            threshold = np.median(clip_mag[pitch_mask]) if pitch_mask.any() else 0.0
+            tunings[i] = librosa.pitch_tuning(
+                clip_pitch[(clip_mag >= threshold) & pitch_mask], resolution=0.01, bins_per_octave=12
+            )
+        return self._tuned_chroma(power, tunings)
+
+    def _piptrack(self, power):
+        return librosa.piptrack(S=power, sr=self.sr, n_fft=self.n_fft)
+
+    def _tuned_chroma(self, power, tunings):
+        """
+        Normalised chroma for each clip in power, given its tuning
+        """
+        raw_chroma = np.empty((len(power), 12, power.shape[-1]), dtype=power.dtype)
+        for tuning in np.unique(tunings):
+            rows = np.flatnonzero(tunings == tuning)
+            chroma_basis = get_chroma_basis(self.sr, self.n_fft, tuning)
+            raw_chroma[rows] = np.einsum("cf,...ft->...ct", chroma_basis, power[rows], optimize=True)
+        return librosa.util.normalize(raw_chroma, norm=np.inf, axis=-2)
+
+    def _spectral_contrast(self, S, mask, fmin=200.0, n_bands=6, quantile=0.02):
+        """
+        librosa.feature.spectral_contrast on the mel dB spectrogram (as the
+        models were trained), with the final dB floor taken per clip
+        """
+        peak, valley = self._contrast_bands(S, fmin, n_bands, quantile)
+        return self._power_to_db(peak, mask) - self._power_to_db(valley, mask)
+
+    def _contrast_bands(self, S, fmin=200.0, n_bands=6, quantile=0.02):
+        """
+        Per-band peak and valley levels, before conversion to dB
+        """
+        freq = librosa.fft_frequencies(sr=self.sr, n_fft=2 * (S.shape[-2] - 1))
+        octa = np.zeros(n_bands + 2)
+        octa[1:] = fmin * (2.0 ** np.arange(0, n_bands + 1))
+
+        shape = list(S.shape)
+        shape[-2] = n_bands + 1
+        valley = np.zeros(shape)
+        peak = np.zeros_like(valley)
+
+        for k, (f_low, f_high) in enumerate(zip(octa[:-1], octa[1:])):
+            current_band = np.logical_and(freq >= f_low, freq <= f_high)
+            idx = np.flatnonzero(current_band)
+            if k > 0:
+                current_band[idx[0] - 1] = True
+            if k == n_bands:
+                current_band[idx[-1] + 1:] = True
+
+            sub_band = S[..., current_band, :]
+            if k < n_bands:
+                sub_band = sub_band[..., :-1, :]
+
+            # Always take at least one bin from each side
+            n_bins = int(np.maximum(np.rint(quantile * np.sum(current_band)), 1))
+            sortedr = np.sort(sub_band, axis=-2)
+            valley[..., k, :] = np.mean(sortedr[..., :n_bins, :], axis=-2)
+            peak[..., k, :] = np.mean(sortedr[..., -n_bins:, :], axis=-2)
+
+        return peak, valley
+
+    @staticmethod
+    def _zero_crossing_rate(clips, lengths, frame_length=2048, hop_length=512):
+        """
+        librosa zero_crossing_rate with each clip edge-padded on its own
+        """
+        pad = frame_length // 2
+        batch = np.zeros((len(clips), lengths.max() + 2 * pad), dtype=np.float32)
+        for i, y in enumerate(clips):
+            batch[i, :len(y) + 2 * pad] = np.pad(y, pad, mode='edge')
+        return librosa.feature.zero_crossing_rate(
+            y=batch, frame_length=frame_length, hop_length=hop_length, center=False
+        )
+
+
+class RunningMoments:
+    """
+    Streaming per-channel count, mean, variance and max. Blocks of frames are
+    merged with Chan's parallel form of Welford's update.
+    """
+    def __init__(self, n_channels):
+        self.count = 0
+        self.mean = np.zeros(n_channels)
+        self.m2 = np.zeros(n_channels)
+        self.max = np.full(n_channels, -np.inf)
+
+    def update(self, block):
+        """
+        Fold in a (n_channels, n_frames) block
+        """
+        n = block.shape[-1]
+        if n == 0:
+            return
+        block = block.astype(np.float64)
+        block_mean = block.mean(axis=-1)
+        block_m2 = ((block - block_mean[:, None]) ** 2).sum(axis=-1)
+
+        total = self.count + n
+        delta = block_mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += block_m2 + delta ** 2 * self.count * n / total
+        self.count = total
+        self.max = np.maximum(self.max, block.max(axis=-1))
+
+    @property
+    def std(self):
+        return np.sqrt(self.m2 / self.count)
+
+
+class QuantileSketch:
+    """
+    Streaming quantiles from a fixed log-spaced histogram. The error is bounded
+    by the bin width: about 0.25% relative with the defaults.
+    """
+    def __init__(self, low=1e-10, high=10.0, bins_per_decade=1000):
+        self.edges = np.logspace(
+            np.log10(low), np.log10(high), int(round(np.log10(high / low) * bins_per_decade)) + 1
+        )
+        # One extra bin on each side for values outside [low, high)
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64)
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        values = np.ravel(values)
+        if not len(values):
+            return
+        bins = np.searchsorted(self.edges, values, side='right')
+        self.counts += np.bincount(bins, minlength=len(self.counts))
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def quantile(self, q):
+        """
+        Estimate np.percentile(values, 100 * q) (linear interpolation)
+        """
+        cumulative = np.cumsum(self.counts)
+        rank = q * (cumulative[-1] - 1)
+        b = int(np.searchsorted(cumulative, rank, side='right'))
+        lower = max(self.edges[b - 1] if b > 0 else self.min, self.min)
+        upper = min(self.edges[b] if b < len(self.edges) else self.max, self.max)
+        before = cumulative[b - 1] if b > 0 else 0
+        fraction = (rank - before + 0.5) / self.counts[b]
+        return lower + (upper - lower) * min(max(fraction, 0.0), 1.0)
+
+
+class FlooredMeanAccumulator:
+    """
+    Per-channel running mean of max(x, floor) where the floor (a dB top_db
+    cut) is only known once the stream ends. Values are binned with exact
+    per-bin sums so the floor can be applied afterwards; only the bin that
+    contains the floor is approximated.
+    """
+    def __init__(self, n_channels, low=-100.0, high=100.0, resolution=0.01):
+        self.low = low
+        self.resolution = resolution
+        self.n_bins = int(round((high - low) / resolution)) + 2
+        self.sums = np.zeros((n_channels, self.n_bins))
+        self.counts = np.zeros((n_channels, self.n_bins), dtype=np.int64)
+        self.max = -np.inf
+
+    def update(self, block):
+        """
+        Fold in a (n_channels, n_frames) block
+        """
+        if not block.shape[-1]:
+            return
+        bins = np.clip(
+            np.floor((block - self.low) / self.resolution).astype(np.int64) + 1, 0, self.n_bins - 1
+        )
+        flat = (bins + np.arange(len(block))[:, None] * self.n_bins).ravel()
+        size = self.sums.size
+        self.counts += np.bincount(flat, minlength=size).reshape(self.counts.shape)
+        self.sums += np.bincount(flat, weights=block.ravel(), minlength=size).reshape(self.sums.shape)
+        self.max = max(self.max, float(block.max()))
+
+    def mean(self, floor):
+        floor_bin = int(np.clip(np.floor((floor - self.low) / self.resolution) + 1, 0, self.n_bins - 1))
+        below = self.counts[:, :floor_bin].sum(axis=1) * floor
+        above = self.sums[:, floor_bin + 1:].sum(axis=1)
+        # The floor's own bin: compare its mean against the floor
+        edge_count = self.counts[:, floor_bin]
+        edge_mean = np.divide(
+            self.sums[:, floor_bin], edge_count, out=np.zeros(len(edge_count)), where=edge_count > 0
+        )
+        edge = np.maximum(edge_mean, floor) * edge_count
+        return (below + above + edge) / self.counts.sum(axis=1)
+
+
+class TuningHistogram:
+    """
+    librosa.estimate_tuning over a stream: a 2-D histogram of piptrack
+    log-magnitude against pitch residual. The median-magnitude threshold is
+    read from the magnitude marginal at the end of the stream.
+    """
+    def __init__(self, resolution=0.01, bins_per_octave=12, mag_resolution=0.005):
+        self.bins_per_octave = bins_per_octave
+        self.residual_edges = np.linspace(-0.5, 0.5, int(np.ceil(1.0 / resolution)) + 1)
+        self.mag_edges = np.concatenate(
+            [[-np.inf], np.arange(-15.0, 10.0 + mag_resolution, mag_resolution), [np.inf]]
+        )
+        self.counts = np.zeros((len(self.mag_edges) - 1, len(self.residual_edges) - 1), dtype=np.int64)
+
+    def update(self, pitch, mag):
+        pitched = pitch > 0
+        if not pitched.any():
+            return
+        residual = np.mod(
+            self.bins_per_octave * librosa.hz_to_octs(pitch[pitched], bins_per_octave=self.bins_per_octave),
+            1.0
+        )
+        residual[residual >= 0.5] -= 1.0
+        log_mag = np.log10(np.maximum(mag[pitched], 1e-30))
+        counts, _, _ = np.histogram2d(log_mag, residual, bins=[self.mag_edges, self.residual_edges])
+        self.counts += counts.astype(np.int64)
+
+    def tuning(self):
+        total = self.counts.sum()
+        if not total:
+            return 0.0
+        cumulative = np.cumsum(self.counts.sum(axis=1))
+        median_bin = int(np.searchsorted(cumulative, (total - 1) / 2.0, side='right'))
+        residual_counts = self.counts[median_bin:].sum(axis=0)
+        return float(self.residual_edges[np.argmax(residual_counts)])
+
+
+class StreamingFeatureExtractor:
+    """
+    Bounded-memory feature extraction for arbitrarily long recordings.
+
+    The file is read in blocks aligned to both hop sizes, with enough overlap
+    that every frame sees exactly the samples (and edge padding) it would in a
+    whole-file analysis. A first pass finds the clip-wide quantities that the
+    features depend on: the dB floors of both mel spectrograms and the chroma
+    tuning. A second pass folds every frame into running statistics, so
+    memory is set by the block size rather than the recording length.
+
+    Results match extract_features_enhanced to within rtol=1e-3 / atol=1e-4;
+    the deviations come from the rms_q75 sketch, the quantised tuning
+    threshold and the contrast floor bin.
+
+    With a SilenceGate, the first pass also measures every block, and a
+    recording the gate judges quiet skips the second pass: extract returns
+    None and gate_result holds the measurements.
+    """
+    # Block boundaries must land on frames of both hop sizes (512 and 200)
+    block_alignment = 12800
+    delta_width = 9
+
+    def __init__(self, backend=FEATURE_BACKEND, block_seconds=30, gate=None, plan=None):
+        self.backend = backend
+        self.block_seconds = block_seconds
+        # Features outside the plan are NaN, as in SpectralEngine.summarize
+        self.plan = plan or FULL_PLAN
+        self.gate = gate
+        self.gate_result = None
+
+    def extract(self, source):
+        """
+        Stream an audio file (path, bytes or binary file object) through the
+        extractor and return its FeatureVector (None when the gate judges it quiet)
+        """
+        source, _ = open_audio_source(source)
+        with sf.SoundFile(source) as audio_file:
+            self.audio_file = audio_file
+            self.n_samples = audio_file.frames
+            self.engine = SpectralEngine(audio_file.samplerate, backend=self.backend, plan=self.plan)
+            engine = self.engine
+            self.n_frames = 1 + self.n_samples // engine.hop_length
+            self.n_mfcc_frames = 1 + self.n_samples // engine.mfcc_hop_length
+            self.block_size = max(
+                1, int(round(self.block_seconds * engine.sr / self.block_alignment))
+            ) * self.block_alignment
+
+            mfcc_peak, mel_peak, tuning = self._calibrate()
+            if self.gate_result is not None and self.gate_result['quiet']:
+                return None
+            return self._accumulate(mfcc_peak, mel_peak, tuning)
+
+    def _blocks(self):
+        for start in range(0, self.n_samples + 1, self.block_size):
+            yield start, start + self.block_size
+
+    def _read(self, start, stop, mode):
+        """
+        Samples [start, stop) of the mono signal, padded outside the file the way
+        the whole-file transforms pad: 'constant' (librosa STFT/RMS), 'reflect'
+        (torchaudio MFCC) or 'edge' (ZCR)
+        """
+        n = self.n_samples
+        index = np.arange(start, stop)
+        if mode == 'reflect':
+            index = np.abs(index)
+            index = np.where(index >= n, 2 * (n - 1) - index, index)
+        inside = (index >= 0) & (index < n)
+        index = np.clip(index, 0, n - 1)
+
+        first, last = int(index.min()), int(index.max()) + 1
+        self.audio_file.seek(first)
+        raw = self.audio_file.read(last - first, dtype='float32', always_2d=True).mean(axis=1)
+        samples = raw[index - first]
+        if mode == 'constant':
+            samples = np.where(inside, samples, 0.0).astype(np.float32)
+        return samples
+
+    def _mfcc_mel(self, first, last):
+        """
+        MFCC-front-end mel power for MFCC frames [first, last)
+        """
+        engine = self.engine
+        hop, pad = engine.mfcc_hop_length, engine.mfcc_n_fft // 2
+        segment = self._read(first * hop - pad, (last - 1) * hop + pad, 'reflect')
+        return engine._mfcc_mel_power(segment[None, :])[0]
+
+    def _lib_power(self, first, last):
+        """
+        librosa power spectrogram (n_fft // 2 + 1, T) and its padded segment for frames [first, last)
+        """
+        engine = self.engine
+        hop, pad = engine.hop_length, engine.n_fft // 2
+        segment = self._read(first * hop - pad, (last - 1) * hop + pad, 'constant')
+        magnitude = np.abs(librosa.stft(
+            segment, n_fft=engine.n_fft, hop_length=hop, window=get_window(engine.n_fft), center=False
+        ))
+        return magnitude, segment
+
+    def _frame_range(self, start, stop, hop, total):
+        return start // hop, min(stop // hop, total)
+
+    def _calibrate(self):
+        """
+        First pass: mel power peaks of both front-ends and the chroma tuning,
+        and the silence gate's verdict on the whole recording. Quantities the
+        plan doesn't need are skipped (and returned as None).
+        """
+        engine = self.engine
+        plan = self.plan
+        mel_basis = get_mel_basis(engine.sr, engine.n_fft, engine.n_mels)
+        mfcc_peak = mel_peak = 0.0
+        tuning_histogram = TuningHistogram()
+        gate_blocks, gate_lengths = [], []
+
+        for start, stop in self._blocks():
+            if self.gate is not None and start < self.n_samples:
+                block = self._read(start, min(stop, self.n_samples), 'constant')
+                gate_blocks.append(self.gate.measure(block))
+                gate_lengths.append(block.shape[-1])
+
+            first, last = self._frame_range(start, stop, engine.mfcc_hop_length, self.n_mfcc_frames)
+            if plan.mfcc_frontend and first < last:
+                mfcc_peak = max(mfcc_peak, float(self._mfcc_mel(first, last).max()))
+
+            first, last = self._frame_range(start, stop, engine.hop_length, self.n_frames)
+            if (plan.mel or plan.chroma) and first < last:
+                magnitude, _ = self._lib_power(first, last)
+                power = magnitude ** 2
+                if plan.mel:
+                    mel_peak = max(mel_peak, float((mel_basis @ power).max()))
+                if plan.chroma:
+                    tuning_histogram.update(*engine._piptrack(power))
+
+        if gate_blocks:
+            self.gate_result = self.gate.check_blocks(gate_blocks, gate_lengths, engine.sr)
+        return (
+            engine._log_power(mfcc_peak) if plan.mfcc_frontend else None,
+            engine._log_power(mel_peak) if plan.mel else None,
+            tuning_histogram.tuning() if plan.chroma else None
+        )
+
+    def _accumulate(self, mfcc_peak, mel_peak, tuning):
+        """
+        Second pass: fold every frame into running statistics, for the groups in the plan
+        """
+        engine = self.engine
+        plan = self.plan
+        sr = engine.sr
+        mel_basis = get_mel_basis(engine.sr, engine.n_fft, engine.n_mels)
+
+        mfcc_stats = RunningMoments(N_MFCC)
+        # Delta means only depend on the MFCC frames at either end of the recording
+        mfcc_head = np.zeros((N_MFCC, 0))
+        mfcc_tail = np.zeros((N_MFCC, 0))
+        chroma_stats = RunningMoments(len(KEY_CHROMA_BINS))
+        frame_stats = RunningMoments(5)  # zcr, rms, centroid, bandwidth, flatness (NaN when skipped)
+        rms_sketch = QuantileSketch()
+        contrast_peak = FlooredMeanAccumulator(N_CONTRAST_BINS + 1)
+        contrast_valley = FlooredMeanAccumulator(N_CONTRAST_BINS + 1)
+        previous_mel_db = None
+        # The onset envelope opens with zero padding, so its max is at least 0
+        onset_sum, onset_max = 0.0, 0.0
+
+        for start, stop in self._blocks():
+            first, last = self._frame_range(start, stop, engine.mfcc_hop_length, self.n_mfcc_frames)
+            if plan.mfcc_frontend and first < last:
+                mel_db = np.maximum(
+                    engine._log_power(self._mfcc_mel(first, last)), mfcc_peak - engine.top_db
+                )
+                mfccs = engine._dct(mel_db[None])[0]
+                mfcc_stats.update(mfccs)
+                if mfcc_head.shape[1] < self.delta_width:
+                    mfcc_head = np.hstack([mfcc_head, mfccs[:, :self.delta_width - mfcc_head.shape[1]]])
+                mfcc_tail = np.hstack([mfcc_tail, mfccs])[:, -self.delta_width:]
+
+            first, last = self._frame_range(start, stop, engine.hop_length, self.n_frames)
+            if first >= last:
+                continue
+            skipped = np.full((1, last - first), np.nan)
+            magnitude = segment = None
+            if plan.stft:
+                magnitude, segment = self._lib_power(first, last)
+                power = magnitude ** 2
+            elif plan.rms:
+                segment = self._read(first * engine.hop_length - engine.n_fft // 2,
+                                     (last - 1) * engine.hop_length + engine.n_fft // 2, 'constant')
+
+            if plan.chroma:
+                chroma = engine._tuned_chroma(power[None], [tuning])[0]
+                chroma_stats.update(chroma[KEY_CHROMA_BINS])
+
+            if plan.mel:
+                mel_db = np.maximum(engine._log_power(mel_basis @ power), mel_peak - engine.top_db)
+            if plan.n_contrast:
+                peak, valley = engine._contrast_bands(mel_db)
+                contrast_peak.update(engine._log_power(peak))
+                contrast_valley.update(engine._log_power(valley))
+
+            if plan.onset:
+                # onset_strength: mean positive mel-dB flux, written lag + n_fft // (2 * hop) = 3
+                # frames after its reference frame and trimmed to n_frames. Only its sum and
+                # max are needed, so each value is kept if it survives the trim.
+                flux_input = mel_db if previous_mel_db is None else np.hstack([previous_mel_db, mel_db])
+                flux = np.maximum(0.0, np.diff(flux_input, axis=-1)).mean(axis=0)
+                flux = flux[:max(0, min(len(flux), self.n_frames - 2 - (last - len(flux))))]
+                onset_sum += flux.sum()
+                onset_max = max(onset_max, float(flux.max())) if len(flux) else onset_max
+                previous_mel_db = mel_db[:, -1:]
+
+            zcr = rms = centroid = bandwidth = flatness = skipped
+            if plan.zcr:
+                zcr_segment = self._read(
+                    first * engine.hop_length - engine.n_fft // 2,
+                    (last - 1) * engine.hop_length + engine.n_fft // 2,
+                    'edge'
+                )
+                zcr = librosa.feature.zero_crossing_rate(y=zcr_segment, center=False)
+            if plan.rms:
+                rms = librosa.feature.rms(y=segment, center=False)
+                rms_sketch.update(rms)
+            if plan.centroid:
+                centroid = librosa.feature.spectral_centroid(S=magnitude, sr=sr)
+                if plan.bandwidth:
+                    bandwidth = librosa.feature.spectral_bandwidth(S=magnitude, sr=sr, centroid=centroid)
+            if plan.flatness:
+                flatness = librosa.feature.spectral_flatness(S=magnitude)
+            frame_stats.update(np.vstack([zcr, rms, centroid, bandwidth, flatness]))
+
+        final_features = dict.fromkeys(FEATURE_NAMES, np.nan)
+        if plan.mfcc:
+            final_features.update({f'mfcc_{i}_mean': mfcc_stats.mean[i] for i in range(N_MFCC)})
+            final_features.update({f'mfcc_{i}_std': mfcc_stats.std[i] for i in range(N_MFCC)})
+        if plan.n_delta or plan.n_delta2:
+            delta_mean, delta2_mean = self._delta_means(mfcc_head, mfcc_tail)
+            final_features.update({
+                f'delta_mfcc_{i}_mean': delta_mean[i] for i in range(N_DELTA_MFCC)
+            })
+            final_features.update({
+                f'delta2_mfcc_{i}_mean': delta2_mean[i] for i in range(N_DELTA2_MFCC)
+            })
+        if plan.chroma:
+            final_features.update({
+                f'chroma_{b}_mean': chroma_stats.mean[i] for i, b in enumerate(KEY_CHROMA_BINS)
+            })
+        if plan.n_contrast:
+            contrast = (
+                contrast_peak.mean(contrast_peak.max - engine.top_db)
+                - contrast_valley.mean(contrast_valley.max - engine.top_db)
+            )
+            final_features.update({
+                f'contrast_{i}_mean': contrast[i] for i in range(N_CONTRAST_BINS)
+            })
+        final_features['zcr_mean'] = frame_stats.mean[0]
+        final_features['rms_mean'] = frame_stats.mean[1]
+        if plan.rms:
+            final_features['rms_q75'] = rms_sketch.quantile(0.75)
+        final_features['spectral_centroid_mean'] = frame_stats.mean[2]
+        final_features['spectral_centroid_std'] = frame_stats.std[2]
+        final_features['spectral_bandwidth_mean'] = frame_stats.mean[3]
+        final_features['spectral_bandwidth_std'] = frame_stats.std[3]
+        final_features['spectral_flatness_mean'] = frame_stats.mean[4]
+        if plan.onset:
+            final_features['onset_strength_mean'] = onset_sum / self.n_frames
+            final_features['onset_strength_max'] = onset_max
+
+        features = FeatureVector.from_mapping(final_features)
+        if not plan.is_full:
+            # Groups are computed whole; drop the members the plan didn't ask for
+            features[~np.isin(FEATURE_NAMES, plan.names)] = np.nan
+        return features
+
+    def _delta_means(self, head, tail):
+        """
+        Order 1 and 2 delta means from the first and last delta_width MFCC frames
+        """
+        n, width = self.n_mfcc_frames, self.delta_width
+        if n < 2 * width:
+            # Head and tail together hold every frame
+            frames = np.hstack([head, tail[:, head.shape[1] - n:]])[None] if n > head.shape[1] else head[None]
+            return delta_means(frames, [n], 1, width)[0], delta_means(frames, [n], 2, width)[0]
+        return tuple(
+            delta_means_from_edges(head[None], tail[None], [n], order, width)[0]
+            for order in (1, 2)
+        )
+
+
+class SilenceGate:
+    """
+    Cheap pre-check that flags near-silent audio before feature extraction and
+    inference. Audio is quiet when its peak stays under peak_db (no transient
+    worth classifying) and it is either under rms_db overall or is broadband
+    noise (spectral flatness above flatness, e.g. wind or mic hiss).
+
+    The measurements come from a signal decimated by block reduction: block
+    maxima give the exact peak, block mean squares the exact RMS, and block
+    means a low-passed copy for flatness, so the gate costs one pass over the
+    samples plus a small FFT.
+    """
+    def __init__(self, rms_db=-50.0, peak_db=-30.0, flatness=0.5, decimation=8, frame_length=256):
+        self.rms_db = rms_db
+        self.peak_db = peak_db
+        self.flatness = flatness
+        self.decimation = decimation
+        self.frame_length = frame_length
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.quiet = 0
+        self.skipped_seconds = 0.0
+
+    def measure(self, waveforms):
+        """
+        RMS and peak level (dBFS), spectral flatness and the quiet decision for
+        a (..., N) array of mono clips, vectorized over the leading axes
+        """
+        y = _to_numpy(waveforms)
+        if y.shape[-1] < self.decimation:
+            y = _pad_end(y, self.decimation - y.shape[-1])
+        n_blocks = y.shape[-1] // self.decimation
+        blocks = y[..., :n_blocks * self.decimation].reshape(*y.shape[:-1], n_blocks, self.decimation)
+
+        peak = np.abs(blocks).max(axis=(-2, -1))
+        rms = np.sqrt(np.mean(blocks.astype(np.float64) ** 2, axis=(-2, -1)))
+        decimated = blocks.mean(axis=-1)
+
+        # Flatness averaged over frames of the decimated signal
+        frame_length = min(self.frame_length, n_blocks)
+        frames = decimated[..., :n_blocks // frame_length * frame_length].reshape(
+            *decimated.shape[:-1], -1, frame_length
+        )
+        power = np.abs(scipy.fft.rfft(frames * get_window(frame_length), axis=-1)) ** 2 + 1e-20
+        flatness = (np.exp(np.mean(np.log(power), axis=-1)) / np.mean(power, axis=-1)).mean(axis=-1)
+
+        return self._decide(rms, peak, flatness)
+
+    def _decide(self, rms, peak, flatness):
+        rms_db = 20.0 * np.log10(np.maximum(rms, 1e-10))
+        peak_db = 20.0 * np.log10(np.maximum(peak, 1e-10))
+        quiet = (peak_db < self.peak_db) & ((rms_db < self.rms_db) | (flatness > self.flatness))
+        return {'rms_db': rms_db, 'peak_db': peak_db, 'flatness': flatness, 'quiet': quiet}
+
+    def check(self, waveform, sr):
+        """
+        Gate one clip ((channels, N) or 1-D; channels are mixed down) and count
+        it in the metrics. Returns the measurements as plain floats/bool.
+        """
+        y = _to_numpy(waveform)
+        if y.ndim > 1:
+            y = y.mean(axis=0)
+        result = {name: value.item() for name, value in self.measure(y).items()}
+        self.record(int(result['quiet']), (y.shape[-1] / sr) if result['quiet'] else 0.0, 1)
+        return result
+
+    def check_blocks(self, measurements, lengths, sr):
+        """
+        Gate one clip that was measured block by block (measure() results for
+        consecutive mono blocks of the given sample lengths) and count it in
+        the metrics. Peak and RMS are exact; flatness is the frame-weighted
+        mean of the blocks'.
+        """
+        lengths = np.asarray(lengths, dtype=np.float64)
+        peak_db = max(float(m['peak_db']) for m in measurements)
+        mean_square = np.array([10.0 ** (float(m['rms_db']) / 10.0) for m in measurements])
+        frames = np.maximum(lengths // self.decimation // self.frame_length, 1)
+        flatness = np.array([float(m['flatness']) for m in measurements])
+        result = self._decide(
+            np.sqrt(np.sum(mean_square * lengths) / lengths.sum()),
+            10.0 ** (peak_db / 20.0),
+            np.sum(flatness * frames) / frames.sum()
+        )
+        result = {name: np.asarray(value).item() for name, value in result.items()}
+        self.record(int(result['quiet']), (lengths.sum() / sr) if result['quiet'] else 0.0, 1)
+        return result
+
+    def record(self, quiet, skipped_seconds, checked):
+        with self._lock:
+            self.checked += checked
+            self.quiet += quiet
+            self.skipped_seconds += skipped_seconds
+
+    def stats(self):
+        """
+        Get counts of gated clips/windows and the audio time that skipped the pipeline
+        """
+        with self._lock:
+            return {
+                'checked': self.checked,
+                'quiet': self.quiet,
+                'quiet_ratio': self.quiet / self.checked if self.checked else 0.0,
+                'skipped_audio_seconds': self.skipped_seconds
+            }
+
 
 class AudioPreprocessor:
     """
     Comprehensive audio preprocessing pipeline with enhanced feature extraction
     """
-    def __init__(self, target_sr=22050, target_duration=30, normalize_audio=True):
+    def __init__(self, target_sr=22050, target_duration=30, normalize_audio=True, backend=None,
+                 decode_window='full', feature_plan=None):
         self.target_sr = target_sr
         self.target_duration = target_duration  # Can be None for variable length
+        # Which target_duration window load_audio decodes: 'full', 'center' or 'head'
+        if decode_window not in ('full', 'center', 'head'):
+            raise ValueError(f"Unknown decode window: {decode_window}")
+        self.decode_window = decode_window
+        # Features left out of the plan are NaN; see ModelLoader.required_features()
+        self.feature_plan = feature_plan or FULL_PLAN
         self.normalize_audio = normalize_audio
         self.feature_scaler = None
+        self.backend = backend or FEATURE_BACKEND
+        if self.backend not in ('torch', 'numpy'):
+            raise ValueError(f"Unknown feature backend: {self.backend}")
+        if self.backend == 'torch' and torch is None:
+            raise ValueError("The torch backend needs FEATURE_BACKEND=torch at import time")
+
+    def load_audio(self, source):
+        """
+        Decode an audio file path, bytes-like object or binary file object to a
+        (channels, N) waveform of this backend's type and its sample rate.
+        Unless decode_window is 'full', only the target_duration window is read.
+        """
+        if self.decode_window == 'full':
+            data, sr = decode_audio(source)
+        else:
+            windows, sr = decode_audio_windows(source, self.target_duration, self.decode_window)
+            data = windows[0]
+        return self._wrap(data), sr
+
+    def load_audio_segments(self, source, max_segments=None):
+        """
+        Decode consecutive target_duration windows of a file (up to max_segments,
+        evenly spaced) as a list of (channels, N) waveforms, and the sample rate
+        """
+        windows, sr = decode_audio_windows(source, self.target_duration, 'segment', max_segments)
+        return [self._wrap(data) for data in windows], sr
+
+    def _wrap(self, data):
+        if self.backend == 'torch':
+            return torch.from_numpy(data)
+        return data
+
+    def _from_numpy(self, audio_np):
+        """
+        Wrap a 1-D NumPy signal as a (1, N) waveform of this backend's type
+        """
+        if self.backend == 'torch':
+            return torch.tensor(audio_np).unsqueeze(0).to(device)
+        return np.asarray(audio_np, dtype=np.float32)[None, :]
         
     def validate_audio(self, waveform, sr, file_path=None):
         """
@@ -36,11 +1445,12 @@ class AudioPreprocessor:
             raise ValueError("Audio too short (< 0.1 seconds)")
             
         # Check for NaN or infinite values
-        if torch.isnan(waveform).any() or torch.isinf(waveform).any():
+        values = _to_numpy(waveform)
+        if not np.isfinite(values).all():
             raise ValueError("Audio contains NaN or infinite values")
             
         # Check for silent audio (very low energy)
-        energy = torch.mean(torch.abs(waveform))
+        energy = np.mean(np.abs(values))
         if energy < 1e-6:
             raise ValueError("Audio appears to be silent")
             
@@ -51,8 +1461,15 @@ class AudioPreprocessor:
         Resample audio to target sample rate
         """
         if original_sr != self.target_sr:
-            resampler = T.Resample(original_sr, self.target_sr).to(device)
-            waveform = resampler(waveform)
+            if self.backend == 'torch':
+                resampler = get_resampler(original_sr, self.target_sr)
+                waveform = resampler(waveform)
+            else:
+                gcd = np.gcd(original_sr, self.target_sr)
+                waveform = scipy.signal.resample_poly(
+                    waveform, self.target_sr // gcd, original_sr // gcd, axis=-1,
+                    window=get_resample_filter(original_sr, self.target_sr)
+                ).astype(np.float32)
         return waveform, self.target_sr
     
     def normalize_audio_amplitude(self, waveform, method='peak'):
@@ -64,18 +1481,18 @@ class AudioPreprocessor:
             
         if method == 'peak':
             # Peak normalization
-            max_val = torch.max(torch.abs(waveform))
+            max_val = abs(waveform).max()
             if max_val > 0:
                 waveform = waveform / max_val
         elif method == 'rms':
             # RMS normalization
-            rms = torch.sqrt(torch.mean(waveform ** 2))
+            rms = (waveform ** 2).mean() ** 0.5
             if rms > 0:
                 waveform = waveform / rms * 0.1  # Scale to reasonable level
         elif method == 'zscore':
             # Z-score normalization
-            mean = torch.mean(waveform)
-            std = torch.std(waveform)
+            mean = waveform.mean()
+            std = waveform.std() if _is_tensor(waveform) else waveform.std(ddof=1)
             if std > 0:
                 waveform = (waveform - mean) / std
                 
@@ -100,7 +1517,7 @@ class AudioPreprocessor:
             elif current_length < target_length:
                 # Pad with zeros
                 pad_length = target_length - current_length
-                waveform = torch.nn.functional.pad(waveform, (0, pad_length))
+                waveform = _pad_end(waveform, pad_length)
                 
         elif method == 'segment':
             # Split long audio into segments
@@ -114,7 +1531,7 @@ class AudioPreprocessor:
             else:
                 # Pad short audio
                 pad_length = target_length - current_length
-                waveform = torch.nn.functional.pad(waveform, (0, pad_length))
+                waveform = _pad_end(waveform, pad_length)
                 
         return waveform
     
@@ -123,170 +1540,164 @@ class AudioPreprocessor:
         Remove silence from beginning and end of audio
         """
         # Convert to numpy for librosa
-        audio_np = waveform.cpu().numpy().flatten()
+        audio_np = _to_numpy(waveform).flatten()
         
         # Trim silence
         trimmed, _ = librosa.effects.trim(audio_np, top_db=-threshold_db)
         
-        # Convert back to tensor
-        return torch.tensor(trimmed).unsqueeze(0).to(device)
+        # Convert back to the backend's waveform type
+        return self._from_numpy(trimmed)
     
     def apply_audio_filters(self, waveform, sr):
         """
         Apply basic audio filters
         """
-        audio_np = waveform.cpu().numpy().flatten()
+        audio_np = _to_numpy(waveform).flatten()
         
         # High-pass filter to remove DC offset and low-frequency noise
         audio_filtered = librosa.effects.preemphasis(audio_np, coef=0.97)
         
-        return torch.tensor(audio_filtered).unsqueeze(0).to(device)
+        return self._from_numpy(audio_filtered)
 
     def extract_features_enhanced(self, file_path_or_waveform, sr=None):
         """
         Enhanced feature extraction that can work with file paths or waveform data
-        Extracts the same features as the enhanced version from your second code
+        Extracts the same features as the enhanced version from your second code,
+        returned as a FeatureVector (None on failure)
         """
         try:
-            # Handle both file paths and direct waveform input
-            if isinstance(file_path_or_waveform, str):
-                # Load from file path
-                waveform, sr = torchaudio.load(file_path_or_waveform)
+            # Handle both encoded audio (path, bytes, file object) and direct waveform input
+            if not _is_waveform(file_path_or_waveform):
+                # Decode from file path or memory
+                waveform, sr = self.load_audio(file_path_or_waveform)
             else:
                 # Use provided waveform and sample rate
                 waveform = file_path_or_waveform
                 if sr is None:
                     raise ValueError("Sample rate must be provided when using waveform input")
             
-            # Move to device for torchaudio transforms
-            waveform_torch = waveform.to(device)
-
             # Convert to mono
-            if waveform_torch.shape[0] > 1:
-                waveform_torch = torch.mean(waveform_torch, dim=0, keepdim=True)
-                
-            # For librosa, we need a NumPy array on the CPU
-            waveform_np = waveform.numpy().flatten()
-
-            # --- Feature Extraction ---
-            features = {}
-
-            # 1. MFCCs (using torchaudio) - Keep only first 13 coefficients
-            mfcc_transform = T.MFCC(
-                sample_rate=sr, 
-                n_mfcc=13  # Reduced from 20, dropping highly correlated higher-order coefficients
-            ).to(device)
-            mfccs = mfcc_transform(waveform_torch).squeeze(0).cpu().numpy()
-            
-            # 2. Delta MFCCs (first-order derivatives)
-            delta_mfccs = librosa.feature.delta(mfccs, order=1)
-            
-            # 3. Delta-Delta MFCCs (second-order derivatives)
-            delta2_mfccs = librosa.feature.delta(mfccs, order=2)
-            
-            # 4. Chroma Features (mean only, dropping std)
-            chroma = librosa.feature.chroma_stft(y=waveform_np, sr=sr)
-            
-            # 5. Spectral Contrast (mean only, dropping std)
-            mel_spec = librosa.feature.melspectrogram(y=waveform_np, sr=sr, n_mels=128)
-            contrast = librosa.feature.spectral_contrast(S=librosa.power_to_db(mel_spec), sr=sr)
-            
-            # 6. Zero Crossing Rate (mean only, dropping std)
-            zcr = librosa.feature.zero_crossing_rate(y=waveform_np)
-            
-            # 7. RMS Energy (for quantiles, dropping std)
-            rms = librosa.feature.rms(y=waveform_np)
-            
-            # 8. Spectral Centroid
-            spectral_centroid = librosa.feature.spectral_centroid(y=waveform_np, sr=sr)
-            
-            # 9. Spectral Bandwidth
-            spectral_bandwidth = librosa.feature.spectral_bandwidth(y=waveform_np, sr=sr)
-            
-            # REMOVED: Spectral Roll-off computation (not needed for 60-feature match)
-            # spectral_rolloff_85 = librosa.feature.spectral_rolloff(y=waveform_np, sr=sr, roll_percent=0.85)
-            
-            # 11. Spectral Flatness
-            spectral_flatness = librosa.feature.spectral_flatness(y=waveform_np)
-            
-            # 12. Onset Strength Envelope
-            onset_strength = librosa.onset.onset_strength(y=waveform_np, sr=sr)
-            
-            # --- Summarize features over time ---
-            final_features = {}
-            
-            # MFCC features (mean and std for first 13 coefficients)
-            final_features.update({
-                f'mfcc_{i}_mean': np.mean(mfccs[i]) for i in range(13)
-            })
-            final_features.update({
-                f'mfcc_{i}_std': np.std(mfccs[i]) for i in range(13)
-            })
-            
-            # Delta MFCC features (mean only, REDUCED to 8 to match 60-feature training)
-            final_features.update({
-                f'delta_mfcc_{i}_mean': np.mean(delta_mfccs[i]) for i in range(8)  # Reduced from 13 to 8
-            })
-            
-            # Delta-Delta MFCC features (mean only, first 7 coefficients only)
-            final_features.update({
-                f'delta2_mfcc_{i}_mean': np.mean(delta2_mfccs[i]) for i in range(7)
-            })
-            
-            # Chroma features (mean only, key bins: 0, 3, 6 for tonal coverage without redundancy)
-            key_chroma_bins = [0, 3, 6]
-            final_features.update({
-                f'chroma_{i}_mean': np.mean(chroma[i]) for i in key_chroma_bins
-            })
-            
-            # Spectral Contrast features (mean only, all 6 bins except highly correlated ones)
-            contrast_bins = list(range(6))  # Use all 6 bins as in the second code
-            final_features.update({
-                f'contrast_{i}_mean': np.mean(contrast[i]) for i in contrast_bins
-            })
-            
-            # Zero Crossing Rate (mean only, dropping std)
-            final_features['zcr_mean'] = np.mean(zcr)
-            
-            # RMS Energy (mean only, dropping std)
-            final_features['rms_mean'] = np.mean(rms)
-            
-            # RMS Energy Quantiles (75% for robust loudness detection)
-            final_features['rms_q75'] = np.percentile(rms, 75)
-            
-            # Spectral Centroid (mean and std)
-            final_features['spectral_centroid_mean'] = np.mean(spectral_centroid)
-            final_features['spectral_centroid_std'] = np.std(spectral_centroid)
-            
-            # Spectral Bandwidth (mean and std)
-            final_features['spectral_bandwidth_mean'] = np.mean(spectral_bandwidth)
-            final_features['spectral_bandwidth_std'] = np.std(spectral_bandwidth)
-            
-            # REMOVED: Spectral Roll-off to match original 60-feature training
-            # final_features['spectral_rolloff_mean'] = np.mean(spectral_rolloff_85)
-            
-            # Spectral Flatness (mean only, dropping std as it's often noise)
-            final_features['spectral_flatness_mean'] = np.mean(spectral_flatness)
-            
-            # Onset Strength (mean and max)
-            final_features['onset_strength_mean'] = np.mean(onset_strength)
-            final_features['onset_strength_max'] = np.max(onset_strength)
-            
-            return final_features
+            waveform_np = _to_numpy(waveform)
+            if waveform_np.ndim > 1:
+                waveform_np = waveform_np.mean(axis=0)
+
+            # Compute the spectral front-end once and derive every feature from it
+            engine = SpectralEngine(sr, backend=self.backend, plan=self.feature_plan)
+            spectra = engine.analyze([waveform_np])
+            return FeatureVector(engine.summarize(spectra)[0])
+
+        except Exception as e:
+            print(f"Error processing audio: {e}")
+            return None
 
+    def extract_features_streaming(self, source, block_seconds=30):
+        """
+        Extract the same features as extract_features_enhanced from an audio file
+        (path, bytes or binary file object) of any length, reading it block_seconds at a time so memory stays bounded.
+        Returns a FeatureVector, or None on failure
+        """
+        try:
+            return StreamingFeatureExtractor(self.backend, block_seconds, plan=self.feature_plan).extract(source)
         except Exception as e:
             print(f"Error processing audio: {e}")
             return None
 
-    def preprocess_audio(self, file_path_or_waveform, sr=None, apply_filters=True, 
+    def extract_features_batch(self, waveforms, sr, max_padding=0.25, max_batch_size=16):
+        """
+        Extract features for many clips at once.
+
+        waveforms is a (B, N) array/tensor or a list of 1-D or (channels, N)
+        clips sharing sample rate sr. Clips are bucketed by length so that no
+        bucket pads more than max_padding of its shortest clip, and each
+        bucket runs through the spectral engine as one batch. Returns a
+        (B, 60) float32 ndarray in get_feature_names() order.
+        """
+        clips = []
+        for waveform in waveforms:
+            waveform = _to_numpy(waveform)
+            if waveform.ndim > 1:
+                waveform = waveform.mean(axis=0)
+            clips.append(waveform)
+
+        features = np.empty((len(clips), len(FEATURE_NAMES)), dtype=np.float32)
+        if not clips:
+            return features
+
+        engine = SpectralEngine(sr, backend=self.backend, plan=self.feature_plan)
+        for bucket in self._length_buckets([len(y) for y in clips], max_padding, max_batch_size):
+            spectra = engine.analyze([clips[i] for i in bucket])
+            features[bucket] = engine.summarize(spectra)
+        return features
+
+    def extract_features_windows(self, source, sr=None, window_seconds=2.0, hop_seconds=1.0, gate=None):
+        """
+        Slide a window_seconds window over a whole recording (path, bytes, file
+        object or waveform) in hop_seconds steps, with a final window aligned to
+        the end so the tail is covered, and extract every window's features in
+        batched passes. Returns (starts, ends, features): window bounds in
+        seconds and a (W, 60) float32 ndarray. With a SilenceGate, quiet
+        windows skip extraction and their rows are NaN.
+        """
+        if not _is_waveform(source):
+            source, sr = decode_audio(source)
+        elif sr is None:
+            raise ValueError("Sample rate must be provided when using waveform input")
+
+        y = _to_numpy(source)
+        if y.ndim > 1:
+            y = y.mean(axis=0)
+
+        window = int(round(window_seconds * sr))
+        hop = max(1, int(round(hop_seconds * sr)))
+        if len(y) <= window:
+            starts = np.array([0])
+            windows = [y]
+        else:
+            starts = np.arange(0, len(y) - window + 1, hop)
+            if starts[-1] + window < len(y):
+                starts = np.append(starts, len(y) - window)
+            # Views into y; the engine copies one batch of windows at a time
+            windows = np.lib.stride_tricks.sliding_window_view(y, window)[starts]
+
+        ends = np.minimum(starts + window, len(y))
+        if gate is None:
+            return starts / sr, ends / sr, self.extract_features_batch(windows, sr)
+
+        quiet = gate.measure(windows)['quiet'] if len(starts) > 1 else gate.measure(y)['quiet'][None]
+        gate.record(int(quiet.sum()), float(quiet.sum() * window / sr), len(quiet))
+        features = np.full((len(starts), len(FEATURE_NAMES)), np.nan, dtype=np.float32)
+        loud = np.flatnonzero(~quiet)
+        if len(loud):
+            features[loud] = self.extract_features_batch([windows[i] for i in loud], sr)
+        return starts / sr, ends / sr, features
+
+    @staticmethod
+    def _length_buckets(lengths, max_padding, max_batch_size):
+        """
+        Group clip indices into buckets of similar length
+        """
+        buckets = []
+        current = []
+        for i in np.argsort(lengths, kind='stable'):
+            if current and (
+                lengths[i] > lengths[current[0]] * (1 + max_padding)
+                or len(current) >= max_batch_size
+            ):
+                buckets.append(current)
+                current = []
+            current.append(i)
+        buckets.append(current)
+        return buckets
+
+    def preprocess_audio(self, file_path_or_waveform, sr=None, apply_filters=True,
                         remove_silence_flag=True, duration_method='crop_pad'):
         """
         Complete preprocessing pipeline
         """
         try:
-            # Handle both file paths and direct waveform input
-            if isinstance(file_path_or_waveform, str):
-                waveform, original_sr = torchaudio.load(file_path_or_waveform)
+            # Handle both encoded audio (path, bytes, file object) and direct waveform input
+            if not _is_waveform(file_path_or_waveform):
+                waveform, original_sr = self.load_audio(file_path_or_waveform)
             else:
                 waveform = file_path_or_waveform
                 original_sr = sr
@@ -294,14 +1705,18 @@ class AudioPreprocessor:
                     raise ValueError("Sample rate must be provided when using waveform input")
             
             # Move to device
-            waveform = waveform.to(device)
+            if self.backend == 'torch':
+                waveform = waveform.to(device)
             
             # Validate audio
             self.validate_audio(waveform, original_sr)
             
             # Convert to mono if needed
             if waveform.shape[0] > 1:
-                waveform = torch.mean(waveform, dim=0, keepdim=True)
+                if _is_tensor(waveform):
+                    waveform = torch.mean(waveform, dim=0, keepdim=True)
+                else:
+                    waveform = waveform.mean(axis=0, keepdims=True)
             
             # Resample if needed
             waveform, sr = self.resample_audio(waveform, original_sr)
@@ -347,47 +1762,9 @@ class AudioPreprocessor:
 
     def get_feature_names(self):
         """
-        Get the names of all features that will be extracted
+        Get the names of all features that will be extracted, in extraction order
         """
-        feature_names = []
-        
-        # MFCC features (mean and std for first 13 coefficients)
-        for i in range(13):
-            feature_names.append(f'mfcc_{i}_mean')
-            feature_names.append(f'mfcc_{i}_std')
-        
-        # Delta MFCC features (mean only, REDUCED from 13 to 8 to match training)
-        for i in range(8):  # Reduced from 13 to 8
-            feature_names.append(f'delta_mfcc_{i}_mean')
-        
-        # Delta-Delta MFCC features (mean only, first 7 coefficients only)
-        for i in range(7):
-            feature_names.append(f'delta2_mfcc_{i}_mean')
-        
-        # Chroma features (key bins: 0, 3, 6)
-        for i in [0, 3, 6]:
-            feature_names.append(f'chroma_{i}_mean')
-        
-        # Spectral Contrast features (all 6 bins)
-        for i in range(6):
-            feature_names.append(f'contrast_{i}_mean')
-        
-        # Other features (REDUCED to match 60-feature training)
-        feature_names.extend([
-            'zcr_mean',
-            'rms_mean',
-            'rms_q75',
-            'spectral_centroid_mean',
-            'spectral_centroid_std',
-            'spectral_bandwidth_mean',
-            'spectral_bandwidth_std',
-            # REMOVED: 'spectral_rolloff_mean' - not in actual extraction
-            'spectral_flatness_mean',
-            'onset_strength_mean',
-            'onset_strength_max'
-        ])
-        
-        return feature_names
+        return list(FEATURE_NAMES)
 
     def get_feature_count(self):
         """
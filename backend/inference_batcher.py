@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Micro-batching in front of AudioClassifier: concurrent callers (upload
+workers, live chunks, cascade events) submit one feature vector each and a
+scheduler thread runs the models on all pending rows at once
+"""
+
+import threading
+import time
+import logging
+from concurrent.futures import Future
+from typing import Dict, Mapping, Optional, Union
+
+import numpy as np
+
+from feature_extraction import FeatureVector
+
+logger = logging.getLogger(__name__)
+
+GROUPS = ('gunshot', 'wildlife')
+
+
+def _bucket(n: int) -> str:
+    """Histogram bucket: the smallest power of two >= n"""
+    return str(1 << max(0, n - 1).bit_length())
+
+
+class MicroBatcher:
+    """
+    Collects feature rows per model group and flushes them through
+    AudioClassifier.classify_batch when max_batch rows are waiting or the
+    oldest has waited max_delay seconds, whichever comes first.
+
+    Each caller gets back the same per-model dicts predict_gunshot and
+    predict_wildlife return, so predict_gunshot / predict_wildlife /
+    classify_audio here are drop-in replacements for the classifier's.
+    """
+    def __init__(self, classifier, max_batch: int = 32, max_delay: float = 0.005):
+        self.classifier = classifier
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+
+        self._pending: Dict[tuple, list] = {}  # groups -> [(row, future, enqueue time)]
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self.batches = 0
+        self.rows = 0
+        self.wait_seconds = 0.0
+        self.max_queue_depth = 0
+        self.batch_sizes: Dict[str, int] = {}
+        self.queue_depths: Dict[str, int] = {}
+
+    def start(self):
+        with self._condition:
+            if self._thread is not None:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the scheduler after flushing whatever is still queued"""
+        with self._condition:
+            if self._thread is None:
+                return
+            self._running = False
+            self._condition.notify()
+        self._thread.join(timeout=5)
+        self._thread = None
+
+    def submit(self, features: Union[FeatureVector, Mapping], groups=GROUPS) -> Future:
+        """
+        Queue one feature vector for the models in groups. The future resolves
+        to (gunshot_results, wildlife_results, skipped_models); a group that
+        wasn't asked for comes back empty. Only requests for both groups go
+        through the ensemble policy, so only they can skip models.
+        """
+        groups = tuple(group for group in GROUPS if group in groups)
+        row = np.asarray(FeatureVector.from_mapping(features), dtype=np.float32)
+        future = Future()
+        with self._condition:
+            if not self._running:
+                # Not started (or stopped): classify on the caller's thread
+                batch = [(row, future, time.monotonic())]
+            else:
+                batch = None
+                queued = self._pending.setdefault(groups, [])
+                queued.append((row, future, time.monotonic()))
+                depth = sum(len(items) for items in self._pending.values())
+                self.max_queue_depth = max(self.max_queue_depth, depth)
+                bucket = _bucket(depth)
+                self.queue_depths[bucket] = self.queue_depths.get(bucket, 0) + 1
+                self._condition.notify()
+        if batch is not None:
+            self._flush(groups, batch)
+        return future
+
+    def predict_gunshot(self, features: Union[FeatureVector, Mapping]) -> Dict:
+        return self.submit(features, ('gunshot',)).result()[0]
+
+    def predict_wildlife(self, features: Union[FeatureVector, Mapping]) -> Dict:
+        return self.submit(features, ('wildlife',)).result()[1]
+
+    def classify_audio(self, features: Union[FeatureVector, Mapping]) -> Dict:
+        try:
+            return self.classifier.combine_predictions(*self.submit(features).result())
+        except Exception as e:
+            logger.error(f"Batched classification failed, classifying directly: {e}")
+            return self.classifier.classify_audio(features)
+
+    def stats(self):
+        with self._condition:
+            return {
+                'batches': self.batches,
+                'rows': self.rows,
+                'mean_batch_size': self.rows / self.batches if self.batches else 0.0,
+                'mean_wait_ms': 1000 * self.wait_seconds / self.rows if self.rows else 0.0,
+                'queue_depth': sum(len(items) for items in self._pending.values()),
+                'max_queue_depth': self.max_queue_depth,
+                'batch_size_histogram': dict(sorted(self.batch_sizes.items(), key=lambda item: int(item[0]))),
+                'queue_depth_histogram': dict(sorted(self.queue_depths.items(), key=lambda item: int(item[0])))
+            }
+
+    def _next_batch(self):
+        """
+        (groups, batch) that is due for a flush, waiting until one is;
+        None once stopped and drained. Called with the condition held.
+        """
+        while True:
+            now = time.monotonic()
+            deadline = None
+            for groups, queued in self._pending.items():
+                due = queued[0][2] + self.max_delay
+                if len(queued) >= self.max_batch or due <= now or not self._running:
+                    batch = queued[:self.max_batch]
+                    del queued[:self.max_batch]
+                    if not queued:
+                        del self._pending[groups]
+                    return groups, batch
+                deadline = due if deadline is None else min(deadline, due)
+            if not self._running:
+                return None
+            self._condition.wait(None if deadline is None else deadline - now)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                next_batch = self._next_batch()
+            if next_batch is None:
+                break
+            self._flush(*next_batch)
+
+    def _flush(self, groups, batch):
+        started = time.monotonic()
+        try:
+            X = np.stack([row for row, _, _ in batch])
+            deadline = getattr(self.classifier, 'deadline', None)
+            if groups == GROUPS:
+                # Whole-ensemble requests go through the classifier's ensemble policy
+                results = self.classifier.classify_rows(X, deadline)
+            else:
+                outputs = self.classifier.classify_batch(X, groups, deadline=deadline)
+                results = [(*self.classifier.row_predictions(outputs, i, groups, deadline), [])
+                           for i in range(len(batch))]
+        except Exception as e:
+            logger.error(f"Error in batched inference: {e}")
+            for _, future, _ in batch:
+                future.set_exception(e)
+        else:
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+
+        with self._condition:
+            self.batches += 1
+            self.rows += len(batch)
+            self.wait_seconds += sum(started - enqueued for _, _, enqueued in batch)
+            bucket = _bucket(len(batch))
+            self.batch_sizes[bucket] = self.batch_sizes.get(bucket, 0) + 1
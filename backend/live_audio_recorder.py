@@ -21,9 +21,12 @@ class LiveAudioRecorder:
                  sample_rate: int = 44100,
                  channels: int = 1,
                  chunk_size: int = 1024,
-                 audio_format=pyaudio.paInt16):
+                 audio_format=pyaudio.paInt16,
+                 save_chunks: bool = False):
         
         self.chunk_duration = chunk_duration
+        # Chunks are handed to the processor in memory; only write WAVs to temp_audio/ if asked
+        self.save_chunks = save_chunks
         self.sample_rate = sample_rate
         self.channels = channels
         self.chunk_size = chunk_size
@@ -41,15 +44,22 @@ class LiveAudioRecorder:
         
         # Callback for processed audio
         self.on_chunk_processed: Optional[Callable] = None
+        # Called with every raw buffer from the audio callback (must not block)
+        self.on_samples: Optional[Callable] = None
         
-        # Audio data storage
+        # Audio data storage; chunks are only collected when a chunk processor is set
         self.current_chunk = []
         self.chunk_start_time = None
+        self.last_buffer = np.zeros(0, dtype=np.int16)
         
     def set_chunk_processor(self, callback: Callable):
         """Set callback function for processing audio chunks"""
         self.on_chunk_processed = callback
     
+    def set_sample_listener(self, callback: Callable):
+        """Set a non-blocking callback that receives every int16 buffer as it is recorded"""
+        self.on_samples = callback
+    
     def start_recording(self):
         """Start live audio recording"""
         if self.is_recording:
@@ -72,12 +82,16 @@ class LiveAudioRecorder:
             self.current_chunk = []
             
             # Start processing thread
-            self.processing_thread = threading.Thread(target=self._process_chunks)
-            self.processing_thread.daemon = True
-            self.processing_thread.start()
+            if self.on_chunk_processed:
+                self.processing_thread = threading.Thread(target=self._process_chunks)
+                self.processing_thread.daemon = True
+                self.processing_thread.start()
             
             self.stream.start_stream()
-            logger.info(f"Started live recording with {self.chunk_duration}s chunks")
+            if self.on_chunk_processed:
+                logger.info(f"Started live recording with {self.chunk_duration}s chunks")
+            else:
+                logger.info("Started live recording (buffers go to the sample listener only)")
             
         except Exception as e:
             logger.error(f"Failed to start recording: {e}")
@@ -100,10 +114,10 @@ class LiveAudioRecorder:
             self._queue_chunk_for_processing()
         
         # Signal processing thread to stop
-        self.processing_queue.put(None)
-        
         if self.processing_thread:
+            self.processing_queue.put(None)
             self.processing_thread.join(timeout=5)
+            self.processing_thread = None
         
         logger.info("Stopped live recording")
     
@@ -114,6 +128,11 @@ class LiveAudioRecorder:
         
         # Convert audio data to numpy array
         audio_data = np.frombuffer(in_data, dtype=np.int16)
+        self.last_buffer = audio_data
+        if self.on_samples:
+            self.on_samples(audio_data)
+        if not self.on_chunk_processed:
+            return (None, pyaudio.paContinue)
         self.current_chunk.extend(audio_data)
         
         # Check if chunk duration is reached
@@ -161,8 +180,8 @@ class LiveAudioRecorder:
                 if chunk_data is None:  # Stop signal
                     break
                 
-                # Save chunk to temporary file
-                temp_filename = self._save_chunk_to_file(chunk_data)
+                # Save chunk to temporary file if requested (None otherwise)
+                temp_filename = self._save_chunk_to_file(chunk_data) if self.save_chunks else None
                 
                 # Process chunk if callback is set
                 if self.on_chunk_processed:
@@ -199,17 +218,20 @@ class LiveAudioRecorder:
         
         return str(filepath)
     
+    @staticmethod
+    def chunk_to_waveform(chunk_data: dict) -> np.ndarray:
+        """Convert a chunk's interleaved int16 samples to a float32 (channels, N) waveform"""
+        samples = chunk_data['audio_data'].astype(np.float32) / 32768.0
+        return samples.reshape(-1, chunk_data['channels']).T
+    
     def get_current_audio_level(self) -> float:
         """Get current audio level for visualization"""
-        if not self.current_chunk:
-            return 0.0
-        
-        # Calculate RMS of recent audio data
-        recent_data = self.current_chunk[-1024:] if len(self.current_chunk) > 1024 else self.current_chunk
-        if not recent_data:
+        # Calculate RMS of the most recent buffer
+        recent_data = self.last_buffer
+        if not len(recent_data):
             return 0.0
         
-        rms = np.sqrt(np.mean(np.array(recent_data, dtype=np.float32) ** 2))
+        rms = np.sqrt(np.mean(recent_data.astype(np.float32) ** 2))
         # Normalize to 0-100 range
         return min(100.0, (rms / 32768.0) * 100.0)
     
@@ -223,8 +245,8 @@ class LiveAudioRecorder:
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
     
-    def process_audio_chunk(filename: str, chunk_data: dict):
-        print(f"Processing chunk: {filename}")
+    def process_audio_chunk(filename: Optional[str], chunk_data: dict):
+        print(f"Processing chunk: {filename or 'in memory'}")
         print(f"Duration: {chunk_data['duration']}s")
         print(f"Sample rate: {chunk_data['sample_rate']}")
         print(f"Data shape: {chunk_data['audio_data'].shape}")
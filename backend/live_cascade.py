@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Two-stage live detection: a cheap streaming onset detector watches every
+incoming sample and only hands short windows around impulsive events to the
+full classifier, while a periodic sweep covers slower wildlife sounds
+"""
+
+import queue
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import numpy as np
+import scipy.signal
+
+logger = logging.getLogger(__name__)
+
+
+class StreamingOnsetDetector:
+    """
+    Energy-flux transient detector that processes audio buffer by buffer.
+
+    Each hop of the pre-emphasised signal is reduced to a log energy and
+    compared with a slowly adapting background level. An onset fires when a
+    hop rises threshold_db above the background and above min_level_db
+    absolute, at most once per min_interval seconds.
+    """
+    def __init__(self, sample_rate: int, hop_seconds: float = 0.005, threshold_db: float = 12.0,
+                 min_level_db: float = -40.0, min_interval: float = 1.0, background_seconds: float = 2.0):
+        self.sample_rate = sample_rate
+        self.hop = max(1, int(round(hop_seconds * sample_rate)))
+        self.threshold_db = threshold_db
+        self.min_level_db = min_level_db
+        self.min_interval = int(round(min_interval * sample_rate))
+
+        # One-pole smoother over hop energies (in dB), carried across buffers
+        self._alpha = self.hop / (background_seconds * sample_rate)
+        self._background_state = None
+        self._last_sample = 0.0
+        self._leftover = np.zeros(0, dtype=np.float32)
+        self._position = 0  # absolute sample index of the first leftover sample
+        self._last_onset = -self.min_interval
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """
+        Feed the next mono float buffer; returns absolute sample indices of onsets in it
+        """
+        samples = np.concatenate([self._leftover, np.asarray(samples, dtype=np.float32)])
+        n_hops = len(samples) // self.hop
+        start = self._position
+        self._leftover = samples[n_hops * self.hop:]
+        self._position += n_hops * self.hop
+        if n_hops == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        # Pre-emphasis keeps low-frequency rumble and wind from masking transients
+        framed = samples[:n_hops * self.hop]
+        emphasised = np.diff(framed, prepend=self._last_sample)
+        self._last_sample = framed[-1]
+        level = 10.0 * np.log10(np.mean(emphasised.reshape(n_hops, self.hop) ** 2, axis=1) + 1e-12)
+
+        if self._background_state is None:
+            self._background_state = np.array([level[0] * (1 - self._alpha)])
+        initial = self._background_state[0] / (1 - self._alpha)
+        background, self._background_state = scipy.signal.lfilter(
+            [self._alpha], [1.0, self._alpha - 1.0], level, zi=self._background_state
+        )
+        # Compare each hop against the background before that hop was folded in
+        previous = np.r_[initial, background[:-1]]
+        candidates = np.flatnonzero((level - previous > self.threshold_db) & (level > self.min_level_db))
+
+        onsets = []
+        for hop_index in candidates:
+            position = start + hop_index * self.hop
+            if position - self._last_onset >= self.min_interval:
+                onsets.append(position)
+                self._last_onset = position
+        return np.array(onsets, dtype=np.int64)
+
+
+class LiveCascade:
+    """
+    Runs the onset detector on a worker thread fed by the recorder and
+    dispatches:
+      - on_event(waveform, sr, info) for each onset, once post_seconds of
+        audio after it have arrived, with pre_seconds + post_seconds of audio
+      - on_sweep(waveform, sr, info) every sweep_interval seconds of audio,
+        with the last sweep_seconds of audio
+    Once started, callbacks run on dispatch_workers threads of their own so
+    that inference never holds up the detector; a window that arrives while
+    max_pending are already waiting or running is dropped and counted.
+    """
+    def __init__(self, sample_rate: int, channels: int = 1,
+                 on_event: Optional[Callable] = None, on_sweep: Optional[Callable] = None,
+                 pre_seconds: float = 0.5, post_seconds: float = 0.5,
+                 sweep_interval: float = 30.0, sweep_seconds: float = 30.0,
+                 dispatch_workers: int = 2, max_pending: int = 8, **detector_kwargs):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.on_event = on_event
+        self.on_sweep = on_sweep
+        self.pre = int(round(pre_seconds * sample_rate))
+        self.post = int(round(post_seconds * sample_rate))
+        self.sweep_interval = int(round(sweep_interval * sample_rate))
+        self.sweep_length = int(round(sweep_seconds * sample_rate))
+        self.detector = StreamingOnsetDetector(sample_rate, **detector_kwargs)
+
+        # Ring buffer of recent audio, long enough for a sweep or an event window
+        self._ring = np.zeros(max(self.sweep_length, self.pre + self.post) + sample_rate, dtype=np.float32)
+        self._total = 0  # samples written so far
+        self._pending = []  # onset sample indices waiting for their post window
+        self._next_sweep = self.sweep_interval
+
+        self._queue = queue.Queue(maxsize=256)
+        self._thread: Optional[threading.Thread] = None
+        self.dispatch_workers = dispatch_workers
+        self.max_pending = max_pending
+        self._dispatcher: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.events = 0
+        self.sweeps = 0
+        self.dropped_buffers = 0
+        self.dropped_windows = 0
+        self.pending_windows = 0
+        self.processed_seconds = 0.0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._dispatcher = ThreadPoolExecutor(max_workers=self.dispatch_workers,
+                                              thread_name_prefix="live-cascade-dispatch")
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+        self._thread = None
+        # Let the windows already handed over finish
+        self._dispatcher.shutdown(wait=True)
+        self._dispatcher = None
+
+    def feed(self, samples: np.ndarray):
+        """
+        Queue a buffer of interleaved int16 (or float) samples; safe to call
+        from the audio callback, never blocks
+        """
+        try:
+            self._queue.put_nowait(samples)
+        except queue.Full:
+            with self._lock:
+                self.dropped_buffers += 1
+
+    def process(self, samples: np.ndarray):
+        """
+        Run the detector on a buffer and dispatch any windows that are complete
+        """
+        samples = np.asarray(samples)
+        if samples.dtype == np.int16:
+            samples = samples.astype(np.float32) / 32768.0
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels).mean(axis=1)
+        samples = samples.astype(np.float32, copy=False)
+
+        self._pending.extend(self.detector.process(samples).tolist())
+        self._write(samples)
+        with self._lock:
+            self.processed_seconds += len(samples) / self.sample_rate
+
+        while self._pending and self._total >= self._pending[0] + self.post:
+            onset = self._pending.pop(0)
+            start = max(0, onset - self.pre, self._total - len(self._ring))
+            with self._lock:
+                self.events += 1
+            self._dispatch(self.on_event, self._read(start, onset + self.post), {
+                'onset_time': time.time() - (self._total - onset) / self.sample_rate,
+                'onset_sample': onset
+            })
+
+        if self._total >= self._next_sweep:
+            self._next_sweep += self.sweep_interval
+            with self._lock:
+                self.sweeps += 1
+            start = max(0, self._total - self.sweep_length)
+            self._dispatch(self.on_sweep, self._read(start, self._total), {'timestamp': time.time()})
+
+    def stats(self):
+        with self._lock:
+            return {
+                'events': self.events,
+                'sweeps': self.sweeps,
+                'dropped_buffers': self.dropped_buffers,
+                'dropped_windows': self.dropped_windows,
+                'pending_windows': self.pending_windows,
+                'processed_seconds': self.processed_seconds,
+                'queued_buffers': self._queue.qsize()
+            }
+
+    def _run(self):
+        while True:
+            samples = self._queue.get()
+            if samples is None:
+                break
+            try:
+                self.process(samples)
+            except Exception as e:
+                logger.error(f"Error in live cascade: {e}")
+
+    def _dispatch(self, callback, waveform, info):
+        """Hand a window to the dispatch threads, or run it inline when the cascade isn't started"""
+        if callback is None:
+            return
+        if self._dispatcher is None:
+            self._call(callback, waveform, info)
+            return
+        with self._lock:
+            if self.pending_windows >= self.max_pending:
+                self.dropped_windows += 1
+                return
+            self.pending_windows += 1
+        self._dispatcher.submit(self._call, callback, waveform, info, True)
+
+    def _call(self, callback, waveform, info, pending=False):
+        try:
+            callback(waveform, self.sample_rate, info)
+        except Exception as e:
+            logger.error(f"Error in live cascade callback: {e}")
+        finally:
+            if pending:
+                with self._lock:
+                    self.pending_windows -= 1
+
+    def _write(self, samples):
+        size = len(self._ring)
+        if len(samples) > size:
+            self._total += len(samples) - size
+            samples = samples[-size:]
+        index = (self._total + np.arange(len(samples))) % size
+        self._ring[index] = samples
+        self._total += len(samples)
+
+    def _read(self, start, stop):
+        """Samples [start, stop) by absolute index; must still be in the ring"""
+        return self._ring[np.arange(start, stop) % len(self._ring)].copy()
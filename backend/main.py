@@ -2,22 +2,35 @@ from fastapi import FastAPI, UploadFile, File, WebSocket, WebSocketDisconnect, H
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import asyncio
-import tempfile
+import io
 import os
 import logging
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import json
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import multiprocessing
 import time
 from datetime import datetime
 from pathlib import Path
+import numpy as np
+import soundfile as sf
 
 # Import our custom modules
 try:
-    from feature_extraction import AudioPreprocessor
+    import config
+    from feature_extraction import (
+        AudioPreprocessor, FEATURE_NAMES, FeaturePlan, FeatureVector, SilenceGate,
+        StreamingFeatureExtractor, transform_cache
+    )
+    from feature_cache import FeatureCache
     from model_manager import ModelLoader, AudioClassifier
+    from ensemble_policy import make_policy
+    from round_budget import RoundBudget
+    from onnx_models import OnnxBackend
+    from inference_batcher import MicroBatcher
     from database_manager import AudioDetectionDB
     from live_audio_recorder import LiveAudioRecorder
+    from live_cascade import LiveCascade
 except ImportError as e:
     print(f"Error importing custom modules: {e}")
     print("Make sure you're running from the backend directory and all files are present.")
@@ -45,7 +58,15 @@ audio_classifier = None
 audio_preprocessor = None
 database = None
 live_recorder = None
-executor = ThreadPoolExecutor(max_workers=5)  # For handling 5 concurrent audio files
+feature_cache = None
+silence_gate = None
+executor = None  # Created at startup by create_executor()
+live_cascade = None  # Set at startup when config.LIVE_MODE == "cascade"
+main_loop = None  # Event loop that live threads broadcast onto
+inference_batcher = None  # Set at startup when config.MICRO_BATCHING is on
+pipeline_task = None  # Background model loading started at startup
+# Model loading progress for /health/ready: starting -> loading -> ready (or failed)
+pipeline_status = {'state': 'starting', 'error': None, 'load_seconds': None, 'warm_up_seconds': None}
 
 # WebSocket connection manager
 class ConnectionManager:
@@ -90,19 +111,174 @@ class ConnectionManager:
 
 manager = ConnectionManager()
 
+def load_pipeline():
+    """Load models, the preprocessor and the feature cache for this process, then warm them up"""
+    global model_loader, audio_classifier, audio_preprocessor, feature_cache, silence_gate
+    
+    start = time.perf_counter()
+    # Publish the loader before loading so /health/ready can report each model's progress
+    model_loader = ModelLoader(
+        model_base_path=config.MODEL_BASE_PATH,
+        compile_trees=config.TREE_ENGINE,
+        max_workers=config.MODEL_LOAD_WORKERS,
+        mmap_mode=config.MODEL_MMAP_MODE,
+        load=False
+    )
+    model_loader.load_all_models()
+    # Truncated boosting rounds under the latency budget need an offline calibration (round_budget.py)
+    budget = None
+    if config.LATENCY_BUDGET and model_loader.round_calibration:
+        budget = RoundBudget.from_calibration(model_loader.round_calibration, config.LATENCY_BUDGET,
+                                              config.ROUND_MIN_AGREEMENT)
+    onnx = None
+    if config.ONNX_RUNTIME:
+        try:
+            onnx = OnnxBackend(config.MODEL_BASE_PATH, intra_op_threads=config.ONNX_INTRA_OP_THREADS,
+                               inter_op_threads=config.ONNX_INTER_OP_THREADS,
+                               optimization=config.ONNX_GRAPH_OPTIMIZATION)
+        except ImportError as e:
+            logger.warning(f"onnxruntime not available, running the models on their libraries: {e}")
+    audio_classifier = AudioClassifier(
+        model_loader, compiled_max_rows=config.TREE_ENGINE_MAX_ROWS,
+        top_k=config.PROBABILITY_TOP_K, probability_vector=config.PROBABILITY_VECTOR,
+        model_workers=config.MODEL_WORKERS, deadline=config.MODEL_DEADLINE,
+        policy=make_policy(config.ENSEMBLE_POLICY, config.ENSEMBLE_THRESHOLD, config.ENSEMBLE_ORDER),
+        budget=budget, onnx=onnx
+    )
+    # Extract only the features the loaded models read
+    feature_plan = FeaturePlan.for_features(model_loader.required_features())
+    logger.info(f"Feature plan: {len(feature_plan.names)} of {len(FEATURE_NAMES)} features")
+    audio_preprocessor = AudioPreprocessor(
+        target_sr=22050, target_duration=config.TARGET_DURATION, decode_window=config.DECODE_WINDOW,
+        feature_plan=feature_plan
+    )
+    feature_cache = FeatureCache(
+        cache_dir=config.FEATURE_CACHE_DIR,
+        max_bytes=config.FEATURE_CACHE_MAX_BYTES,
+        memory_entries=config.FEATURE_CACHE_MEMORY_ENTRIES
+    )
+    if config.SILENCE_GATE_ENABLED:
+        silence_gate = SilenceGate(
+            rms_db=config.SILENCE_RMS_DB,
+            peak_db=config.SILENCE_PEAK_DB,
+            flatness=config.SILENCE_FLATNESS,
+            decimation=config.SILENCE_DECIMATION
+        )
+    pipeline_status['load_seconds'] = time.perf_counter() - start
+    warm_up_pipeline()
+
+def warm_up_pipeline():
+    """
+    Run a second of noise through the silence gate, feature extraction and
+    every model, so FFT plans, filterbanks and inference buffers are built
+    before the first request rather than during it
+    """
+    start = time.perf_counter()
+    sr = audio_preprocessor.target_sr
+    noise = (np.random.default_rng(0).standard_normal(sr) * 0.1).astype(np.float32)
+    if silence_gate is not None:
+        silence_gate.measure(noise)  # measure, unlike check, leaves the gate metrics alone
+    audio_preprocessor.extract_features_enhanced(noise[None, :], sr)
+    audio_classifier.warm_up()
+    pipeline_status['warm_up_seconds'] = time.perf_counter() - start
+    logger.info(f"Pipeline warmed up in {pipeline_status['warm_up_seconds']:.2f}s")
+
+async def load_pipeline_in_background():
+    """
+    Load and warm up the models off the event loop, so the server answers
+    liveness probes during a cold start; requests that need the models get
+    a 503 until this finishes
+    """
+    global inference_batcher
+    pipeline_status['state'] = 'loading'
+    try:
+        loop = asyncio.get_running_loop()
+        jobs = [loop.run_in_executor(None, load_pipeline)]
+        if config.WORKER_MODE == "process":
+            # Uploads run in the workers, so they must have loaded their own pipeline too
+            jobs.append(loop.run_in_executor(None, warm_process_workers, executor, config.MAX_WORKERS))
+        results = await asyncio.gather(*jobs)
+        if config.WORKER_MODE == "process":
+            pipeline_status['workers'] = results[1]
+            logger.info(f"{len(results[1])} upload worker processes warmed up")
+        if config.MICRO_BATCHING:
+            inference_batcher = MicroBatcher(
+                audio_classifier, max_batch=config.BATCH_MAX_ROWS, max_delay=config.BATCH_MAX_DELAY
+            )
+            inference_batcher.start()
+        pipeline_status['state'] = 'ready'
+        logger.info("Models loaded; ready for requests")
+    except Exception as e:
+        pipeline_status.update(state='failed', error=str(e))
+        logger.error(f"Failed to load models: {e}")
+
+def require_ready():
+    """Reject a request that needs the models while they are still loading"""
+    if pipeline_status['state'] != 'ready':
+        raise HTTPException(status_code=503, detail=f"Models are {pipeline_status['state']}, try again shortly")
+
+def inference():
+    """
+    The micro-batcher when it runs in this process, else the classifier itself.
+    Process-pool workers have no batcher: each runs one upload at a time.
+    """
+    return inference_batcher or audio_classifier
+
+def init_process_worker():
+    """Process pool initializer: load the models once per worker, not per upload"""
+    logging.basicConfig(level=logging.INFO)
+    load_pipeline()
+    logger.info(f"Worker {os.getpid()} ready")
+
+def worker_ready(barrier=None) -> int:
+    """
+    Process-pool no-op returning the worker's pid. The initializer loads the
+    pipeline before a worker takes any task, so an answer means it is warm;
+    the barrier holds each worker until all have answered, so every worker
+    gets one.
+    """
+    if barrier is not None:
+        barrier.wait()
+    return os.getpid()
+
+def warm_process_workers(pool: ProcessPoolExecutor, n_workers: int, timeout: float = 600) -> List[int]:
+    """Start every process-pool worker and wait until each has loaded its pipeline; returns their pids"""
+    with multiprocessing.get_context("spawn").Manager() as manager:
+        barrier = manager.Barrier(n_workers, timeout=timeout)
+        futures = [pool.submit(worker_ready, barrier) for _ in range(n_workers)]
+        return sorted(future.result(timeout=timeout) for future in futures)
+
+def create_executor():
+    """
+    Executor for the CPU-bound decode + feature + inference work.
+
+    In "process" mode each worker is a separate interpreter, so uploads run in
+    parallel instead of contending for the GIL. Workers are spawned rather
+    than forked so they never inherit the server's threads or torch state.
+    """
+    if config.WORKER_MODE == "process":
+        logger.info(f"Starting process pool with {config.MAX_WORKERS} workers")
+        if config.MICRO_BATCHING:
+            logger.info("Micro-batching covers live detections only; each worker classifies its uploads directly")
+        return ProcessPoolExecutor(
+            max_workers=config.MAX_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_process_worker
+        )
+    return ThreadPoolExecutor(max_workers=config.MAX_WORKERS)
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize models and database on startup"""
-    global model_loader, audio_classifier, audio_preprocessor, database, live_recorder
+    global database, live_recorder, executor, live_cascade, main_loop, pipeline_task
     
     try:
         logger.info("Initializing system...")
         
-        # Load ML models
-        logger.info("Loading models...")
-        model_loader = ModelLoader()
-        audio_classifier = AudioClassifier(model_loader)
-        audio_preprocessor = AudioPreprocessor(target_sr=22050, target_duration=30)
+        # Load ML models in the background; /health/ready reports when they are usable
+        logger.info("Loading models in the background...")
+        pipeline_task = asyncio.create_task(load_pipeline_in_background())
+        executor = create_executor()
         
         # Initialize database
         logger.info("Initializing database...")
@@ -110,8 +286,12 @@ async def startup_event():
         
         # Initialize live recorder (but don't start recording yet)
         logger.info("Initializing live audio recorder...")
+        main_loop = asyncio.get_running_loop()
         live_recorder = LiveAudioRecorder(chunk_duration=30)
-        live_recorder.set_chunk_processor(process_live_audio_chunk)
+        if config.LIVE_MODE == "cascade":
+            live_cascade = create_live_cascade(live_recorder)
+        else:
+            live_recorder.set_chunk_processor(process_live_audio_chunk)
         
         logger.info("System initialized successfully!")
         
@@ -119,77 +299,296 @@ async def startup_event():
         logger.error(f"Failed to initialize system: {e}")
         raise
 
-def process_live_audio_chunk(filename: str, chunk_data: dict):
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the live cascade, the micro-batcher, the model pool and the worker pool"""
+    if live_cascade is not None:
+        live_cascade.stop()
+    if inference_batcher is not None:
+        inference_batcher.stop()
+    if audio_classifier is not None:
+        audio_classifier.close()
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def broadcast_from_thread(message: dict):
+    """Broadcast from a recorder/cascade thread onto the server's event loop"""
+    if main_loop is not None and manager.active_connections:
+        asyncio.run_coroutine_threadsafe(manager.broadcast(message), main_loop)
+
+def store_live_results(detection_type: str, results: Dict, audio_name: str, timestamp: float) -> List[Dict]:
+    """Add successful live predictions to the database and return them for broadcasting"""
+    stored = []
+    for model_name, result in results.items():
+        if result.get('prediction') != 'Error':
+            detection_id = database.add_detection(
+                detection_type=detection_type,
+                prediction=result['prediction'],
+                confidence=result['confidence'],
+                model_name=model_name,
+                probabilities=result['probabilities'],
+                audio_filename=audio_name,
+                is_live=True
+            )
+            
+            result['detection_id'] = detection_id
+            result['timestamp'] = timestamp
+            stored.append(result)
+    return stored
+
+def remove_chunk_file(filename: Optional[str]):
+    """Delete the WAV the recorder saved for a chunk, if it saved one"""
+    if filename:
+        try:
+            os.unlink(filename)
+        except Exception as e:
+            logger.warning(f"Failed to delete temp file {filename}: {e}")
+
+def process_live_audio_chunk(filename: Optional[str], chunk_data: dict):
     """Process live audio chunks from the recorder"""
     try:
-        logger.info(f"Processing live audio chunk: {filename}")
+        # Chunks arrive in memory; filename is only set when the recorder also saved a WAV
+        chunk_name = filename or f"live_chunk_{int(chunk_data['timestamp'])}.wav"
+        logger.info(f"Processing live audio chunk: {chunk_name}")
+        
+        waveform = LiveAudioRecorder.chunk_to_waveform(chunk_data)
+        if silence_gate is not None:
+            gate = silence_gate.check(waveform, chunk_data['sample_rate'])
+            if gate['quiet']:
+                logger.info(
+                    f"Quiet live chunk {chunk_name} skipped "
+                    f"(rms {gate['rms_db']:.1f} dBFS, peak {gate['peak_db']:.1f} dBFS)"
+                )
+                remove_chunk_file(filename)
+                return
         
         # Extract features
-        features = audio_preprocessor.extract_features_enhanced(filename)
+        features = audio_preprocessor.extract_features_enhanced(waveform, chunk_data['sample_rate'])
         if not features:
             logger.error("Failed to extract features from live audio chunk")
             return
         
-        # Get predictions
-        gunshot_results = audio_classifier.predict_gunshot(features)
-        wildlife_results = audio_classifier.predict_wildlife(features)
+        # Get predictions (one batched pass over both model groups)
+        classification = inference().classify_audio(features)
+        gunshot_results = classification['gunshot_predictions']
+        wildlife_results = classification['wildlife_predictions']
         
         # Process results and add to database
-        all_results = []
-        
-        # Process gunshot results
-        for model_name, result in gunshot_results.items():
-            if result.get('prediction') != 'Error':
-                detection_id = database.add_detection(
-                    detection_type='gunshot',
-                    prediction=result['prediction'],
-                    confidence=result['confidence'],
-                    model_name=model_name,
-                    probabilities=result['probabilities'],
-                    audio_filename=filename,
-                    is_live=True
-                )
-                
-                result['detection_id'] = detection_id
-                result['timestamp'] = chunk_data['timestamp']
-                all_results.append(result)
-        
-        # Process wildlife results
-        for model_name, result in wildlife_results.items():
-            if result.get('prediction') != 'Error':
-                detection_id = database.add_detection(
-                    detection_type='wildlife',
-                    prediction=result['prediction'],
-                    confidence=result['confidence'],
-                    model_name=model_name,
-                    probabilities=result['probabilities'],
-                    audio_filename=filename,
-                    is_live=True
-                )
-                
-                result['detection_id'] = detection_id
-                result['timestamp'] = chunk_data['timestamp']
-                all_results.append(result)
+        all_results = (
+            store_live_results('gunshot', gunshot_results, chunk_name, chunk_data['timestamp']) +
+            store_live_results('wildlife', wildlife_results, chunk_name, chunk_data['timestamp'])
+        )
         
         # Broadcast results to connected clients
-        asyncio.create_task(manager.broadcast({
+        broadcast_from_thread({
             'type': 'live_detection',
             'data': {
                 'chunk_timestamp': chunk_data['timestamp'],
                 'results': all_results,
                 'audio_level': live_recorder.get_current_audio_level() if live_recorder else 0
             }
-        }))
+        })
         
         # Clean up temporary file
-        try:
-            os.unlink(filename)
-        except Exception as e:
-            logger.warning(f"Failed to delete temp file {filename}: {e}")
+        remove_chunk_file(filename)
             
     except Exception as e:
         logger.error(f"Error processing live audio chunk: {e}")
 
+def process_live_event(waveform, sr: int, info: Dict):
+    """Classify the short window around an onset from the live cascade with the gunshot models"""
+    event_name = f"live_event_{info['onset_time']:.3f}.wav"
+    features = audio_preprocessor.extract_features_enhanced(waveform[None, :], sr)
+    if not features:
+        logger.error("Failed to extract features from live event")
+        return
+    
+    results = store_live_results('gunshot', inference().predict_gunshot(features),
+                                 event_name, info['onset_time'])
+    latency = time.time() - info['onset_time']
+    logger.info(f"Live event at {info['onset_time']:.2f} classified {latency:.2f}s after onset")
+    
+    broadcast_from_thread({
+        'type': 'live_detection',
+        'data': {
+            'trigger': 'onset',
+            'chunk_timestamp': info['onset_time'],
+            'latency': latency,
+            'results': results,
+            'audio_level': live_recorder.get_current_audio_level() if live_recorder else 0
+        }
+    })
+
+def process_wildlife_sweep(waveform, sr: int, info: Dict):
+    """Classify the recent audio from the live cascade's periodic sweep with the wildlife models"""
+    if not audio_classifier.model_loader.wildlife_models:
+        return
+    sweep_name = f"live_sweep_{int(info['timestamp'])}.wav"
+    if silence_gate is not None and silence_gate.check(waveform, sr)['quiet']:
+        logger.info(f"Quiet wildlife sweep {sweep_name} skipped")
+        return
+    
+    features = audio_preprocessor.extract_features_enhanced(waveform[None, :], sr)
+    if not features:
+        logger.error("Failed to extract features from wildlife sweep")
+        return
+    
+    results = store_live_results('wildlife', inference().predict_wildlife(features),
+                                 sweep_name, info['timestamp'])
+    broadcast_from_thread({
+        'type': 'live_detection',
+        'data': {
+            'trigger': 'sweep',
+            'chunk_timestamp': info['timestamp'],
+            'results': results,
+            'audio_level': live_recorder.get_current_audio_level() if live_recorder else 0
+        }
+    })
+
+def create_live_cascade(recorder: LiveAudioRecorder) -> LiveCascade:
+    """Onset detector + wildlife sweep fed by every buffer the recorder captures"""
+    cascade = LiveCascade(
+        recorder.sample_rate,
+        channels=recorder.channels,
+        on_event=process_live_event,
+        on_sweep=process_wildlife_sweep,
+        pre_seconds=config.ONSET_PRE_SECONDS,
+        post_seconds=config.ONSET_POST_SECONDS,
+        sweep_interval=config.WILDLIFE_SWEEP_INTERVAL,
+        sweep_seconds=config.WILDLIFE_SWEEP_SECONDS,
+        threshold_db=config.ONSET_THRESHOLD_DB,
+        min_level_db=config.ONSET_MIN_LEVEL_DB,
+        min_interval=config.ONSET_MIN_INTERVAL
+    )
+    recorder.set_sample_listener(cascade.feed)
+    return cascade
+
+def extract_file_features(processor: AudioPreprocessor,
+                          file_content: bytes) -> Tuple[Optional[FeatureVector], Optional[Dict]]:
+    """
+    Extract features from an encoded audio file held in memory. Unless the
+    preprocessor only decodes a target_duration window, long recordings are
+    streamed in blocks instead of decoded whole.
+    Returns (features, gate): when the silence gate judges the decoded audio
+    quiet, features is None and gate holds its measurements.
+    """
+    if processor.decode_window == 'full':
+        try:
+            duration = sf.info(io.BytesIO(file_content)).duration
+        except Exception:
+            # Not a format libsndfile can seek in; decode it whole
+            duration = 0
+
+        if duration > config.STREAMING_MIN_DURATION:
+            logger.info(f"Streaming feature extraction for {duration:.0f}s recording")
+            # The gate measures the blocks during the first pass; quiet recordings skip the second
+            extractor = StreamingFeatureExtractor(
+                processor.backend, block_seconds=config.STREAMING_BLOCK_SECONDS, gate=silence_gate,
+                plan=processor.feature_plan
+            )
+            try:
+                features = extractor.extract(file_content)
+            except Exception as e:
+                logger.error(f"Streaming feature extraction failed: {e}")
+                return None, None
+            if features is None and extractor.gate_result is not None:
+                return None, extractor.gate_result
+            return features, None
+
+    # Only the planned window is read from the file, whatever its length
+    waveform, sr = processor.load_audio(file_content)
+    if silence_gate is not None:
+        gate = silence_gate.check(waveform, sr)
+        if gate['quiet']:
+            return None, gate
+    return processor.extract_features_enhanced(waveform, sr), None
+
+def extract_upload_features(processor: AudioPreprocessor,
+                            file_content: bytes) -> Tuple[Optional[FeatureVector], Optional[Dict]]:
+    """
+    Features for an uploaded file, served from the feature cache when the same
+    bytes were already analysed with the same extractor settings.
+    Returns (features, gate) as extract_file_features does.
+    """
+    cache_key = None
+    if feature_cache is not None:
+        cache_key = FeatureCache.make_key(
+            file_content,
+            target_sr=processor.target_sr,
+            target_duration=processor.target_duration,
+            decode_window=processor.decode_window,
+            backend=processor.backend,
+            feature_plan=processor.feature_plan.signature
+        )
+        features = feature_cache.get(cache_key)
+        if features is not None:
+            return features, None
+
+    # Decode straight from the uploaded bytes; no temporary file
+    features, gate = extract_file_features(processor, file_content)
+    if features is not None and cache_key is not None:
+        feature_cache.put(cache_key, features)
+    return features, gate
+
+def quiet_classification(gate: Dict) -> Dict:
+    """Lightweight classification result for audio the silence gate skipped"""
+    return {
+        'success': True,
+        'gated': True,
+        'gate': gate,
+        'gunshot_predictions': {},
+        'wildlife_predictions': {},
+        'best_result': None,
+        'total_models': 0
+    }
+
+def process_audio_segments(file_content: bytes, filename: str,
+                           window_seconds: Optional[float] = None, hop_seconds: Optional[float] = None) -> Dict:
+    """
+    Classify an audio file window by window and return a detection timeline
+    """
+    try:
+        start_time = time.time()
+        window_seconds = window_seconds or config.SEGMENT_WINDOW_SECONDS
+        hop_seconds = hop_seconds or config.SEGMENT_HOP_SECONDS
+        if window_seconds <= 0 or hop_seconds <= 0:
+            raise ValueError("Window and hop must be positive")
+        
+        if audio_classifier is None:
+            return {
+                'filename': filename,
+                'success': False,
+                'error': 'Audio classifier is not initialized',
+                'processing_time': time.time() - start_time
+            }
+        
+        processor = audio_preprocessor or AudioPreprocessor(target_sr=22050, target_duration=config.TARGET_DURATION)
+        
+        # All windows' features in batched passes, then every model once on the (W, 60) matrix
+        starts, ends, feature_matrix = processor.extract_features_windows(
+            file_content, window_seconds=window_seconds, hop_seconds=hop_seconds, gate=silence_gate
+        )
+        classification_result = audio_classifier.classify_segments(feature_matrix, starts, ends)
+        classification_result['window_seconds'] = window_seconds
+        classification_result['hop_seconds'] = hop_seconds
+        
+        return {
+            'filename': filename,
+            'success': True,
+            'mode': 'segment',
+            'classification': classification_result,
+            'processing_time': time.time() - start_time,
+            'feature_count': feature_matrix.shape[1]
+        }
+        
+    except Exception as e:
+        return {
+            'filename': filename,
+            'success': False,
+            'error': str(e) or type(e).__name__,
+            'processing_time': time.time() - start_time if 'start_time' in locals() else 0
+        }
+
 def process_single_audio(file_content: bytes, filename: str) -> Dict:
     """
     Process a single audio file and return predictions
@@ -197,75 +596,84 @@ def process_single_audio(file_content: bytes, filename: str) -> Dict:
     try:
         start_time = time.time()
         
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp_file:
-            temp_file.write(file_content)
-            temp_file_path = temp_file.name
+        # Reuse the shared preprocessor; its transforms and filterbanks are cached per sample rate
+        processor = audio_preprocessor or AudioPreprocessor(
+            target_sr=22050, 
+            target_duration=config.TARGET_DURATION,  # Use 30 seconds max, but better handling
+            normalize_audio=True,
+            decode_window=config.DECODE_WINDOW
+        )
         
-        # Extract features with better audio handling
-        try:
-            # Use AudioPreprocessor with intelligent duration handling
-            processor = AudioPreprocessor(
-                target_sr=22050, 
-                target_duration=30,  # Use 30 seconds max, but better handling
-                normalize_audio=True
-            )
-            
-            # Extract features with preprocessing
-            features = processor.extract_features_enhanced(temp_file_path)
-            
-            if features is None:
-                return {
-                    'filename': filename,
-                    'success': False,
-                    'error': 'Failed to extract features',
-                    'processing_time': time.time() - start_time
-                }
-            
-            # Ensure audio_classifier is initialized
-            if audio_classifier is None:
-                return {
-                    'filename': filename,
-                    'success': False,
-                    'error': 'Audio classifier is not initialized',
-                    'processing_time': time.time() - start_time
-                }
-
-            # Classify audio
-            classification_result = audio_classifier.classify_audio(features)
-            
-            # Clean up temp file
-            os.unlink(temp_file_path)
-            
-            processing_time = time.time() - start_time
-            
+        # Extract features with better audio handling (or reuse them for a repeated upload)
+        features, gate = extract_upload_features(processor, file_content)
+        
+        if gate is not None:
+            # Near-silent: skip feature extraction and every model
             return {
                 'filename': filename,
                 'success': True,
-                'classification': classification_result,
-                'processing_time': processing_time,
-                'feature_count': len(features)
+                'quiet': True,
+                'classification': quiet_classification(gate),
+                'processing_time': time.time() - start_time,
+                'feature_count': 0
             }
-            
-        except Exception as e:
-            # Clean up temp file on error
-            if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
-            raise e
+        
+        if features is None:
+            return {
+                'filename': filename,
+                'success': False,
+                'error': 'Failed to extract features',
+                'processing_time': time.time() - start_time
+            }
+        
+        # Ensure audio_classifier is initialized
+        if audio_classifier is None:
+            return {
+                'filename': filename,
+                'success': False,
+                'error': 'Audio classifier is not initialized',
+                'processing_time': time.time() - start_time
+            }
+
+        # Classify audio, batched with any other uploads and live detections in flight
+        classification_result = inference().classify_audio(features)
+        
+        processing_time = time.time() - start_time
+        
+        return {
+            'filename': filename,
+            'success': True,
+            'classification': classification_result,
+            'processing_time': processing_time,
+            'feature_count': len(features)
+        }
             
     except Exception as e:
         return {
             'filename': filename,
             'success': False,
-            'error': str(e),
+            'error': str(e) or type(e).__name__,
             'processing_time': time.time() - start_time if 'start_time' in locals() else 0
         }
 
+def audio_job(mode: str, content: bytes, filename: str,
+              window_seconds: Optional[float], hop_seconds: Optional[float]) -> tuple:
+    """Executor function and arguments for processing one upload in the given mode"""
+    if mode == "segment":
+        return process_audio_segments, content, filename, window_seconds, hop_seconds
+    return process_single_audio, content, filename
+
 @app.post("/upload_audio")
-async def upload_audio_files(files: List[UploadFile] = File(...)):
+async def upload_audio_files(files: List[UploadFile] = File(...), mode: str = "file",
+                             window_seconds: Optional[float] = None, hop_seconds: Optional[float] = None):
     """
-    Upload and process up to 5 audio files simultaneously
+    Upload and process up to 5 audio files simultaneously.
+    mode="segment" classifies each file in sliding windows and returns a detection timeline.
     """
+    if mode not in ("file", "segment"):
+        raise HTTPException(status_code=400, detail="mode must be 'file' or 'segment'")
+    require_ready()
+    
     if len(files) > 5:
         raise HTTPException(status_code=400, detail="Maximum 5 files allowed")
     
@@ -295,9 +703,7 @@ async def upload_audio_files(files: List[UploadFile] = File(...)):
         tasks = [
             loop.run_in_executor(
                 executor, 
-                process_single_audio, 
-                content, 
-                filename
+                *audio_job(mode, content, filename, window_seconds, hop_seconds)
             ) 
             for content, filename in file_data
         ]
@@ -368,16 +774,52 @@ async def websocket_endpoint(websocket: WebSocket):
         manager.disconnect(websocket)
         logger.info("WebSocket client disconnected")
 
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness probe: the server process is up and serving requests"""
+    return {'status': 'alive', 'timestamp': time.time()}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """
+    Readiness probe: 200 once every model is loaded and warmed up, 503 before
+    that (or if loading failed), with each model's load status
+    """
+    ready = pipeline_status['state'] == 'ready'
+    return JSONResponse(status_code=200 if ready else 503, content={
+        'ready': ready,
+        **pipeline_status,
+        'models': model_loader.load_report() if model_loader else {},
+        'timestamp': time.time()
+    })
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
+    # In process mode uploads are extracted in the workers, whose cache and gate counters this process can't see
+    worker_stats = config.WORKER_MODE == "process"
     return {
         'status': 'healthy',
+        'pipeline': pipeline_status['state'],
         'models_loaded': {
             'gunshot_models': len(model_loader.gunshot_models) if model_loader else 0,
             'wildlife_models': len(model_loader.wildlife_models) if model_loader else 0,
-            'scalers': len(model_loader.scalers) if model_loader else 0
+            'scalers': len(model_loader.scaler_params) if model_loader else 0,
+            'compiled': list(model_loader.compiled_models) if model_loader else []
         },
+        'feature_plan': len(audio_preprocessor.feature_plan.names) if audio_preprocessor else None,
+        'transform_cache': transform_cache.stats(),
+        'feature_cache': 'unavailable in process mode' if worker_stats else (
+            feature_cache.stats() if feature_cache else None),
+        'silence_gate': 'unavailable in process mode' if worker_stats else (
+            silence_gate.stats() if silence_gate else None),
+        'live_cascade': live_cascade.stats() if live_cascade else None,
+        'micro_batching': inference_batcher.stats() if inference_batcher else None,
+        'model_latency': audio_classifier.latency_stats() if audio_classifier else None,
+        'ensemble_policy': audio_classifier.policy.stats() if audio_classifier else None,
+        'round_budget': audio_classifier.budget.stats() if audio_classifier and audio_classifier.budget else None,
+        'workers': {'mode': config.WORKER_MODE, 'max_workers': config.MAX_WORKERS,
+                    'pids': pipeline_status.get('workers')},
         'timestamp': time.time()
     }
 
@@ -390,24 +832,35 @@ async def get_models_info():
     return {
         'gunshot_models': list(model_loader.gunshot_models.keys()),
         'wildlife_models': list(model_loader.wildlife_models.keys()),
-        'scalers': list(model_loader.scalers.keys()),
+        'scalers': list(model_loader.scaler_params.keys()),
+        # Class labels per model, in the order of each result's probability_vector
+        'labels': audio_classifier.model_labels() if audio_classifier else {},
+        # Models served by onnxruntime rather than their own library
+        'onnx_models': list(audio_classifier.onnx.models) if audio_classifier and audio_classifier.onnx else [],
         'total_models': len(model_loader.gunshot_models) + len(model_loader.wildlife_models)
     }
 
 @app.post("/classify_single")
-async def classify_single_audio(file: UploadFile = File(...)):
+async def classify_single_audio(file: UploadFile = File(...), mode: str = "file",
+                                window_seconds: Optional[float] = None, hop_seconds: Optional[float] = None):
     """
-    Classify a single audio file
+    Classify a single audio file.
+    mode="segment" classifies it in sliding windows and returns a detection timeline.
     """
+    if mode not in ("file", "segment"):
+        raise HTTPException(status_code=400, detail="mode must be 'file' or 'segment'")
+    require_ready()
+    
     try:
         content = await file.read()
         
         loop = asyncio.get_event_loop()
         result = await loop.run_in_executor(
             executor, 
-            process_single_audio, 
-            content, 
-            file.filename if file.filename is not None else "uploaded_audio.wav"
+            *audio_job(
+                mode, content, file.filename if file.filename is not None else "uploaded_audio.wav",
+                window_seconds, hop_seconds
+            )
         )
         
         return result
@@ -425,11 +878,14 @@ async def start_live_recording():
     
     if not live_recorder:
         raise HTTPException(status_code=500, detail="Live recorder not initialized")
+    require_ready()
     
     if live_recorder.is_recording:
         return {"status": "already_recording", "message": "Live recording already in progress"}
     
     try:
+        if live_cascade is not None:
+            live_cascade.start()
         live_recorder.start_recording()
         manager.recording_status = True
         
@@ -463,6 +919,8 @@ async def stop_live_recording():
     
     try:
         live_recorder.stop_recording()
+        if live_cascade is not None:
+            live_cascade.stop()
         manager.recording_status = False
         
         # Broadcast status to connected clients
@@ -491,7 +949,9 @@ async def get_recording_status():
     return {
         "is_recording": live_recorder.is_recording,
         "current_audio_level": live_recorder.get_current_audio_level() if live_recorder.is_recording else 0,
-        "connected_clients": len(manager.active_connections)
+        "connected_clients": len(manager.active_connections),
+        "live_mode": config.LIVE_MODE,
+        "cascade": live_cascade.stats() if live_cascade else None
     }
 
 @app.get("/detections/recent")
@@ -533,6 +993,25 @@ async def get_animal_counts():
         logger.error(f"Failed to get animal counts: {e}")
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+def store_upload_results(result: Dict, filename: str) -> List[int]:
+    """Add an upload's successful predictions to the database; returns the new detection ids"""
+    classification = result.get('classification') or {}
+    detection_ids = []
+    for detection_type, key in (('gunshot', 'gunshot_predictions'), ('wildlife', 'wildlife_predictions')):
+        for model_name, model_result in (classification.get(key) or {}).items():
+            if model_result.get('prediction') != 'Error':
+                detection_ids.append(database.add_detection(
+                    detection_type=detection_type,
+                    prediction=model_result['prediction'],
+                    confidence=model_result['confidence'],
+                    model_name=model_name,
+                    probabilities=model_result['probabilities'],
+                    audio_filename=filename,
+                    processing_time=result.get('processing_time'),
+                    is_live=False
+                ))
+    return detection_ids
+
 @app.post("/upload/single")
 async def upload_single_file(file: UploadFile = File(...)):
     """Upload and analyze a single audio file with database storage"""
@@ -542,6 +1021,7 @@ async def upload_single_file(file: UploadFile = File(...)):
     # Check file type
     if not file.filename.lower().endswith(('.wav', '.mp3', '.flac', '.m4a', '.ogg')):
         raise HTTPException(status_code=400, detail="Unsupported file format")
+    require_ready()
     
     try:
         # Read file content
@@ -554,35 +1034,7 @@ async def upload_single_file(file: UploadFile = File(...)):
         
         # Store results in database if successful
         if result.get('success') and database:
-            # Store gunshot results
-            if 'gunshot_results' in result:
-                for model_name, gunshot_result in result['gunshot_results'].items():
-                    if gunshot_result.get('prediction') != 'Error':
-                        database.add_detection(
-                            detection_type='gunshot',
-                            prediction=gunshot_result['prediction'],
-                            confidence=gunshot_result['confidence'],
-                            model_name=model_name,
-                            probabilities=gunshot_result['probabilities'],
-                            audio_filename=file.filename,
-                            processing_time=result.get('processing_time'),
-                            is_live=False
-                        )
-            
-            # Store wildlife results
-            if 'wildlife_results' in result:
-                for model_name, wildlife_result in result['wildlife_results'].items():
-                    if wildlife_result.get('prediction') != 'Error':
-                        database.add_detection(
-                            detection_type='wildlife',
-                            prediction=wildlife_result['prediction'],
-                            confidence=wildlife_result['confidence'],
-                            model_name=model_name,
-                            probabilities=wildlife_result['probabilities'],
-                            audio_filename=file.filename,
-                            processing_time=result.get('processing_time'),
-                            is_live=False
-                        )
+            store_upload_results(result, file.filename)
         
         return result
         
@@ -1,122 +1,325 @@
 import os
+import base64
 import joblib
-import pandas as pd
-from typing import Dict
+import numpy as np
+from typing import Dict, Mapping, Optional, Sequence, Union
 import logging
+import functools
+import threading
+import time
 import warnings
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
 from pathlib import Path
 
+from feature_extraction import FEATURE_NAMES, FeatureVector
+from tree_engine import compile_model, verify_compiled
+import native_models
+import round_budget
+from ensemble_policy import EnsemblePolicy
+
 # Suppress sklearn version warnings for model loading
 warnings.filterwarnings("ignore", category=UserWarning, module="sklearn")
 
 logger = logging.getLogger(__name__)
 
+# _run_models' marker for a model that missed its deadline
+TIMED_OUT = object()
+# Recent calls per model that latency_stats summarises
+LATENCY_WINDOW = 512
+
 class ModelLoader:
     """
     Loads and manages all ML models for gunshot and wildlife classification
     """
-    def __init__(self, model_base_path: str = "../ml_models"):
+    # Removed SVM due to unrealistic confidence values
+    GUNSHOT_MODEL_FILES = {
+        'xgboost': 'xgboost_model.pkl'
+    }
+    WILDLIFE_MODEL_FILES = {
+        'lightgbm_inat': 'lightgbm_inat_overfitting.pkl',
+        'rf_esc50': 'rf_model_esc50.pkl',
+        'xgboost_inat': 'xgboost_inat_overfitting.pkl',
+        'xgboost_esc50': 'xgboost_model_esc50.pkl'
+    }
+
+    def __init__(self, model_base_path: str = "../ml_models", compile_trees: bool = False,
+                 max_workers: Optional[int] = None, mmap_mode: Optional[str] = None, load: bool = True,
+                 prefer_native: bool = True):
         self.model_base_path = Path(model_base_path)
+        self.compile_trees = compile_trees
+        # Models load on a thread pool; None picks one thread per model file
+        self.max_workers = max_workers
+        # joblib memory-maps the large arrays of uncompressed joblib dumps; plain pickles ignore it
+        self.mmap_mode = mmap_mode
+        # Load from <group>/native/manifest.json (see native_models.py) where it exists, pickles otherwise
+        self.prefer_native = prefer_native
         self.gunshot_models = {}
         self.wildlife_models = {}
         self.scalers = {}
-        self.load_all_models()
+        # Scalers folded into (mean, scale) float32 arrays, applied as (x - mean) / scale
+        self.scaler_params = {}
+        # Tree ensembles compiled to NumPy node arrays (see tree_engine.py), by model name
+        self.compiled_models = {}
+        # Per-model load state for the readiness probe: pending/loading/loaded/failed, and the artifact format
+        self.model_status = {}
+        # Offline accuracy-vs-latency points per boosted model for truncated rounds (see round_budget.py)
+        self.round_calibration = {}
+        self.load_seconds = None
+        self._status_lock = threading.Lock()
+        # load=False leaves load_all_models to the caller, e.g. so a readiness probe can watch model_status
+        if load:
+            self.load_all_models()
     
     def load_all_models(self):
-        """Load all available models"""
+        """
+        Load the scaler and every available model file, in parallel threads.
+        Tree ensembles are compiled as they load when compile_trees is set.
+        """
+        start = time.perf_counter()
         try:
-            # Load gunshot models
-            gunshot_path = self.model_base_path / "gun_shots"
-            if gunshot_path.exists():
-                self._load_gunshot_models(gunshot_path)
+            jobs = []
+            manifests = {}
+            for group, directory, model_files in (
+                ('gunshot', "gun_shots", self.GUNSHOT_MODEL_FILES),
+                ('wildlife', "wildlife", self.WILDLIFE_MODEL_FILES),
+            ):
+                path = self.model_base_path / directory
+                if not path.exists():
+                    continue
+                native_dir = path / native_models.NATIVE_DIR
+                manifest = native_models.read_manifest(native_dir) if self.prefer_native else None
+                manifests[group] = manifest
+                native_entries = manifest['models'] if manifest else {}
+                # Native artifacts first (with their pickle to fall back on), then any pickles they don't cover
+                for model_name, entry in native_entries.items():
+                    pickle_path = path / model_files[model_name] if model_name in model_files else None
+                    jobs.append((group, model_name, native_dir, entry,
+                                 pickle_path if pickle_path is not None and pickle_path.exists() else None))
+                for model_name, filename in model_files.items():
+                    if model_name not in native_entries and (path / filename).exists():
+                        jobs.append((group, model_name, path / filename, None, None))
+            for group, model_name, _, entry, _ in jobs:
+                self._set_status(model_name, group=group, state='pending',
+                                 format=entry['format'] if entry else 'pickle')
+            
+            self.round_calibration = round_budget.read_calibration(self.model_base_path)
+            gunshot_manifest = manifests.get('gunshot')
+            with ThreadPoolExecutor(max_workers=self.max_workers or max(1, len(jobs) + 1)) as pool:
+                scaler_job = None
+                if gunshot_manifest and 'scaler' in gunshot_manifest:
+                    # Native manifests carry the scaler already folded into (mean, scale)
+                    folded = gunshot_manifest['scaler']
+                    self.scaler_params['gunshot'] = (np.asarray(folded['mean'], dtype=np.float32),
+                                                     np.asarray(folded['scale'], dtype=np.float32))
+                else:
+                    scaler_job = pool.submit(self._load_scaler, self.model_base_path / "gun_shots" / 'scaler.pkl')
+                loaded = list(pool.map(lambda job: self._load_model(*job), jobs))
+                if scaler_job is not None:
+                    scaler_job.result()
+            
+            # Register in file order, whatever order the threads finished in
+            for (group, model_name, _, _, _), model in zip(jobs, loaded):
+                if model is not None:
+                    models = self.gunshot_models if group == 'gunshot' else self.wildlife_models
+                    models[model_name] = model
             
-            # Load wildlife models
-            wildlife_path = self.model_base_path / "wildlife"
-            if wildlife_path.exists():
-                self._load_wildlife_models(wildlife_path)
-                
-            logger.info(f"Loaded {len(self.gunshot_models)} gunshot models and {len(self.wildlife_models)} wildlife models")
+            self.load_seconds = time.perf_counter() - start
+            logger.info(
+                f"Loaded {len(self.gunshot_models)} gunshot models and {len(self.wildlife_models)} "
+                f"wildlife models in {self.load_seconds:.2f}s"
+            )
             
         except Exception as e:
             logger.error(f"Error loading models: {e}")
             raise
-    
-    def _load_gunshot_models(self, path: Path):
-        """Load gunshot classification models"""
-        # Removed SVM due to unrealistic confidence values
-        model_files = {
-            'xgboost': 'xgboost_model.pkl'
-        }
-        
-        scaler_file = 'scaler.pkl'
-        
-        # Load scaler with warning suppression
-        scaler_path = path / scaler_file
-        if scaler_path.exists():
-            try:
-                with warnings.catch_warnings():
-                    warnings.simplefilter("ignore")
-                    self.scalers['gunshot'] = joblib.load(scaler_path)
-                logger.info(f"Loaded gunshot scaler from {scaler_path}")
-            except Exception as e:
-                logger.error(f"Failed to load scaler: {e}")
-        
-        # Load models with warning suppression
-        for model_name, filename in model_files.items():
-            model_path = path / filename
-            if model_path.exists():
+
+    def _load_pickle(self, path: Path):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            return joblib.load(path, mmap_mode=self.mmap_mode)
+
+    def _load_scaler(self, scaler_path: Path):
+        """Load the gunshot scaler and fold it into (mean, scale)"""
+        if not scaler_path.exists():
+            return
+        try:
+            self.scalers['gunshot'] = self._load_pickle(scaler_path)
+            self.scaler_params['gunshot'] = self._fold_scaler(self.scalers['gunshot'])
+            logger.info(f"Loaded gunshot scaler from {scaler_path}")
+        except Exception as e:
+            logger.error(f"Failed to load scaler: {e}")
+
+    def _load_model(self, group: str, model_name: str, model_path: Path, native_entry: Optional[dict] = None,
+                    fallback_path: Optional[Path] = None):
+        """
+        Load one model (from its native artifact when native_entry is given,
+        else its pickle), check it can predict on a dummy feature vector and
+        compile it if asked. A native artifact that fails to load falls back to
+        the pickle at fallback_path. Returns the model, or None if it failed.
+        """
+        self._set_status(model_name, state='loading')
+        start = time.perf_counter()
+        try:
+            if native_entry is not None:
                 try:
-                    with warnings.catch_warnings():
-                        warnings.simplefilter("ignore")
-                        model = joblib.load(model_path)
-                    self.gunshot_models[model_name] = model
-                    logger.info(f"Loaded gunshot model: {model_name}")
+                    model = native_models.load_model(model_path, native_entry)
                 except Exception as e:
-                    logger.error(f"Failed to load gunshot model {model_name}: {e}")
-    
-    def _load_wildlife_models(self, path: Path):
-        """Load wildlife classification models"""
-        model_files = {
-            'lightgbm_inat': 'lightgbm_inat_overfitting.pkl',
-            'rf_esc50': 'rf_model_esc50.pkl',
-            'xgboost_inat': 'xgboost_inat_overfitting.pkl',
-            'xgboost_esc50': 'xgboost_model_esc50.pkl'
-        }
+                    if fallback_path is None:
+                        raise
+                    logger.warning(f"Native artifact for {group} model {model_name} failed to load ({e}); "
+                                   f"using {fallback_path.name}")
+                    self._set_status(model_name, format='pickle', native_error=str(e))
+                    model = self._load_pickle(fallback_path)
+            else:
+                model = self._load_pickle(model_path)
+            if not hasattr(model, 'predict'):
+                raise ValueError("model doesn't have a predict method")
+            # Test if the model can make a simple prediction on our 60 features
+            model.predict(np.zeros((1, len(FEATURE_NAMES))))
+        except Exception as e:
+            logger.error(f"Failed to load {group} model {model_name}: {e}")
+            self._set_status(model_name, state='failed', error=str(e),
+                             load_seconds=time.perf_counter() - start)
+            return None
         
-        # Load models with warning suppression and better error handling
-        for model_name, filename in model_files.items():
-            model_path = path / filename
-            if model_path.exists():
-                try:
-                    with warnings.catch_warnings():
-                        warnings.simplefilter("ignore")
-                        model = joblib.load(model_path)
-                    
-                    # Test if the model can make a simple prediction
-                    if hasattr(model, 'predict'):
-                        # Create a dummy feature array to test compatibility
-                        import numpy as np
-                        dummy_features = np.zeros((1, 60))  # Assuming 60 features
-                        try:
-                            model.predict(dummy_features)  # Test prediction
-                            self.wildlife_models[model_name] = model
-                            logger.info(f"Loaded wildlife model: {model_name}")
-                        except Exception as test_e:
-                            logger.warning(f"Model {model_name} loaded but failed prediction test: {test_e}")
-                            logger.warning(f"Skipping {model_name} due to compatibility issues")
-                    else:
-                        logger.error(f"Model {model_name} doesn't have predict method")
-                        
-                except Exception as e:
-                    logger.error(f"Failed to load wildlife model {model_name}: {e}")
-                    # Continue loading other models even if one fails
+        if self.compile_trees:
+            self._compile(model_name, model)
+        self._set_status(model_name, state='loaded', compiled=model_name in self.compiled_models,
+                         load_seconds=time.perf_counter() - start)
+        logger.info(f"Loaded {group} model: {model_name}")
+        return model
+
+    def _set_status(self, model_name: str, **fields):
+        with self._status_lock:
+            self.model_status.setdefault(model_name, {}).update(fields)
+
+    def load_report(self):
+        """Per-model load status and timing, for /health/ready"""
+        with self._status_lock:
+            return {name: dict(status) for name, status in self.model_status.items()}
+    
+    def compile_models(self):
+        """
+        Compile every supported tree ensemble and check it against the model's own
+        predict_proba; models that fail either step keep using the library
+        """
+        for model_name, model in [*self.gunshot_models.items(), *self.wildlife_models.items()]:
+            self._compile(model_name, model)
+            self._set_status(model_name, compiled=model_name in self.compiled_models)
+
+    def _compile(self, model_name: str, model):
+        try:
+            compiled = compile_model(model)
+            error = verify_compiled(model, compiled, len(FEATURE_NAMES))
+            self.compiled_models[model_name] = compiled
+            logger.info(
+                f"Compiled {model_name}: {compiled.n_trees} trees, depth {compiled.max_depth}, "
+                f"max probability error {error:.1e}"
+            )
+        except Exception as e:
+            logger.warning(f"Not compiling {model_name}, using its predict_proba: {e}")
+
+    def required_features(self):
+        """
+        FEATURE_NAMES read by at least one loaded model, in FEATURE_NAMES order.
+        Models take the full vector positionally, so a tree ensemble only needs
+        the columns it splits on; any other model needs all of them.
+        """
+        required = np.zeros(len(FEATURE_NAMES), dtype=bool)
+        for model in [*self.gunshot_models.values(), *self.wildlife_models.values()]:
+            required |= self._used_columns(model)
+        return [name for name, used in zip(FEATURE_NAMES, required) if used]
+
+    @staticmethod
+    def _used_columns(model):
+        """Boolean mask of the input columns a model reads"""
+        n_features = len(FEATURE_NAMES)
+        used = np.zeros(n_features, dtype=bool)
+        try:
+            if getattr(model, 'n_features_in_', n_features) != n_features:
+                raise ValueError(f"model expects {model.n_features_in_} features")
+            if hasattr(model, 'get_booster'):
+                # XGBoost: split counts are keyed by the booster's feature names (f0, f1, ... if unnamed)
+                booster = model.get_booster()
+                names = booster.feature_names or [f'f{i}' for i in range(n_features)]
+                for name in booster.get_score(importance_type='weight'):
+                    used[names.index(name)] = True
+                return used
+            if hasattr(model, 'booster_'):
+                # LightGBM
+                return np.asarray(model.booster_.feature_importance(importance_type='split')) > 0
+            if getattr(model, 'compiled_ensemble', None) is not None:
+                # Forest loaded from native tree arrays; leaves have a NaN threshold
+                compiled = model.compiled_ensemble
+                used[compiled.feature[~np.isnan(compiled.threshold)]] = True
+                return used
+            if hasattr(model, 'estimators_') or hasattr(model, 'tree_'):
+                # scikit-learn trees and forests; leaves are marked with a negative feature index
+                for tree in np.ravel(getattr(model, 'estimators_', [model])):
+                    features = tree.tree_.feature
+                    used[features[features >= 0]] = True
+                return used
+        except Exception as e:
+            logger.warning(f"Could not read the features used by {type(model).__name__}: {e}")
+        used[:] = True
+        return used
+
+    @staticmethod
+    def _fold_scaler(scaler):
+        """
+        Precompute a StandardScaler's affine transform as (mean, scale) arrays in
+        FEATURE_NAMES order. A scaler fitted on a different feature schema can't
+        be applied to our vectors and is folded to the identity, as transform()
+        would refuse it anyway.
+        """
+        n_features = len(FEATURE_NAMES)
+        mean = np.zeros(n_features, dtype=np.float32)
+        scale = np.ones(n_features, dtype=np.float32)
+
+        fitted_names = getattr(scaler, 'feature_names_in_', None)
+        if fitted_names is not None and list(fitted_names) != list(FEATURE_NAMES):
+            logger.warning("Scaler was fitted on a different feature schema; features will be used unscaled")
+            return mean, scale
+        if getattr(scaler, 'n_features_in_', n_features) != n_features:
+            logger.warning(f"Scaler expects {scaler.n_features_in_} features; features will be used unscaled")
+            return mean, scale
+
+        if getattr(scaler, 'mean_', None) is not None and getattr(scaler, 'with_mean', True):
+            mean = np.asarray(scaler.mean_, dtype=np.float32)
+        if getattr(scaler, 'scale_', None) is not None and getattr(scaler, 'with_std', True):
+            scale = np.asarray(scaler.scale_, dtype=np.float32)
+        return mean, scale
 
 class AudioClassifier:
     """
     Main classifier that uses all loaded models to make predictions
     """
-    def __init__(self, model_loader: ModelLoader):
+    def __init__(self, model_loader: ModelLoader, compiled_max_rows: int = 24,
+                 top_k: Optional[int] = None, probability_vector: bool = False,
+                 model_workers: int = 0, deadline: Optional[float] = None,
+                 policy: Optional[EnsemblePolicy] = None,
+                 budget: Optional[round_budget.RoundBudget] = None, onnx=None):
         self.model_loader = model_loader
+        # Optional onnxruntime backend (onnx_models.OnnxBackend) that runs the models it has exported
+        self.onnx = onnx
+        # Optional latency budget: boosted models run only their first K rounds while over it
+        self.budget = budget
+        # Which models score a clip and when the rest are skipped (default: all of them)
+        self.policy = policy or EnsemblePolicy()
+        # With model_workers > 0 the models of a request run concurrently on a dedicated pool,
+        # and any still running deadline seconds in are reported as timed out
+        self._model_pool = (ThreadPoolExecutor(max_workers=model_workers, thread_name_prefix="model")
+                            if model_workers > 0 else None)
+        self.deadline = deadline
+        self._latency = {}  # model name -> call/timeout counts and recent latencies
+        self._latency_lock = threading.Lock()
+        # Compiled trees beat the libraries on small batches only; larger ones go to predict_proba
+        self.compiled_max_rows = compiled_max_rows
+        # Compact output: only the top_k classes in 'probabilities' (None keeps every class), and
+        # optionally the whole distribution as a base64 float16 'probability_vector'
+        self.top_k = top_k
+        self.probability_vector = probability_vector
         
         # Define class mappings based on actual model training
         # Gunshot models appear to have 4 classes (0,1,2,3)
@@ -144,118 +347,503 @@ class AudioClassifier:
         # iNaturalist models have too many classes (~292) to hardcode here
         # We'll use generic naming for these and let users map them as needed
         self.inat_classes = {i: f"Species_{i}" for i in range(300)}  # Covering up to 300 classes
+        
+        # (classes, labels) per model: label arrays in classes_ order, built once instead of per prediction
+        self._labels = {}
+        for model_name, model in self.model_loader.gunshot_models.items():
+            if hasattr(model, 'classes_'):
+                self._model_labels(model_name, model.classes_, self.gunshot_classes)
+        for model_name, model in self.model_loader.wildlife_models.items():
+            if hasattr(model, 'classes_'):
+                self._model_labels(model_name, model.classes_, self._wildlife_classes(model_name)[0])
     
-    def predict_gunshot(self, features: Dict) -> Dict:
+    def warm_up(self):
         """
-        Predict if audio contains gunshot using all gunshot models
+        Run every model on one row and on a batch over compiled_max_rows, so the
+        compiled and native prediction paths have built their buffers and
+        thread pools before the first request
         """
-        results = {}
-        
-        # Convert features to DataFrame for consistency
-        feature_df = pd.DataFrame([features])
-        
-        # Scale features if scaler is available
-        if 'gunshot' in self.model_loader.scalers:
-            try:
-                scaled_features = self.model_loader.scalers['gunshot'].transform(feature_df)
-                feature_array = scaled_features
-            except Exception as e:
-                logger.warning(f"Error scaling features for gunshot prediction: {e}")
-                feature_array = feature_df.values
+        start = time.perf_counter()
+        for n_rows in (1, self.compiled_max_rows + 1):
+            self.classify_batch(np.zeros((n_rows, len(FEATURE_NAMES)), dtype=np.float32))
+        return time.perf_counter() - start
+
+    def close(self):
+        """Shut down the model pool, dropping calls that haven't started"""
+        if self._model_pool is not None:
+            self._model_pool.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _feature_matrix(features: Union[FeatureVector, Mapping]) -> np.ndarray:
+        """
+        (1, n_features) float32 model input from a FeatureVector or a {name: value} dict
+        """
+        return np.asarray(FeatureVector.from_mapping(features))[None, :]
+
+    def _wildlife_classes(self, model_name: str):
+        """Class mapping and dataset name for a wildlife model"""
+        if "esc50" in model_name:
+            return self.esc50_classes, "ESC-50"
+        if "inat" in model_name:
+            return self.inat_classes, "iNaturalist"
+        # Fallback for unknown models
+        return {i: f"Class_{i}" for i in range(500)}, "Unknown"
+
+    def _model_labels(self, model_name: str, classes, class_mapping) -> np.ndarray:
+        """Label of each of a model's classes, cached until the model reports different classes"""
+        cached = self._labels.get(model_name)
+        if cached is not None and (cached[0] is classes or np.array_equal(cached[0], classes)):
+            return cached[1]
+        labels = np.array([class_mapping.get(c, f"Class_{c}") for c in np.asarray(classes).tolist()])
+        self._labels[model_name] = (classes, labels)
+        return labels
+
+    def model_labels(self) -> Dict:
+        """{model_name: [label, ...]} in the order probability_vector uses"""
+        return {model_name: labels.tolist() for model_name, (_, labels) in self._labels.items()}
+
+    def _probability_fields(self, labels: np.ndarray, probabilities: np.ndarray) -> Dict:
+        """
+        A result's probability fields for one row: 'probabilities' as {label: p}
+        for every class, or with top_k set for the top_k classes only, most
+        likely first (picked with argpartition). With probability_vector set
+        the full row is added as base64 little-endian float16 in labels order.
+        """
+        if self.top_k is None or self.top_k >= len(probabilities):
+            fields = {'probabilities': {str(label): float(p) for label, p in zip(labels, probabilities)}}
         else:
-            feature_array = feature_df.values
-        
-        # Get predictions from all gunshot models
-        for model_name, model in self.model_loader.gunshot_models.items():
-            try:
-                # Get prediction and probability
-                prediction = model.predict(feature_array)[0]
-                
-                # Get probability if available (XGBoost has predict_proba)
-                if hasattr(model, 'predict_proba'):
-                    probabilities = model.predict_proba(feature_array)[0]
-                    confidence = max(probabilities)
-                    prob_dict = {self.gunshot_classes[i]: prob for i, prob in enumerate(probabilities)}
-                else:
-                    confidence = 0.5  # Default confidence
-                    prob_dict = {class_name: 0.5 for class_name in self.gunshot_classes.values()}
-                
-                results[model_name] = {
-                    'prediction': self.gunshot_classes.get(prediction, f"Class_{prediction}"),
-                    'confidence': float(confidence),
-                    'probabilities': {k: float(v) for k, v in prob_dict.items()},  # Convert numpy types
-                    'model_type': 'gunshot'
-                }
-                
-            except Exception as e:
-                logger.error(f"Error with gunshot model {model_name}: {e}")
-                results[model_name] = {
-                    'prediction': 'Error',
-                    'confidence': 0.0,
-                    'probabilities': {},
-                    'model_type': 'gunshot',
-                    'error': str(e)
-                }
-        
-        return results
+            top = np.argpartition(probabilities, -self.top_k)[-self.top_k:]
+            top = top[np.argsort(probabilities[top])[::-1]]
+            fields = {'probabilities': {str(labels[i]): round(float(probabilities[i]), 6) for i in top}}
+        if self.probability_vector:
+            vector = np.asarray(probabilities, dtype='<f2').tobytes()
+            fields['probability_vector'] = base64.b64encode(vector).decode('ascii')
+        return fields
+
+    def _scale_gunshot(self, feature_array: np.ndarray) -> np.ndarray:
+        """Apply the folded gunshot scaler, if one was loaded"""
+        if 'gunshot' in self.model_loader.scaler_params:
+            mean, scale = self.model_loader.scaler_params['gunshot']
+            return (feature_array - mean) / scale
+        return feature_array
+
+    def _model_input(self, group: str, model_name: str, inputs: Dict) -> np.ndarray:
+        """A model's rows from the per-group inputs; ONNX graphs fold the scaler in and take raw features"""
+        if self.onnx is not None and model_name in self.onnx:
+            return inputs['raw']
+        return inputs[group]
+
+    def _predict_proba(self, model_name: str, model, feature_array: np.ndarray):
+        """
+        (classes, probabilities) for a batch of rows, from the ONNX backend when
+        it has the model, else from the compiled ensemble when there is one and
+        the batch is small enough, else predict_proba. While the latency budget
+        cuts a model's rounds, it skips ONNX (whose graphs hold every round) and
+        runs truncated on the compiled trees or its library.
+        """
+        n_rounds = self.budget.rounds(model_name) if self.budget is not None else None
+        if self.onnx is not None and model_name in self.onnx:
+            if n_rounds is None:
+                return self.onnx.predict_proba(model_name, feature_array)
+            # ONNX models are handed raw rows (see _model_input)
+            if self.onnx.includes_scaler(model_name):
+                feature_array = self._scale_gunshot(feature_array)
+        compiled = self.model_loader.compiled_models.get(model_name)
+        if compiled is not None and len(feature_array) <= self.compiled_max_rows:
+            return compiled.classes, compiled.predict_proba(feature_array, n_rounds=n_rounds)
+        if n_rounds is not None:
+            probabilities = round_budget.predict_proba_rounds(model, feature_array, n_rounds)
+        else:
+            probabilities = model.predict_proba(feature_array)
+        return getattr(model, 'classes_', np.arange(probabilities.shape[1])), probabilities
+
+    def predict_gunshot(self, features: Union[FeatureVector, Mapping], deadline: Optional[float] = None) -> Dict:
+        """
+        Predict if audio contains gunshot using all gunshot models
+        """
+        return self._predict_groups(features, ('gunshot',), deadline)[0]
     
-    def predict_wildlife(self, features: Dict) -> Dict:
+    def predict_wildlife(self, features: Union[FeatureVector, Mapping], deadline: Optional[float] = None) -> Dict:
         """
         Predict wildlife/environmental sounds using all wildlife models
         """
-        results = {}
-        
-        # Convert features to DataFrame for consistency
-        feature_df = pd.DataFrame([features])
-        feature_array = feature_df.values
-        
-        # Get predictions from all wildlife models
-        for model_name, model in self.model_loader.wildlife_models.items():
-            try:
-                # Get prediction
+        return self._predict_groups(features, ('wildlife',), deadline)[1]
+
+    def _model_groups(self, groups, models: Optional[Sequence[str]] = None):
+        """
+        (group, {model_name: model}) for each requested group, gunshot first,
+        keeping only the models named in models when given
+        """
+        selected = []
+        for group in ('gunshot', 'wildlife'):
+            if group in groups:
+                group_models = (self.model_loader.gunshot_models if group == 'gunshot'
+                                else self.model_loader.wildlife_models)
+                if models is not None:
+                    group_models = {name: model for name, model in group_models.items() if name in models}
+                selected.append((group, group_models))
+        return selected
+
+    def _predict_groups(self, features: Union[FeatureVector, Mapping], groups, deadline: Optional[float] = None,
+                        models: Optional[Sequence[str]] = None, request_deadline: Optional[float] = None):
+        """
+        Run every model of the given groups (or only those named in models) on
+        one feature vector, concurrently when there is a model pool, and return
+        (gunshot_results, wildlife_results). Models still running deadline
+        seconds in (default self.deadline) are reported as timed out and not
+        waited for. When deadline is what is left of a longer one, the timed-out
+        entries name request_deadline instead.
+        """
+        deadline = self.deadline if deadline is None else deadline
+        request_deadline = deadline if request_deadline is None else request_deadline
+        feature_array = self._feature_matrix(features)
+        inputs = {'gunshot': self._scale_gunshot(feature_array), 'wildlife': feature_array, 'raw': feature_array}
+        tasks = [
+            (group, model_name, functools.partial(self._predict_one, group, model_name, model,
+                                                  self._model_input(group, model_name, inputs)))
+            for group, group_models in self._model_groups(groups, models)
+            for model_name, model in group_models.items()
+        ]
+        results = {'gunshot': {}, 'wildlife': {}}
+        for (group, model_name, _), outcome in zip(tasks, self._run_models(tasks, deadline)):
+            results[group][model_name] = (self._timed_out_result(group, request_deadline) if outcome is TIMED_OUT
+                                          else outcome)
+        return results['gunshot'], results['wildlife']
+
+    def _predict_one(self, group: str, model_name: str, model, feature_array: np.ndarray) -> Dict:
+        """One model's result dict for a single (1, n_features) row"""
+        if group == 'gunshot':
+            class_mapping, model_type = self.gunshot_classes, 'gunshot'
+        else:
+            # Choose the appropriate class mapping based on model type
+            class_mapping, dataset = self._wildlife_classes(model_name)
+            model_type = f'wildlife_{dataset}'
+        try:
+            # Get probability if available; the prediction is its argmax
+            if hasattr(model, 'predict_proba'):
+                classes, probabilities = self._predict_proba(model_name, model, feature_array)
+                probabilities = probabilities[0]
+                prediction = classes[probabilities.argmax()]
+                confidence = max(probabilities)
+                # Probabilities keyed by the model's class labels (top_k only in compact mode)
+                prob_fields = self._probability_fields(
+                    self._model_labels(model_name, classes, class_mapping), probabilities
+                )
+            else:
                 prediction = model.predict(feature_array)[0]
-                
-                # Choose the appropriate class mapping based on model type
-                if "esc50" in model_name:
-                    class_mapping = self.esc50_classes
-                    model_type = "ESC-50"
-                elif "inat" in model_name:
-                    class_mapping = self.inat_classes
-                    model_type = "iNaturalist"
-                else:
-                    # Fallback for unknown models
-                    class_mapping = {i: f"Class_{i}" for i in range(500)}
-                    model_type = "Unknown"
-                
-                # Get probability if available
-                if hasattr(model, 'predict_proba'):
-                    probabilities = model.predict_proba(feature_array)[0]
-                    confidence = max(probabilities)
-                    # Create probability dictionary using appropriate class mappings
-                    prob_dict = {class_mapping.get(i, f"Class_{i}"): prob for i, prob in enumerate(probabilities)}
+                confidence = 0.5  # Default confidence
+                if group == 'gunshot':
+                    prob_fields = {'probabilities': {class_name: 0.5 for class_name in class_mapping.values()}}
                 else:
-                    confidence = 0.5  # Default confidence
-                    prob_dict = {class_mapping.get(prediction, f"Class_{prediction}"): 1.0}
-                
-                results[model_name] = {
-                    'prediction': class_mapping.get(prediction, f"Class_{prediction}"),
-                    'confidence': float(confidence),
-                    'probabilities': {k: float(v) for k, v in prob_dict.items()},  # Convert numpy types
-                    'model_type': f'wildlife_{model_type}'
+                    prob_fields = {'probabilities': {class_mapping.get(prediction, f"Class_{prediction}"): 1.0}}
+            
+            return {
+                'prediction': class_mapping.get(prediction, f"Class_{prediction}"),
+                'confidence': float(confidence),
+                **prob_fields,
+                'model_type': model_type
+            }
+            
+        except Exception as e:
+            logger.error(f"Error with {group} model {model_name}: {e}")
+            return {
+                'prediction': 'Error',
+                'confidence': 0.0,
+                'probabilities': {},
+                'model_type': group,
+                'error': str(e)
+            }
+
+    @staticmethod
+    def _timed_out_result(group: str, deadline: Optional[float]) -> Dict:
+        """Error entry for a model that missed the request deadline"""
+        return {
+            'prediction': 'Error',
+            'confidence': 0.0,
+            'probabilities': {},
+            'model_type': group,
+            'error': "Timed out" if deadline is None else f"Timed out after {deadline * 1000:.0f} ms",
+            'timed_out': True
+        }
+
+    def _run_models(self, tasks, deadline: Optional[float]):
+        """
+        Call each task's function (on the model pool if there is one) and return
+        their results in task order, with TIMED_OUT for any that hadn't finished
+        (or, without a pool, started) deadline seconds in. Timed-out calls keep
+        running in the background; their latency is still recorded. Calls that
+        hadn't started by the deadline are dropped, so a request that timed out
+        doesn't hold pool threads other requests are waiting for.
+        """
+        end = None if deadline is None else time.perf_counter() + deadline
+
+        def timed(model_name, function):
+            start = time.perf_counter()
+            if end is not None and start >= end:
+                return TIMED_OUT
+            try:
+                return function()
+            finally:
+                self._record_latency(model_name, time.perf_counter() - start)
+
+        if self._model_pool is None:
+            outcomes = []
+            for _, model_name, function in tasks:
+                outcome = timed(model_name, function)
+                if outcome is TIMED_OUT:
+                    self._record_latency(model_name, None)
+                outcomes.append(outcome)
+            return outcomes
+
+        futures = [self._model_pool.submit(timed, model_name, function) for _, model_name, function in tasks]
+        wait(futures, timeout=deadline)
+        outcomes = []
+        for (_, model_name, _), future in zip(tasks, futures):
+            if future.done() and not future.cancelled() and future.result() is not TIMED_OUT:
+                outcomes.append(future.result())
+            else:
+                future.cancel()
+                outcomes.append(TIMED_OUT)
+                self._record_latency(model_name, None)
+        return outcomes
+
+    def _record_latency(self, model_name: str, seconds: Optional[float]):
+        """Add one call's latency to a model's stats; None counts a timeout"""
+        with self._latency_lock:
+            stats = self._latency.setdefault(model_name, {'calls': 0, 'timeouts': 0,
+                                                          'recent': deque(maxlen=LATENCY_WINDOW)})
+            if seconds is None:
+                stats['timeouts'] += 1
+            else:
+                stats['calls'] += 1
+                stats['recent'].append(seconds)
+
+    def latency_stats(self) -> Dict:
+        """
+        Per-model call and timeout counts with mean/p50/p95/max latency in ms
+        over the last LATENCY_WINDOW calls
+        """
+        with self._latency_lock:
+            snapshot = {name: (stats['calls'], stats['timeouts'], np.array(stats['recent']))
+                        for name, stats in self._latency.items()}
+        report = {}
+        for model_name, (calls, timeouts, recent) in snapshot.items():
+            report[model_name] = {'calls': calls, 'timeouts': timeouts}
+            if len(recent):
+                p50, p95 = np.percentile(recent, [50, 95]) * 1000
+                report[model_name].update(mean_ms=float(recent.mean() * 1000), p50_ms=float(p50),
+                                          p95_ms=float(p95), max_ms=float(recent.max() * 1000))
+        return report
+    
+    def predict_matrix(self, feature_matrix: np.ndarray, groups=('gunshot', 'wildlife'),
+                       deadline: Optional[float] = None, models: Optional[Sequence[str]] = None) -> Dict:
+        """
+        Run every model in the given groups (or only those named in models)
+        once on a (W, n_features) matrix of feature vectors. Returns {model_name: {'labels', 'probabilities',
+        'model_type'}} where probabilities is (W, n_classes) and labels names
+        its columns. Models that fail are logged and left out; with a deadline,
+        models that miss it map to None.
+        """
+        feature_matrix = np.asarray(feature_matrix, dtype=np.float32)
+        inputs = {'gunshot': self._scale_gunshot(feature_matrix) if 'gunshot' in groups else None,
+                  'wildlife': feature_matrix, 'raw': feature_matrix}
+        tasks = [
+            (group, model_name, functools.partial(self._predict_columns, group, model_name, model,
+                                                  self._model_input(group, model_name, inputs)))
+            for group, group_models in self._model_groups(groups, models)
+            for model_name, model in group_models.items()
+        ]
+        outputs = {}
+        for (_, model_name, _), outcome in zip(tasks, self._run_models(tasks, deadline)):
+            if outcome is TIMED_OUT:
+                outputs[model_name] = None
+            elif outcome is not None:
+                outputs[model_name] = outcome
+        return outputs
+
+    def _predict_columns(self, group: str, model_name: str, model, model_input: np.ndarray) -> Optional[Dict]:
+        """One model's predict_matrix entry, or None if it fails"""
+        if group == 'gunshot':
+            class_mapping, model_type = self.gunshot_classes, 'gunshot'
+        else:
+            class_mapping, dataset = self._wildlife_classes(model_name)
+            model_type = f'wildlife_{dataset}'
+        try:
+            if hasattr(model, 'predict_proba'):
+                classes, probabilities = self._predict_proba(model_name, model, model_input)
+            else:
+                # No probabilities: one-hot predictions at the default 0.5 confidence
+                predictions = model.predict(model_input)
+                classes, codes = np.unique(predictions, return_inverse=True)
+                probabilities = np.zeros((len(predictions), len(classes)))
+                probabilities[np.arange(len(predictions)), codes] = 0.5
+            return {
+                'labels': self._model_labels(model_name, classes, class_mapping),
+                'probabilities': probabilities,
+                'model_type': model_type
+            }
+        except Exception as e:
+            logger.error(f"Error with {group} model {model_name}: {e}")
+            return None
+
+    def classify_batch(self, feature_matrix: np.ndarray, groups=('gunshot', 'wildlife'),
+                       deadline: Optional[float] = None, models: Optional[Sequence[str]] = None) -> Dict:
+        """
+        Classify an (N, n_features) array of feature vectors with every model
+        in the given groups (or only those named in models), keeping the
+        results columnar. Returns
+        {model_name: {...}} where each model's entry holds:
+          'labels':        (n_classes,) class names
+          'predicted':     (N,) index into labels of each row's top class
+          'confidence':    (N,) probability of that class
+          'probabilities': (N, n_classes) float32
+          'model_type':    'gunshot' or 'wildlife_<dataset>'
+        Models that fail are logged and left out; with a deadline, models that
+        miss it map to None. row_predictions turns one row into the per-model
+        dicts the API returns.
+        """
+        feature_matrix = np.asarray(feature_matrix, dtype=np.float32)
+        if feature_matrix.ndim != 2 or feature_matrix.shape[1] != len(FEATURE_NAMES):
+            raise ValueError(f"Expected an (N, {len(FEATURE_NAMES)}) feature matrix, got {feature_matrix.shape}")
+
+        batch = {}
+        for model_name, output in self.predict_matrix(feature_matrix, groups, deadline, models).items():
+            if output is None:
+                batch[model_name] = None
+                continue
+            probabilities = np.asarray(output['probabilities'], dtype=np.float32)
+            predicted = probabilities.argmax(axis=1)
+            batch[model_name] = {
+                'labels': output['labels'],
+                'predicted': predicted,
+                'confidence': np.take_along_axis(probabilities, predicted[:, None], axis=1)[:, 0],
+                'probabilities': probabilities,
+                'model_type': output['model_type']
+            }
+        return batch
+
+    def row_predictions(self, outputs: Dict, row: int, groups=('gunshot', 'wildlife'),
+                        deadline: Optional[float] = None, models: Optional[Sequence[str]] = None):
+        """
+        One row of predict_matrix or classify_batch outputs as the per-model
+        result dicts that predict_gunshot and predict_wildlife return:
+        (gunshot, wildlife).
+        Models missing from outputs (they failed on the batch) get an Error
+        entry; models mapped to None missed the request's deadline, which their
+        entry names.
+        """
+        results = {'gunshot': {}, 'wildlife': {}}
+        for group, group_models in self._model_groups(groups, models):
+            for model_name in group_models:
+                if model_name not in outputs:
+                    results[group][model_name] = {
+                        'prediction': 'Error',
+                        'confidence': 0.0,
+                        'probabilities': {},
+                        'model_type': group,
+                        'error': 'Model failed on this batch'
+                    }
+                    continue
+                output = outputs[model_name]
+                if output is None:
+                    results[group][model_name] = self._timed_out_result(group, deadline)
+                    continue
+                probabilities = output['probabilities'][row]
+                top = int(probabilities.argmax())
+                results[group][model_name] = {
+                    'prediction': str(output['labels'][top]),
+                    'confidence': float(probabilities[top]),
+                    **self._probability_fields(output['labels'], probabilities),
+                    'model_type': output['model_type']
                 }
-                
-            except Exception as e:
-                logger.error(f"Error with wildlife model {model_name}: {e}")
-                results[model_name] = {
-                    'prediction': 'Error',
-                    'confidence': 0.0,
-                    'probabilities': {},
-                    'model_type': 'wildlife',
-                    'error': str(e)
+        return results['gunshot'], results['wildlife']
+
+    def classify_segments(self, feature_matrix: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> Dict:
+        """
+        Classify a file's windows in one pass and collapse them into a timeline.
+
+        feature_matrix holds one feature vector per window, with starts/ends
+        giving each window's position in seconds. Each window takes the most
+        confident prediction across models (as get_best_prediction does), and
+        consecutive windows with the same prediction are merged into one
+        timeline entry carrying its peak confidence and the model behind it.
+        All-NaN rows (windows the silence gate skipped) are reported as
+        quiet with zero confidence, without running any model.
+        """
+        try:
+            # All-NaN rows are windows the silence gate skipped
+            feature_matrix = np.asarray(feature_matrix, dtype=np.float32)
+            quiet = np.isnan(feature_matrix).all(axis=1)
+            loud = np.flatnonzero(~quiet)
+            n_windows = len(feature_matrix)
+
+            outputs = self.classify_batch(feature_matrix[loud]) if len(loud) else {}
+            if len(loud) and not outputs:
+                raise ValueError("No models produced predictions")
+
+            model_names = list(outputs) + ['silence_gate']
+            best_label = np.full(n_windows, self.gunshot_classes[0], dtype=object)
+            best_confidence = np.zeros(n_windows)
+            best_model = np.full(n_windows, len(model_names) - 1)
+            if len(loud):
+                # (models, windows) label and confidence of each model's top class
+                labels = np.stack([output['labels'][output['predicted']] for output in outputs.values()])
+                confidences = np.stack([output['confidence'] for output in outputs.values()])
+
+                columns = np.arange(len(loud))
+                best_model[loud] = confidences.argmax(axis=0)
+                best_label[loud] = labels[best_model[loud], columns]
+                best_confidence[loud] = confidences[best_model[loud], columns]
+            model_types = [outputs[name]['model_type'] for name in outputs] + ['silence_gate']
+
+            # Run-length encode the per-window predictions
+            codes = np.unique(best_label.astype(str), return_inverse=True)[1].reshape(-1)
+            run_starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+            run_ends = np.r_[run_starts[1:], n_windows]
+            run_ids = np.repeat(np.arange(len(run_starts)), run_ends - run_starts)
+            # Most confident window of each run: sort by run, then by descending confidence
+            peaks = np.lexsort((-best_confidence, run_ids))[run_starts]
+
+            timeline = [
+                {
+                    'start': float(starts[first]),
+                    'end': float(ends[last - 1]),
+                    'prediction': str(best_label[peak]),
+                    'confidence': float(best_confidence[peak]),
+                    'model': model_names[best_model[peak]],
+                    'model_type': model_types[best_model[peak]],
+                    'windows': int(last - first)
                 }
-        
-        return results
-    
+                for first, last, peak in zip(run_starts, run_ends, peaks)
+            ]
+
+            top = int(best_confidence.argmax())
+            return {
+                'success': True,
+                'best_result': {
+                    'best_prediction': str(best_label[top]),
+                    'best_confidence': float(best_confidence[top]),
+                    'best_model': model_names[best_model[top]],
+                    'start': float(starts[top]),
+                    'end': float(ends[top])
+                },
+                'timeline': timeline,
+                'total_windows': n_windows,
+                'quiet_windows': int(quiet.sum()),
+                'total_models': len(outputs)
+            }
+
+        except Exception as e:
+            logger.error(f"Error in segment classification: {e}")
+            return {
+                'success': False,
+                'error': str(e),
+                'best_result': None,
+                'timeline': [],
+                'total_windows': len(feature_matrix),
+                'total_models': 0
+            }
+
     def get_best_prediction(self, all_results: Dict) -> Dict:
         """
         Get the best prediction across all models based on confidence score
@@ -277,31 +865,31 @@ class AudioClassifier:
             'all_predictions': all_results
         }
     
-    def classify_audio(self, features: Dict) -> Dict:
+    def classify_audio(self, features: Union[FeatureVector, Mapping], deadline: Optional[float] = None) -> Dict:
         """
         Main classification method that runs all models and returns the best prediction
         """
         try:
-            # Get gunshot predictions
-            gunshot_results = self.predict_gunshot(features)
-            
-            # Get wildlife predictions
-            wildlife_results = self.predict_wildlife(features)
-            
-            # Combine all results
-            all_results = {**gunshot_results, **wildlife_results}
-            
-            # Get best prediction
-            best_result = self.get_best_prediction(all_results)
-            
-            return {
-                'success': True,
-                'gunshot_predictions': gunshot_results,
-                'wildlife_predictions': wildlife_results,
-                'best_result': best_result,
-                'total_models': len(all_results)
-            }
-            
+            features = FeatureVector.from_mapping(features)
+            deadline = self.deadline if deadline is None else deadline
+            start = time.perf_counter()
+            end = None if deadline is None else start + deadline
+            stages = self.policy.stages(self._ensemble(), self._model_costs())
+            gunshot_results, wildlife_results, skipped = {}, {}, []
+            for i, stage in enumerate(stages):
+                # One deadline covers every stage
+                remaining = None if end is None else max(0.0, end - time.perf_counter())
+                gunshot, wildlife = self._predict_groups(features, ('gunshot', 'wildlife'), remaining, stage,
+                                                         request_deadline=deadline)
+                gunshot_results.update(gunshot)
+                wildlife_results.update(wildlife)
+                if self.policy.done(gunshot_results, wildlife_results):
+                    skipped = [model_name for later in stages[i + 1:] for model_name in later]
+                    break
+            self.policy.record(len(gunshot_results) + len(wildlife_results), len(skipped))
+            if self.budget is not None:
+                self.budget.observe(time.perf_counter() - start)
+            return self.combine_predictions(gunshot_results, wildlife_results, skipped)
         except Exception as e:
             logger.error(f"Error in classification: {e}")
             return {
@@ -312,3 +900,73 @@ class AudioClassifier:
                 'best_result': None,
                 'total_models': 0
             }
+
+    def classify_rows(self, feature_matrix: np.ndarray, deadline: Optional[float] = None):
+        """
+        classify_audio for each row of an (N, n_features) matrix, batching each
+        policy stage over the rows it hasn't decided yet. Returns a
+        (gunshot_results, wildlife_results, skipped_models) tuple per row.
+        """
+        feature_matrix = np.asarray(feature_matrix, dtype=np.float32)
+        deadline = self.deadline if deadline is None else deadline
+        start = time.perf_counter()
+        end = None if deadline is None else start + deadline
+        stages = self.policy.stages(self._ensemble(), self._model_costs())
+        rows = [({}, {}, []) for _ in range(len(feature_matrix))]
+        pending = np.arange(len(feature_matrix))
+        for i, stage in enumerate(stages):
+            if not len(pending):
+                break
+            remaining = None if end is None else max(0.0, end - time.perf_counter())
+            outputs = self.classify_batch(feature_matrix[pending], deadline=remaining, models=stage)
+            undecided = []
+            for j, row in enumerate(pending):
+                gunshot_results, wildlife_results, skipped = rows[row]
+                # Timed-out entries name the request's deadline, not what was left of it for this stage
+                gunshot, wildlife = self.row_predictions(outputs, j, deadline=deadline, models=stage)
+                gunshot_results.update(gunshot)
+                wildlife_results.update(wildlife)
+                if self.policy.done(gunshot_results, wildlife_results):
+                    skipped.extend(model_name for later in stages[i + 1:] for model_name in later)
+                else:
+                    undecided.append(row)
+            pending = np.array(undecided, dtype=int)
+        for gunshot_results, wildlife_results, skipped in rows:
+            self.policy.record(len(gunshot_results) + len(wildlife_results), len(skipped))
+        if self.budget is not None:
+            # Every row of the batch waited for the whole pass
+            self.budget.observe(time.perf_counter() - start)
+        return rows
+
+    def _ensemble(self):
+        """(group, model_name) for every loaded model, gunshot models first"""
+        return [(group, model_name) for group, group_models in self._model_groups(('gunshot', 'wildlife'))
+                for model_name in group_models]
+
+    def _model_costs(self) -> Dict[str, Optional[float]]:
+        """Each model's median latency in seconds, None until it has been timed"""
+        with self._latency_lock:
+            return {model_name: float(np.median(stats['recent'])) if stats['recent'] else None
+                    for model_name, stats in self._latency.items()}
+
+    def combine_predictions(self, gunshot_results: Dict, wildlife_results: Dict,
+                            skipped_models: Sequence[str] = ()) -> Dict:
+        """
+        classify_audio's result from the gunshot and wildlife predictions and
+        the models the ensemble policy skipped
+        """
+        # Combine all results
+        all_results = {**gunshot_results, **wildlife_results}
+        
+        # Get best prediction
+        best_result = self.get_best_prediction(all_results)
+        
+        return {
+            'success': True,
+            'gunshot_predictions': gunshot_results,
+            'wildlife_predictions': wildlife_results,
+            'best_result': best_result,
+            'total_models': len(all_results),
+            'policy': self.policy.name,
+            'skipped_models': list(skipped_models)
+        }
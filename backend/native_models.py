@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Native model artifacts: each model stored in its library's own format
+(XGBoost UBJSON, LightGBM text, compiled tree arrays for scikit-learn forests)
+next to a JSON manifest of classes and feature schema, instead of
+version-sensitive pickles of the scikit-learn wrappers.
+
+Convert the pickles under a model directory with:
+    python native_models.py ../ml_models
+"""
+
+import argparse
+import json
+import logging
+import re
+import time
+from importlib import metadata
+from pathlib import Path
+
+import numpy as np
+
+from feature_extraction import FEATURE_NAMES, FEATURE_SCHEMA_VERSION
+from tree_engine import CompiledTreeEnsemble, compile_model, verify_compiled
+
+logger = logging.getLogger(__name__)
+
+NATIVE_DIR = "native"
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+# The library each artifact format is read with
+FORMAT_LIBRARIES = {'xgboost-ubj': 'xgboost', 'lightgbm-text': 'lightgbm'}
+
+
+def _two_columns(probabilities):
+    """Binary boosters return P(class 1) per row; predict_proba wants both columns"""
+    if probabilities.ndim == 1:
+        return np.stack([1.0 - probabilities, probabilities], axis=1)
+    return probabilities
+
+
+class NativeXGBoostModel:
+    """
+    A raw xgboost.Booster with the predict/predict_proba surface the
+    classifier uses; predicts in place on NumPy input, no DMatrix or wrapper
+    """
+    def __init__(self, booster, classes, n_features):
+        self.booster = booster
+        self.classes_ = np.asarray(classes)
+        self.n_features_in_ = n_features
+        self.best_iteration = None  # exported boosters are already cut at their best iteration
+
+    def get_booster(self):
+        return self.booster
+
+    def predict_proba(self, X, iteration_range=None):
+        return _two_columns(self.booster.inplace_predict(np.asarray(X, dtype=np.float32),
+                                                         iteration_range=iteration_range or (0, 0)))
+
+    def predict(self, X, iteration_range=None):
+        return self.classes_[self.predict_proba(X, iteration_range).argmax(axis=1)]
+
+
+class NativeLightGBMModel:
+    """A raw lightgbm.Booster with the predict/predict_proba surface the classifier uses"""
+    def __init__(self, booster, classes, n_features):
+        self.booster_ = booster
+        self.classes_ = np.asarray(classes)
+        self.n_features_in_ = n_features
+        self.best_iteration_ = None  # exported boosters are already cut at their best iteration
+
+    def predict_proba(self, X, num_iteration=None):
+        return _two_columns(self.booster_.predict(np.asarray(X, dtype=np.float64), num_iteration=num_iteration))
+
+    def predict(self, X, num_iteration=None):
+        return self.classes_[self.predict_proba(X, num_iteration).argmax(axis=1)]
+
+
+class NativeForestModel:
+    """A scikit-learn forest restored from its compiled tree arrays"""
+    def __init__(self, compiled_ensemble, n_features):
+        self.compiled_ensemble = compiled_ensemble
+        self.classes_ = compiled_ensemble.classes
+        self.n_features_in_ = n_features
+
+    def predict_proba(self, X):
+        return self.compiled_ensemble.predict_proba(X)
+
+    def predict(self, X):
+        return self.compiled_ensemble.predict(X)
+
+
+def export_model(model, model_name: str, directory: Path) -> dict:
+    """
+    Write one fitted model to directory in its native format and return its
+    manifest entry. Raises ValueError for models with no native format.
+    """
+    n_features = int(getattr(model, 'n_features_in_', len(FEATURE_NAMES)))
+    entry = {'classes': np.asarray(model.classes_).tolist(), 'n_features': n_features}
+
+    if hasattr(model, 'get_booster'):
+        import xgboost as xgb
+        booster = model.get_booster()
+        best_iteration = getattr(model, 'best_iteration', None)
+        if best_iteration is not None and best_iteration + 1 < booster.num_boosted_rounds():
+            booster = booster[:best_iteration + 1]
+        entry.update(format='xgboost-ubj', file=f"{model_name}.ubj", library_version=xgb.__version__)
+        booster.save_model(str(directory / entry['file']))
+    elif hasattr(model, 'booster_'):
+        import lightgbm as lgb
+        entry.update(format='lightgbm-text', file=f"{model_name}.txt", library_version=lgb.__version__)
+        model.booster_.save_model(str(directory / entry['file']),
+                                  num_iteration=getattr(model, 'best_iteration_', None) or None)
+    elif hasattr(model, 'estimators_') or hasattr(model, 'tree_'):
+        compiled = compile_model(model)
+        verify_compiled(model, compiled, n_features)
+        entry.update(format='tree-arrays', file=f"{model_name}.npz", library_version=None)
+        np.savez(directory / entry['file'], **compiled.to_arrays())
+    else:
+        raise ValueError(f"{type(model).__name__} has no native artifact format")
+    return entry
+
+
+def load_model(directory: Path, entry: dict):
+    """Load one model from its manifest entry"""
+    path = Path(directory) / entry['file']
+    if entry['format'] == 'xgboost-ubj':
+        import xgboost as xgb
+        booster = xgb.Booster()
+        booster.load_model(str(path))
+        return NativeXGBoostModel(booster, entry['classes'], entry['n_features'])
+    if entry['format'] == 'lightgbm-text':
+        import lightgbm as lgb
+        return NativeLightGBMModel(lgb.Booster(model_file=str(path)), entry['classes'], entry['n_features'])
+    if entry['format'] == 'tree-arrays':
+        with np.load(path) as arrays:
+            return NativeForestModel(CompiledTreeEnsemble.from_arrays(arrays), entry['n_features'])
+    raise ValueError(f"Unknown model format: {entry['format']}")
+
+
+def _version_tuple(version: str):
+    """(major, minor, patch) from a version string, ignoring any suffix"""
+    return tuple(int(part) for part in re.findall(r'\d+', version)[:3])
+
+
+def _newer_than_installed(entry: dict) -> bool:
+    """Whether an artifact was written by a newer version of its library than the one installed"""
+    library = FORMAT_LIBRARIES.get(entry.get('format'))
+    if library is None or not entry.get('library_version'):
+        return False
+    try:
+        installed = metadata.version(library)
+    except metadata.PackageNotFoundError:
+        return False
+    return _version_tuple(entry['library_version']) > _version_tuple(installed)
+
+
+def read_manifest(directory: Path):
+    """
+    The manifest in directory, or None if there is none or it was written for
+    a different feature schema (the pickles are used instead). Entries
+    written by a newer library version than the installed one are left out,
+    since older readers can misread them; those models load from their pickle.
+    """
+    path = Path(directory) / MANIFEST_FILE
+    if not path.exists():
+        return None
+    manifest = json.loads(path.read_text())
+    if manifest.get('feature_schema') != FEATURE_SCHEMA_VERSION or manifest.get('feature_names') != FEATURE_NAMES:
+        logger.warning(f"Ignoring {path}: written for a different feature schema")
+        return None
+    for model_name, entry in list(manifest['models'].items()):
+        if _newer_than_installed(entry):
+            library = FORMAT_LIBRARIES[entry['format']]
+            logger.warning(f"Ignoring {model_name} in {path}: written by {library} {entry['library_version']}, "
+                           f"newer than the installed {metadata.version(library)}")
+            del manifest['models'][model_name]
+    return manifest
+
+
+def convert_group(models: dict, directory: Path, labels=None, scaler_params=None) -> dict:
+    """
+    Export a group's models into directory and write its manifest. Models
+    with no native format are left out (they keep loading from their pickle).
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest = {
+        'manifest_version': MANIFEST_VERSION,
+        'feature_schema': FEATURE_SCHEMA_VERSION,
+        'feature_names': list(FEATURE_NAMES),
+        'models': {}
+    }
+    for model_name, model in models.items():
+        try:
+            entry = export_model(model, model_name, directory)
+        except Exception as e:
+            logger.warning(f"Not converting {model_name}: {e}")
+            continue
+        if labels is not None:
+            mapping = labels(model_name)
+            entry['labels'] = [mapping.get(c, f"Class_{c}") for c in entry['classes']]
+        manifest['models'][model_name] = entry
+    if scaler_params is not None:
+        mean, scale = scaler_params
+        manifest['scaler'] = {'mean': mean.tolist(), 'scale': scale.tolist()}
+    (directory / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def main():
+    from model_manager import ModelLoader, AudioClassifier
+
+    parser = argparse.ArgumentParser(description="Convert pickled models to native artifacts")
+    parser.add_argument('model_base_path', nargs='?', default="../ml_models")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    loader = ModelLoader(model_base_path=args.model_base_path, prefer_native=False)
+    classifier = AudioClassifier(loader)
+    groups = [
+        ("gun_shots", loader.gunshot_models, lambda name: classifier.gunshot_classes,
+         loader.scaler_params.get('gunshot')),
+        ("wildlife", loader.wildlife_models, lambda name: classifier._wildlife_classes(name)[0], None),
+    ]
+    rng = np.random.default_rng(0)
+    X = (rng.standard_normal((256, len(FEATURE_NAMES))) * 50).astype(np.float32)
+    for directory, models, labels, scaler_params in groups:
+        if not models:
+            continue
+        native_dir = Path(args.model_base_path) / directory / NATIVE_DIR
+        manifest = convert_group(models, native_dir, labels, scaler_params)
+        for model_name, entry in manifest['models'].items():
+            start = time.perf_counter()
+            native = load_model(native_dir, entry)
+            load_seconds = time.perf_counter() - start
+            error = np.abs(native.predict_proba(X) - models[model_name].predict_proba(X)).max()
+            print(f"{directory}/{model_name}: {entry['format']}, loads in {load_seconds * 1000:.0f} ms, "
+                  f"max |Δp| {error:.1e}")
+
+
+if __name__ == "__main__":
+    main()
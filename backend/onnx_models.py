@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+ONNX export of the classifier ensemble, and an onnxruntime backend for it.
+
+Each model is exported as one graph that takes raw feature vectors and
+returns class probabilities. The gunshot graphs fold the scaler in as
+Sub/Div nodes ahead of the trees. Class labels are stored in each graph's
+metadata and in the manifest. onnxruntime's tree-ensemble kernels avoid the
+libraries' per-call Python overhead and release the GIL while they run.
+
+Export the pickles under a model directory, checking each graph against
+its pickle, with:
+    python onnx_models.py ../ml_models
+"""
+
+import argparse
+import copy
+import json
+import logging
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+
+from feature_extraction import FEATURE_NAMES, FEATURE_SCHEMA_VERSION
+from native_models import MANIFEST_FILE, read_manifest
+
+logger = logging.getLogger(__name__)
+
+ONNX_DIR = "onnx"
+MANIFEST_VERSION = 1
+TARGET_OPSET = {'': 15, 'ai.onnx.ml': 3}
+# Largest |Δp| against the pickle an exported graph may show
+PARITY_TOLERANCE = 1e-4
+GRAPH_OPTIMIZATIONS = ('disable', 'basic', 'extended', 'all')
+
+
+def _convert(model, n_features: int):
+    """The bare model as an ONNX graph from 'features' to 'label' and 'probabilities'"""
+    if hasattr(model, 'get_booster'):
+        from onnxmltools import convert_xgboost
+        from onnxmltools.convert.common.data_types import FloatTensorType
+        initial_types = [('features', FloatTensorType([None, n_features]))]
+        # The converter only reads trees whose features are named f0, f1, ...
+        model = copy.deepcopy(model)
+        model.get_booster().feature_names = None
+        return convert_xgboost(model, initial_types=initial_types, target_opset=TARGET_OPSET[''])
+    if hasattr(model, 'booster_'):
+        from onnxmltools import convert_lightgbm
+        from onnxmltools.convert.common.data_types import FloatTensorType
+        initial_types = [('features', FloatTensorType([None, n_features]))]
+        return convert_lightgbm(model, initial_types=initial_types, zipmap=False,
+                                target_opset=TARGET_OPSET[''])
+    if hasattr(model, 'predict_proba'):
+        from skl2onnx import convert_sklearn
+        from skl2onnx.common.data_types import FloatTensorType
+        initial_types = [('features', FloatTensorType([None, n_features]))]
+        return convert_sklearn(model, initial_types=initial_types, target_opset=TARGET_OPSET,
+                               options={id(model): {'zipmap': False}})
+    raise ValueError(f"{type(model).__name__} has no ONNX converter")
+
+
+def _fold_scaler(onx, mean: np.ndarray, scale: np.ndarray):
+    """Put (features - mean) / scale ahead of the graph, so it takes raw features"""
+    from onnx import helper, numpy_helper
+
+    graph = onx.graph
+    for node in graph.node:
+        node.input[:] = ['scaled_features' if name == 'features' else name for name in node.input]
+    graph.initializer.extend([
+        numpy_helper.from_array(np.asarray(mean, dtype=np.float32), 'scaler_mean'),
+        numpy_helper.from_array(np.asarray(scale, dtype=np.float32), 'scaler_scale'),
+    ])
+    scaler_nodes = [
+        helper.make_node('Sub', ['features', 'scaler_mean'], ['centered_features'], name='scaler_sub'),
+        helper.make_node('Div', ['centered_features', 'scaler_scale'], ['scaled_features'], name='scaler_div'),
+    ]
+    nodes = scaler_nodes + list(graph.node)
+    del graph.node[:]
+    graph.node.extend(nodes)
+    return onx
+
+
+def _session_options(intra_op_threads: int = 1, inter_op_threads: int = 1, optimization: str = 'all'):
+    import onnxruntime as ort
+
+    levels = {
+        'disable': ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+        'basic': ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+        'extended': ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+        'all': ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+    }
+    if optimization not in levels:
+        raise ValueError(f"Unknown graph optimization {optimization!r}, expected one of {GRAPH_OPTIMIZATIONS}")
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = intra_op_threads
+    options.inter_op_num_threads = inter_op_threads
+    options.graph_optimization_level = levels[optimization]
+    return options
+
+
+class OnnxModel:
+    """One exported graph in an onnxruntime session, with the predict/predict_proba surface"""
+    def __init__(self, session, classes, labels=None, includes_scaler=False):
+        self.session = session
+        self.classes_ = np.asarray(classes)
+        self.labels = labels
+        self.includes_scaler = includes_scaler
+
+    def predict_proba(self, X):
+        return self.session.run(['probabilities'], {'features': np.asarray(X, dtype=np.float32)})[0]
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def export_model(model, model_name: str, directory: Path, scaler_params=None, labels=None) -> dict:
+    """
+    Write one fitted model to directory as <model_name>.onnx and return its
+    manifest entry. Raises ValueError for models with no converter.
+    """
+    n_features = int(getattr(model, 'n_features_in_', len(FEATURE_NAMES)))
+    onx = _convert(model, n_features)
+    if scaler_params is not None:
+        onx = _fold_scaler(onx, *scaler_params)
+    entry = {
+        'classes': np.asarray(model.classes_).tolist(),
+        'n_features': n_features,
+        'file': f"{model_name}.onnx",
+        'includes_scaler': scaler_params is not None
+    }
+    if labels is not None:
+        entry['labels'] = list(labels)
+    for key in ('classes', 'labels'):
+        if key in entry:
+            metadata = onx.metadata_props.add()
+            metadata.key, metadata.value = key, json.dumps(entry[key])
+    (directory / entry['file']).write_bytes(onx.SerializeToString())
+    return entry
+
+
+def load_model(directory: Path, entry: dict, options=None) -> OnnxModel:
+    """An onnxruntime session for one manifest entry"""
+    import onnxruntime as ort
+
+    session = ort.InferenceSession(str(Path(directory) / entry['file']), sess_options=options or _session_options(),
+                                   providers=['CPUExecutionProvider'])
+    return OnnxModel(session, entry['classes'], entry.get('labels'), entry.get('includes_scaler', False))
+
+
+def check_parity(onnx_model: OnnxModel, model, X: np.ndarray, scaler_params=None) -> float:
+    """Largest |Δp| between a graph on raw rows X and its model on the (scaled) rows"""
+    model_input = X if scaler_params is None else (X - scaler_params[0]) / scaler_params[1]
+    return float(np.abs(onnx_model.predict_proba(X) - model.predict_proba(model_input)).max())
+
+
+def convert_group(models: dict, directory: Path, X: np.ndarray, labels=None, scaler_params=None,
+                  tolerance: float = PARITY_TOLERANCE) -> dict:
+    """
+    Export a group's models into directory, keep those whose graph matches
+    the model on the rows X to within tolerance, and write the manifest.
+    Models that can't be converted or fail the parity check are left out
+    (they keep running on their library).
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest = {
+        'manifest_version': MANIFEST_VERSION,
+        'feature_schema': FEATURE_SCHEMA_VERSION,
+        'feature_names': list(FEATURE_NAMES),
+        'models': {}
+    }
+    for model_name, model in models.items():
+        model_labels = None
+        if labels is not None:
+            mapping = labels(model_name)
+            model_labels = [mapping.get(c, f"Class_{c}") for c in np.asarray(model.classes_).tolist()]
+        try:
+            entry = export_model(model, model_name, directory, scaler_params, model_labels)
+            error = check_parity(load_model(directory, entry), model, X, scaler_params)
+        except Exception as e:
+            logger.warning(f"Not exporting {model_name}: {e}")
+            continue
+        if error > tolerance:
+            logger.warning(f"Not exporting {model_name}: max |Δp| {error:.1e} against the pickle")
+            (directory / entry['file']).unlink()
+            continue
+        entry['max_abs_error'] = error
+        manifest['models'][model_name] = entry
+    (directory / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+class OnnxBackend:
+    """
+    onnxruntime sessions for every model exported under model_base_path,
+    with their own session options. Each run uses intra_op_threads threads
+    (one suits small batches run from several threads at once) and
+    inter_op_threads for independent nodes, and graphs are optimised at the
+    given level.
+    """
+    def __init__(self, model_base_path: str = "../ml_models", intra_op_threads: int = 1,
+                 inter_op_threads: int = 1, optimization: str = 'all'):
+        self.model_base_path = Path(model_base_path)
+        self.options = _session_options(intra_op_threads, inter_op_threads, optimization)
+        self.models: Dict[str, OnnxModel] = {}
+        for directory in ("gun_shots", "wildlife"):
+            onnx_dir = self.model_base_path / directory / ONNX_DIR
+            manifest = read_manifest(onnx_dir)
+            for model_name, entry in (manifest['models'] if manifest else {}).items():
+                try:
+                    self.models[model_name] = load_model(onnx_dir, entry, self.options)
+                except Exception as e:
+                    logger.error(f"Failed to load ONNX model {model_name}: {e}")
+        logger.info(f"Loaded {len(self.models)} ONNX models")
+
+    def __contains__(self, model_name: str) -> bool:
+        return model_name in self.models
+
+    def includes_scaler(self, model_name: str) -> bool:
+        """Whether model_name's graph scales its raw input itself"""
+        return self.models[model_name].includes_scaler
+
+    def predict_proba(self, model_name: str, X: np.ndarray):
+        """(classes, probabilities) for raw feature rows X"""
+        model = self.models[model_name]
+        return model.classes_, model.predict_proba(X)
+
+
+def main():
+    from model_manager import ModelLoader, AudioClassifier
+
+    parser = argparse.ArgumentParser(description="Export pickled models to ONNX and check parity")
+    parser.add_argument('model_base_path', nargs='?', default="../ml_models")
+    parser.add_argument('--tolerance', type=float, default=PARITY_TOLERANCE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    loader = ModelLoader(model_base_path=args.model_base_path, prefer_native=False)
+    classifier = AudioClassifier(loader)
+    groups = [
+        ("gun_shots", loader.gunshot_models, lambda name: classifier.gunshot_classes,
+         loader.scaler_params.get('gunshot')),
+        ("wildlife", loader.wildlife_models, lambda name: classifier._wildlife_classes(name)[0], None),
+    ]
+    rng = np.random.default_rng(0)
+    X = (rng.standard_normal((1024, len(FEATURE_NAMES))) * 50).astype(np.float32)
+    for directory, models, labels, scaler_params in groups:
+        if not models:
+            continue
+        manifest = convert_group(models, Path(args.model_base_path) / directory / ONNX_DIR, X,
+                                 labels, scaler_params, args.tolerance)
+        for model_name, entry in manifest['models'].items():
+            print(f"{directory}/{model_name}: {entry['file']}, max |Δp| {entry['max_abs_error']:.1e}")
+
+
+if __name__ == "__main__":
+    main()
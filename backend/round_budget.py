@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Latency-budget inference for the boosted models: run only their first K
+boosting rounds, with each model's choices of K taken from an offline
+accuracy-vs-latency calibration and stepped down (or back up) at runtime to
+keep model time per request inside a budget.
+
+Calibrate on held-out feature vectors, an (N, n_features) .npy in
+FEATURE_NAMES order or the feature cache's entries, with:
+    python round_budget.py ../ml_models --features heldout.npy
+"""
+
+import argparse
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from feature_extraction import FEATURE_NAMES, FEATURE_SCHEMA_VERSION
+
+logger = logging.getLogger(__name__)
+
+CALIBRATION_FILE = "round_calibration.json"
+# Fractions of a model's rounds the calibration tries
+CALIBRATION_FRACTIONS = (0.1, 0.2, 0.3, 0.5, 0.7, 1.0)
+
+
+def model_rounds(model, compiled=None) -> Optional[int]:
+    """Boosting rounds in a model's full prediction, None if it isn't boosted"""
+    if compiled is not None:
+        return compiled.n_rounds
+    if hasattr(model, 'get_booster'):
+        best_iteration = getattr(model, 'best_iteration', None)
+        return best_iteration + 1 if best_iteration is not None else model.get_booster().num_boosted_rounds()
+    if hasattr(model, 'booster_'):
+        return getattr(model, 'best_iteration_', None) or model.booster_.current_iteration()
+    return None
+
+
+def predict_proba_rounds(model, X, rounds: int):
+    """predict_proba from only the first rounds boosting rounds of an XGBoost or LightGBM model"""
+    if hasattr(model, 'get_booster'):
+        return model.predict_proba(X, iteration_range=(0, rounds))
+    return model.predict_proba(X, num_iteration=rounds)
+
+
+def calibrate_model(model, X, compiled=None, fractions=CALIBRATION_FRACTIONS, repeats=50) -> List[Dict]:
+    """
+    Accuracy and latency of a boosted model cut to fractions of its rounds,
+    fewest rounds first. Each point holds rounds, agreement (share of rows of X
+    whose top class matches the full model's), mean_abs_error of the
+    probabilities, and latency_ms for one row (on the compiled ensemble when
+    given, as single rows run at serving time).
+    """
+    total = model_rounds(model, compiled)
+    if total is None:
+        return []
+    full = predict_proba_rounds(model, X, total)
+    row = X[:1]
+    points = []
+    for rounds in sorted({max(1, int(round(total * fraction))) for fraction in fractions} | {total}):
+        probabilities = predict_proba_rounds(model, X, rounds)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            if compiled is not None:
+                compiled.predict_proba(row, n_rounds=rounds)
+            else:
+                predict_proba_rounds(model, row, rounds)
+        points.append({
+            'rounds': rounds,
+            'agreement': float((probabilities.argmax(axis=1) == full.argmax(axis=1)).mean()),
+            'mean_abs_error': float(np.abs(probabilities - full).mean()),
+            'latency_ms': 1000 * (time.perf_counter() - start) / repeats
+        })
+    return points
+
+
+def choose_levels(points: List[Dict], min_agreement: float = 0.97) -> List[int]:
+    """
+    Rounds a model may run at, full model first: the calibrated truncations
+    that agree with it on at least min_agreement of rows and are faster than
+    the level above them
+    """
+    levels, latency = [], None
+    for point in sorted(points, key=lambda point: -point['rounds']):
+        if point['agreement'] < min_agreement or (latency is not None and point['latency_ms'] >= latency):
+            continue
+        levels.append(point['rounds'])
+        latency = point['latency_ms']
+    return levels
+
+
+def write_calibration(model_base_path, calibration: Dict, n_rows: int) -> Path:
+    path = Path(model_base_path) / CALIBRATION_FILE
+    path.write_text(json.dumps({
+        'feature_schema': FEATURE_SCHEMA_VERSION,
+        'rows': n_rows,
+        'models': calibration
+    }, indent=2))
+    return path
+
+
+def read_calibration(model_base_path) -> Dict:
+    """
+    {model_name: calibration points} from model_base_path, empty if there is
+    no calibration or it was run on a different feature schema
+    """
+    path = Path(model_base_path) / CALIBRATION_FILE
+    if not path.exists():
+        return {}
+    calibration = json.loads(path.read_text())
+    if calibration.get('feature_schema') != FEATURE_SCHEMA_VERSION:
+        logger.warning(f"Ignoring {path}: calibrated on a different feature schema")
+        return {}
+    return calibration['models']
+
+
+class RoundBudget:
+    """
+    How many boosting rounds each calibrated model runs.
+
+    observe() is given the model time of each request (or micro-batch). When
+    its moving average goes over budget seconds, every model steps down to
+    its next calibrated level. When the average falls under headroom * budget,
+    they step back up. Steps are at least cooldown observations apart. Level 0
+    is the full models.
+    """
+    def __init__(self, levels: Dict[str, List[int]], budget: float, headroom: float = 0.5,
+                 smoothing: float = 0.2, cooldown: int = 20):
+        self.levels = {model_name: list(rounds) for model_name, rounds in levels.items() if len(rounds) > 1}
+        self.budget = budget
+        self.headroom = headroom
+        self.smoothing = smoothing
+        self.cooldown = cooldown
+        self.level = 0
+        self.max_level = max((len(rounds) - 1 for rounds in self.levels.values()), default=0)
+
+        self._lock = threading.Lock()
+        self._average = None
+        self._since_step = 0
+        self.observations = 0
+        self.steps_down = 0
+        self.steps_up = 0
+
+    @classmethod
+    def from_calibration(cls, calibration: Dict, budget: float, min_agreement: float = 0.97, **kwargs):
+        return cls({model_name: choose_levels(points, min_agreement) for model_name, points in calibration.items()},
+                   budget, **kwargs)
+
+    def rounds(self, model_name: str) -> Optional[int]:
+        """Rounds to run model_name at right now, None for its full prediction"""
+        levels = self.levels.get(model_name)
+        level = self.level
+        if not levels or level == 0:
+            return None
+        return levels[min(level, len(levels) - 1)]
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self.observations += 1
+            self._since_step += 1
+            if self._average is None:
+                self._average = seconds
+            else:
+                self._average += self.smoothing * (seconds - self._average)
+            if self._since_step < self.cooldown:
+                return
+            if self._average > self.budget and self.level < self.max_level:
+                self.level += 1
+                self.steps_down += 1
+                self._since_step = 0
+                logger.warning(f"Model time {self._average * 1000:.0f} ms is over budget, "
+                               f"cutting boosting rounds to level {self.level}")
+            elif self._average < self.headroom * self.budget and self.level > 0:
+                self.level -= 1
+                self.steps_up += 1
+                self._since_step = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'budget_ms': self.budget * 1000,
+                'average_ms': None if self._average is None else self._average * 1000,
+                'level': self.level,
+                'max_level': self.max_level,
+                'observations': self.observations,
+                'steps_down': self.steps_down,
+                'steps_up': self.steps_up,
+                'rounds': {model_name: self.rounds(model_name) or levels[0]
+                           for model_name, levels in self.levels.items()}
+            }
+
+
+def _held_out_features(features: List[str], feature_cache: Optional[str]) -> np.ndarray:
+    rows = [np.load(path).reshape(-1, len(FEATURE_NAMES)) for path in features]
+    if feature_cache:
+        rows += [np.load(path).reshape(-1, len(FEATURE_NAMES)) for path in sorted(Path(feature_cache).glob('*.npy'))]
+    if not rows:
+        raise SystemExit("No held-out features: pass --features and/or --feature-cache")
+    X = np.concatenate(rows).astype(np.float32)
+    # All-NaN rows are windows the silence gate skipped
+    return X[~np.isnan(X).all(axis=1)]
+
+
+def main():
+    from model_manager import ModelLoader, AudioClassifier
+
+    parser = argparse.ArgumentParser(description="Calibrate truncated boosting rounds against held-out features")
+    parser.add_argument('model_base_path', nargs='?', default="../ml_models")
+    parser.add_argument('--features', nargs='*', default=[], help=".npy files of (N, n_features) feature rows")
+    parser.add_argument('--feature-cache', help="feature cache directory to read cached vectors from")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    X = _held_out_features(args.features, args.feature_cache)
+    loader = ModelLoader(model_base_path=args.model_base_path, compile_trees=True)
+    classifier = AudioClassifier(loader)
+    calibration = {}
+    for group, models in (('gunshot', loader.gunshot_models), ('wildlife', loader.wildlife_models)):
+        model_input = classifier._scale_gunshot(X) if group == 'gunshot' else X
+        for model_name, model in models.items():
+            points = calibrate_model(model, model_input, loader.compiled_models.get(model_name))
+            if not points:
+                continue
+            calibration[model_name] = points
+            for point in points:
+                print(f"{model_name}: {point['rounds']:4d} rounds, agreement {point['agreement']:.3f}, "
+                      f"mean |Δp| {point['mean_abs_error']:.4f}, {point['latency_ms']:.2f} ms/row")
+    path = write_calibration(args.model_base_path, calibration, len(X))
+    print(f"Wrote {path} from {len(X)} held-out rows")
+
+
+if __name__ == "__main__":
+    main()
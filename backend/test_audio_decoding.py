@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test in-memory decoding of uploads: format sniffing and bytes/file-object/path inputs
+"""
+
+import io
+import os
+import tempfile
+import numpy as np
+import soundfile as sf
+from feature_extraction import (
+    AudioPreprocessor, decode_audio, decode_audio_windows, plan_decode, sniff_audio_format
+)
+from test_feature_parity import make_test_audio, SR
+
+
+def encode(y, audio_format, subtype=None):
+    buffer = io.BytesIO()
+    sf.write(buffer, y, SR, format=audio_format, subtype=subtype)
+    return buffer.getvalue()
+
+
+def test_sniff_audio_format():
+    y = make_test_audio(1)
+    assert sniff_audio_format(encode(y, 'WAV')) == 'wav'
+    assert sniff_audio_format(encode(y, 'FLAC')) == 'flac'
+    assert sniff_audio_format(encode(y, 'OGG')) == 'ogg'
+    assert sniff_audio_format(b'ID3\x04\x00' + bytes(16)) == 'mp3'
+    assert sniff_audio_format(b'\x00\x00\x00\x20ftypM4A ') == 'm4a'
+    assert sniff_audio_format(b'not audio at all') is None
+    print("✅ Containers are identified from their headers")
+
+
+def test_decode_sources_agree():
+    stereo = np.stack([make_test_audio(2), make_test_audio(2, seed=1)]).T
+    data = encode(stereo, 'FLAC', 'PCM_24')
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "clip.flac")
+        with open(path, 'wb') as f:
+            f.write(data)
+        from_path, sr = decode_audio(path)
+
+    for source in [data, bytearray(data), memoryview(data), io.BytesIO(data)]:
+        decoded, decoded_sr = decode_audio(source)
+        assert decoded_sr == sr == SR
+        assert decoded.shape == (2, len(stereo)) and decoded.dtype == np.float32
+        assert np.array_equal(decoded, from_path)
+    print("✅ Bytes, buffers and paths decode identically")
+
+
+def test_features_from_bytes():
+    processor = AudioPreprocessor()
+    y = make_test_audio(3)
+    data = encode(y, 'WAV', 'FLOAT')
+
+    expected = processor.extract_features_enhanced(y[None, :], SR)
+    assert np.array_equal(processor.extract_features_enhanced(data), expected)
+    assert np.array_equal(processor.extract_features_enhanced(io.BytesIO(data)), expected)
+    assert np.allclose(processor.extract_features_streaming(data, block_seconds=1), expected,
+                       rtol=1e-3, atol=1e-4)
+    print("✅ Features extracted from bytes match the decoded waveform")
+
+
+def test_plan_decode():
+    assert plan_decode(100 * SR, SR, 30, 'center') == [(35 * SR, 65 * SR)]
+    assert plan_decode(100 * SR, SR, 30, 'head') == [(0, 30 * SR)]
+    assert plan_decode(100 * SR, SR, 30, 'full') == [(0, 100 * SR)]
+    assert plan_decode(100 * SR, SR, 30, 'segment') == [(i * 30 * SR, (i + 1) * 30 * SR) for i in range(3)]
+    assert plan_decode(1000 * SR, SR, 30, 'segment', max_segments=2) == [(0, 30 * SR), (960 * SR, 990 * SR)]
+    # Short files are read whole and never padded
+    assert plan_decode(10 * SR, SR, 30, 'center') == [(0, 10 * SR)]
+    print("✅ Decode plans pick the expected frame ranges")
+
+
+def test_windowed_decode_matches_crop():
+    y = make_test_audio(12)
+    data = encode(y, 'FLAC', 'PCM_24')
+    full, _ = decode_audio(data)
+
+    windows, sr = decode_audio_windows(data, 5, 'center')
+    start = (len(y) - 5 * SR) // 2
+    assert sr == SR and len(windows) == 1
+    assert np.array_equal(windows[0], full[:, start:start + 5 * SR])
+
+    # The centre window matches handle_duration's crop of the fully decoded clip
+    processor = AudioPreprocessor(target_duration=5, decode_window='center', backend='numpy')
+    waveform, _ = processor.load_audio(data)
+    assert np.array_equal(waveform, processor.handle_duration(full, SR))
+
+    segments, _ = processor.load_audio_segments(data)
+    assert [segment.shape[-1] for segment in segments] == [5 * SR, 5 * SR]
+    assert np.array_equal(segments[1], full[:, 5 * SR:10 * SR])
+    print("✅ Windowed decoding reads exactly the planned frames")
+
+
+def test_undecodable_bytes_name_the_error():
+    try:
+        decode_audio(b'garbage' * 100)
+    except ValueError as e:
+        assert str(e).startswith("Could not decode audio") and len(str(e)) > len("Could not decode audio"), e
+    else:
+        raise AssertionError("garbage bytes decoded")
+    print("✅ Undecodable uploads raise a descriptive error")
+
+
+if __name__ == "__main__":
+    test_sniff_audio_format()
+    test_decode_sources_agree()
+    test_features_from_bytes()
+    test_plan_decode()
+    test_windowed_decode_matches_crop()
+    test_undecodable_bytes_name_the_error()
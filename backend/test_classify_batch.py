@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Test AudioClassifier.classify_batch's columnar results against the per-row API
+"""
+
+import time
+import numpy as np
+from feature_extraction import FEATURE_NAMES
+from model_manager import ModelLoader, AudioClassifier
+
+
+def test_classify_batch_matches_per_row():
+    classifier = AudioClassifier(ModelLoader(model_base_path="../ml_models"))
+    rng = np.random.default_rng(0)
+    X = (rng.standard_normal((200, len(FEATURE_NAMES))) * 50).astype(np.float32)
+
+    batch = classifier.classify_batch(X)
+    assert set(batch) == set(classifier.model_loader.gunshot_models) | set(classifier.model_loader.wildlife_models)
+    for model_name, output in batch.items():
+        n_classes = len(output['labels'])
+        assert output['probabilities'].shape == (len(X), n_classes)
+        assert output['predicted'].shape == output['confidence'].shape == (len(X),)
+        assert np.array_equal(output['predicted'], output['probabilities'].argmax(axis=1))
+
+    for row in (0, 57, 199):
+        gunshot, wildlife = classifier.row_predictions(batch, row)
+        for expected, actual in ((classifier.predict_gunshot(X[row]), gunshot),
+                                 (classifier.predict_wildlife(X[row]), wildlife)):
+            assert expected.keys() == actual.keys()
+            for model_name, result in expected.items():
+                assert actual[model_name]['prediction'] == result['prediction'], (model_name, row)
+                assert np.isclose(actual[model_name]['confidence'], result['confidence'], atol=1e-5)
+                assert actual[model_name]['model_type'] == result['model_type']
+    print(f"✅ classify_batch matches predict_gunshot/predict_wildlife for {len(batch)} models")
+
+
+def test_classify_batch_shape_and_speed():
+    classifier = AudioClassifier(ModelLoader(model_base_path="../ml_models"))
+    try:
+        classifier.classify_batch(np.zeros((4, 12)))
+        raise AssertionError("Expected a ValueError for the wrong feature count")
+    except ValueError:
+        pass
+
+    rng = np.random.default_rng(1)
+    X = (rng.standard_normal((20000, len(FEATURE_NAMES))) * 50).astype(np.float32)
+    start = time.perf_counter()
+    classifier.classify_batch(X, groups=('gunshot',))
+    batch_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for row in X[:200]:
+        classifier.predict_gunshot(row)
+    row_time = (time.perf_counter() - start) / 200
+    print(f"✅ {len(X)} rows in {batch_time:.2f}s batched; one at a time would take ~{row_time * len(X):.1f}s")
+
+
+if __name__ == "__main__":
+    test_classify_batch_matches_per_row()
+    test_classify_batch_shape_and_speed()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test the ensemble evaluation policies: cascades stop at the first confident
+model, group-first policies skip the other group once a clip is confirmed,
+and batched requests skip the same models as single ones
+"""
+
+import numpy as np
+from ensemble_policy import make_policy
+from feature_extraction import FEATURE_NAMES
+from inference_batcher import MicroBatcher
+from model_manager import ModelLoader, AudioClassifier
+
+
+class SignModel:
+    """Confident (0.95) on rows whose first feature is positive, unsure (0.6) otherwise"""
+    classes_ = np.array([0, 1, 2, 3])
+
+    def __init__(self, top=1):
+        self.top = top
+        self.calls = 0
+
+    def predict_proba(self, X):
+        self.calls += 1
+        confidence = np.where(np.asarray(X)[:, 0] > 0, 0.95, 0.6)
+        probabilities = np.tile((1 - confidence)[:, None] / 3, (1, 4))
+        probabilities[:, self.top] = confidence
+        return probabilities
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def make_classifier(policy, gunshot_top=1):
+    loader = ModelLoader(model_base_path="../ml_models", load=False)
+    loader.gunshot_models = {'sign_gunshot': SignModel(top=gunshot_top)}
+    loader.wildlife_models = {'a_esc50': SignModel(top=0), 'b_esc50': SignModel(top=2)}
+    return AudioClassifier(loader, policy=policy)
+
+
+def feature_row(first):
+    row = np.ones(len(FEATURE_NAMES), dtype=np.float32)
+    row[0] = first
+    return row
+
+
+def test_cascade_stops_at_confident_model():
+    classifier = make_classifier(make_policy('cascade', threshold=0.9, order=['a_esc50']))
+    result = classifier.classify_audio(feature_row(1.0))
+    assert list(result['wildlife_predictions']) == ['a_esc50'] and not result['gunshot_predictions']
+    assert sorted(result['skipped_models']) == ['b_esc50', 'sign_gunshot'], result['skipped_models']
+    assert result['best_result']['best_model'] == 'a_esc50'
+
+    result = classifier.classify_audio(feature_row(-1.0))
+    assert result['total_models'] == 3 and result['skipped_models'] == []
+
+    stats = classifier.policy.stats()
+    assert stats['clips'] == 2 and stats['evaluations'] == 4 and stats['skipped'] == 2, stats
+    print(f"✅ Cascade skipped {stats['skipped_fraction']:.0%} of model evaluations")
+
+
+def test_group_first_policies():
+    classifier = make_classifier(make_policy('gunshot-first', threshold=0.9))
+    confirmed = classifier.classify_audio(feature_row(1.0))
+    assert confirmed['best_result']['best_prediction'] == 'Gunshot'
+    assert sorted(confirmed['skipped_models']) == ['a_esc50', 'b_esc50'] and not confirmed['wildlife_predictions']
+    unsure = classifier.classify_audio(feature_row(-1.0))
+    assert unsure['skipped_models'] == [] and len(unsure['wildlife_predictions']) == 2
+
+    # A confident gunshot model that isn't predicting a gunshot doesn't confirm one
+    quiet = make_classifier(make_policy('gunshot-first', threshold=0.9), gunshot_top=0)
+    assert quiet.classify_audio(feature_row(1.0))['skipped_models'] == []
+
+    reverse = make_classifier(make_policy('wildlife-first', threshold=0.9))
+    result = reverse.classify_audio(feature_row(1.0))
+    assert result['skipped_models'] == ['sign_gunshot'] and not result['gunshot_predictions']
+    print("✅ Gunshot-first and wildlife-first skip the other group once a clip is confirmed")
+
+
+def test_batched_rows_skip_like_single_requests():
+    rows = np.stack([feature_row(first) for first in (1.0, -1.0, 2.0, -3.0, 0.5)])
+    for name in ('all', 'cascade', 'gunshot-first'):
+        # A fixed cascade order, so both classifiers try the models in the same order
+        order = ['a_esc50', 'sign_gunshot', 'b_esc50']
+        single = make_classifier(make_policy(name, threshold=0.9, order=order))
+        batched = make_classifier(make_policy(name, threshold=0.9, order=order))
+        results = batched.classify_rows(rows)
+        # Each stage runs once over the rows still undecided
+        calls = [model.calls for model in batched.model_loader.wildlife_models.values()]
+        assert max(calls) == 1, (name, calls)
+        for row, (gunshot, wildlife, skipped) in zip(rows, results):
+            expected = single.classify_audio(row)
+            assert sorted(skipped) == sorted(expected['skipped_models']), (name, skipped)
+            assert gunshot.keys() == expected['gunshot_predictions'].keys()
+            assert wildlife.keys() == expected['wildlife_predictions'].keys()
+        batcher = MicroBatcher(batched)  # not started: the caller's thread classifies
+        assert batcher.classify_audio(rows[0])['skipped_models'] == single.classify_audio(rows[0])['skipped_models']
+    print("✅ Batched rows skip the same models as single requests")
+
+
+if __name__ == "__main__":
+    test_cascade_stops_at_confident_model()
+    test_group_first_policies()
+    test_batched_rows_skip_like_single_requests()
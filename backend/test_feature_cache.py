@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test the two-tier content-addressed feature cache
+"""
+
+import os
+import tempfile
+import numpy as np
+from feature_cache import FeatureCache
+from feature_extraction import FEATURE_NAMES
+
+
+def make_features(seed):
+    rng = np.random.default_rng(seed)
+    return dict(zip(FEATURE_NAMES, rng.standard_normal(len(FEATURE_NAMES)).astype(np.float32)))
+
+
+def test_keys():
+    audio = b"RIFF....WAVEfmt some audio"
+    key = FeatureCache.make_key(audio, target_sr=22050, target_duration=30)
+    assert key == FeatureCache.make_key(audio, target_duration=30, target_sr=22050)
+    assert key != FeatureCache.make_key(audio + b"!", target_sr=22050, target_duration=30)
+    assert key != FeatureCache.make_key(audio, target_sr=16000, target_duration=30)
+    print("✅ Keys depend on the audio bytes and the extractor configuration")
+
+
+def test_memory_and_disk_tiers():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = FeatureCache(cache_dir=cache_dir, memory_entries=2)
+        features = make_features(0)
+        key = FeatureCache.make_key(b"clip", target_sr=22050)
+
+        assert cache.get(key) is None
+        cache.put(key, features)
+        cached = cache.get(key)
+        assert list(cached.keys()) == FEATURE_NAMES
+        assert all(np.float32(cached[name]) == features[name] for name in FEATURE_NAMES)
+
+        # A fresh cache over the same directory (e.g. after a restart) is served from disk
+        restarted = FeatureCache(cache_dir=cache_dir, memory_entries=2)
+        assert restarted.get(key) is not None
+        assert restarted.get(key) is not None
+        stats = restarted.stats()
+        assert stats['disk_hits'] == 1 and stats['memory_hits'] == 1 and stats['misses'] == 0
+
+        stats = cache.stats()
+        assert stats['misses'] == 1 and stats['memory_hits'] == 1
+        assert stats['hit_ratio'] == 0.5
+        print(f"✅ Memory and disk tiers: {stats}")
+
+
+def test_disk_eviction():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = FeatureCache(cache_dir=cache_dir, memory_entries=1)
+        cache.put("first", make_features(0))
+        entry_size = os.path.getsize(os.path.join(cache_dir, "first.npy"))
+        cache.max_bytes = 3 * entry_size
+
+        for i in range(5):
+            cache.put(f"clip_{i}", make_features(i))
+            # Age entries explicitly; keep the oldest one recently used so it survives eviction
+            os.utime(os.path.join(cache_dir, f"clip_{i}.npy"), (1000 + i, 1000 + i))
+            os.utime(os.path.join(cache_dir, "first.npy"))
+
+        assert cache.stats()['disk_bytes'] <= cache.max_bytes
+        assert sorted(os.listdir(cache_dir)) == ["clip_3.npy", "clip_4.npy", "first.npy"]
+        print("✅ Disk tier evicts least recently used entries to stay under its byte budget")
+
+
+if __name__ == "__main__":
+    test_keys()
+    test_memory_and_disk_tiers()
+    test_disk_eviction()
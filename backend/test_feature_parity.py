@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Parity check: shared spectral engine vs. the original per-feature librosa pipeline
+"""
+
+import os
+import tempfile
+import time
+import numpy as np
+import torch
+import torchaudio.transforms as T
+import librosa
+import soundfile as sf
+from feature_extraction import AudioPreprocessor
+
+SR = 22050
+
+
+def make_test_audio(duration=10, sr=SR, seed=0):
+    """Tone + noise + an impulsive burst, similar to a field recording"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(sr * duration)) / sr
+    y = 0.3 * np.sin(2 * np.pi * 440 * t) + 0.05 * rng.standard_normal(len(t))
+    y[sr * 3:sr * 3 + 200] += 0.9
+    return y.astype(np.float32)
+
+
+def legacy_features(y, sr):
+    """The pre-engine extraction: every feature recomputes its own front-end"""
+    mfccs = T.MFCC(sample_rate=sr, n_mfcc=13)(torch.from_numpy(y).unsqueeze(0)).squeeze(0).numpy()
+    delta_mfccs = librosa.feature.delta(mfccs, order=1)
+    delta2_mfccs = librosa.feature.delta(mfccs, order=2)
+    chroma = librosa.feature.chroma_stft(y=y, sr=sr)
+    mel_spec = librosa.feature.melspectrogram(y=y, sr=sr, n_mels=128)
+    contrast = librosa.feature.spectral_contrast(S=librosa.power_to_db(mel_spec), sr=sr)
+    zcr = librosa.feature.zero_crossing_rate(y=y)
+    rms = librosa.feature.rms(y=y)
+    centroid = librosa.feature.spectral_centroid(y=y, sr=sr)
+    bandwidth = librosa.feature.spectral_bandwidth(y=y, sr=sr)
+    flatness = librosa.feature.spectral_flatness(y=y)
+    onset = librosa.onset.onset_strength(y=y, sr=sr)
+
+    features = {}
+    features.update({f'mfcc_{i}_mean': np.mean(mfccs[i]) for i in range(13)})
+    features.update({f'mfcc_{i}_std': np.std(mfccs[i]) for i in range(13)})
+    features.update({f'delta_mfcc_{i}_mean': np.mean(delta_mfccs[i]) for i in range(8)})
+    features.update({f'delta2_mfcc_{i}_mean': np.mean(delta2_mfccs[i]) for i in range(7)})
+    features.update({f'chroma_{i}_mean': np.mean(chroma[i]) for i in [0, 3, 6]})
+    features.update({f'contrast_{i}_mean': np.mean(contrast[i]) for i in range(6)})
+    features['zcr_mean'] = np.mean(zcr)
+    features['rms_mean'] = np.mean(rms)
+    features['rms_q75'] = np.percentile(rms, 75)
+    features['spectral_centroid_mean'] = np.mean(centroid)
+    features['spectral_centroid_std'] = np.std(centroid)
+    features['spectral_bandwidth_mean'] = np.mean(bandwidth)
+    features['spectral_bandwidth_std'] = np.std(bandwidth)
+    features['spectral_flatness_mean'] = np.mean(flatness)
+    features['onset_strength_mean'] = np.mean(onset)
+    features['onset_strength_max'] = np.max(onset)
+    return features
+
+
+def assert_close(expected, actual, names, rtol=1e-4, atol=1e-5, label=""):
+    worst = 0.0
+    for name in names:
+        diff = abs(float(expected[name]) - float(actual[name]))
+        worst = max(worst, diff / (abs(float(expected[name])) + atol))
+        assert np.isclose(float(actual[name]), float(expected[name]), rtol=rtol, atol=atol), \
+            f"{label}{name}: expected {expected[name]}, got {actual[name]}"
+    print(f"✅ {label}all {len(names)} features match (worst relative error {worst:.2e})")
+
+
+def test_engine_matches_legacy():
+    processor = AudioPreprocessor()
+    y = make_test_audio()
+    waveform = torch.from_numpy(y).unsqueeze(0)
+
+    # Warm up numba/FFT caches so the timings compare steady-state cost
+    legacy_features(y, SR)
+    processor.extract_features_enhanced(waveform, SR)
+
+    start = time.time()
+    expected = legacy_features(y, SR)
+    legacy_time = time.time() - start
+
+    start = time.time()
+    actual = processor.extract_features_enhanced(waveform, SR)
+    engine_time = time.time() - start
+
+    assert actual is not None
+    assert list(actual.keys()) == processor.get_feature_names()
+    assert_close(expected, actual, processor.get_feature_names())
+    print(f"Legacy: {legacy_time:.3f}s, engine: {engine_time:.3f}s")
+
+
+def test_batch_matches_single_clip():
+    processor = AudioPreprocessor()
+    names = processor.get_feature_names()
+    # Mixed lengths exercise bucketing, zero padding and per-clip frame masks
+    clips = [make_test_audio(duration, seed=i) for i, duration in enumerate([10, 9.3, 4, 2.5, 10, 0.7])]
+
+    start = time.time()
+    batch = processor.extract_features_batch(clips, SR)
+    batch_time = time.time() - start
+
+    assert batch.shape == (len(clips), 60)
+    start = time.time()
+    for i, y in enumerate(clips):
+        single = processor.extract_features_enhanced(torch.from_numpy(y).unsqueeze(0), SR)
+        assert_close(single, dict(zip(names, batch[i])), names, label=f"clip {i}: ")
+    print(f"Batch: {batch_time:.3f}s, one at a time: {time.time() - start:.3f}s")
+
+
+def test_numpy_backend_matches_torch():
+    torch_processor = AudioPreprocessor(backend='torch')
+    numpy_processor = AudioPreprocessor(backend='numpy')
+    names = torch_processor.get_feature_names()
+
+    for sr in [SR, 44100, 48000]:
+        y = make_test_audio(5, sr=sr)
+        expected = torch_processor.extract_features_enhanced(torch.from_numpy(y).unsqueeze(0), sr)
+        actual = numpy_processor.extract_features_enhanced(y[None, :], sr)
+        # Documented tolerance of the numpy backend
+        assert_close(expected, actual, names, rtol=1e-3, atol=1e-4, label=f"numpy backend @ {sr} Hz: ")
+
+    # Resampling uses a polyphase filter instead of torchaudio's sinc kernel
+    waveform, new_sr = numpy_processor.resample_audio(make_test_audio(2, sr=48000)[None, :], 48000)
+    assert new_sr == SR and isinstance(waveform, np.ndarray)
+    assert abs(waveform.shape[-1] - 2 * SR) <= 1
+
+
+def test_streaming_matches_in_memory():
+    processor = AudioPreprocessor()
+    names = processor.get_feature_names()
+    # Stereo, and a length that is not a multiple of either hop size
+    y = make_test_audio(12.3)
+    stereo = np.stack([y, make_test_audio(12.3, seed=1)])
+    expected = processor.extract_features_enhanced(stereo, SR)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "long.wav")
+        sf.write(path, stereo.T, SR, subtype='FLOAT')
+        # Small blocks so that frames, delta windows and onset lags straddle block edges
+        for block_seconds in [1, 5]:
+            actual = processor.extract_features_streaming(path, block_seconds=block_seconds)
+            assert actual is not None
+            assert list(actual.keys()) == names
+            # Documented streaming tolerance (rms_q75 comes from a histogram sketch)
+            assert_close(expected, actual, names, rtol=1e-3, atol=1e-4,
+                         label=f"streaming, {block_seconds}s blocks: ")
+
+
+if __name__ == "__main__":
+    test_engine_matches_legacy()
+    test_batch_matches_single_clip()
+    test_numpy_backend_matches_torch()
+    test_streaming_matches_in_memory()
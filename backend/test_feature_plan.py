@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test feature plans: partial extraction and plans derived from the loaded models
+"""
+
+import io
+import numpy as np
+import soundfile as sf
+from sklearn.ensemble import RandomForestClassifier
+from feature_extraction import AudioPreprocessor, FeaturePlan, FEATURE_NAMES
+from model_manager import ModelLoader
+from test_feature_parity import make_test_audio, SR
+
+
+def test_partial_plan_matches_full_extraction():
+    y = make_test_audio(3)
+    full = AudioPreprocessor(backend='numpy').extract_features_enhanced(y[None, :], SR)
+
+    plans = [
+        ['rms_mean', 'zcr_mean'],
+        ['mfcc_2_std', 'delta_mfcc_4_mean', 'delta2_mfcc_1_mean'],
+        ['chroma_3_mean', 'contrast_2_mean', 'spectral_bandwidth_std', 'onset_strength_max'],
+        FEATURE_NAMES,
+    ]
+    for names in plans:
+        plan = FeaturePlan(names)
+        processor = AudioPreprocessor(backend='numpy', feature_plan=plan)
+        features = processor.extract_features_enhanced(y[None, :], SR)
+        selected = np.isin(FEATURE_NAMES, names)
+        assert np.array_equal(features[selected], full[selected]), names
+        assert np.isnan(features[~selected]).all(), names
+
+        # Clips of different lengths share a padded batch
+        clips = [y[:SR], y]
+        batch = processor.extract_features_batch(clips, SR)
+        assert np.allclose(batch[1][selected], full[selected], rtol=1e-5, atol=1e-6)
+    print("✅ Partial plans reproduce the full extraction for the features they keep")
+
+
+def test_streaming_follows_the_plan():
+    buffer = io.BytesIO()
+    sf.write(buffer, make_test_audio(4), SR, format='WAV', subtype='FLOAT')
+    full = AudioPreprocessor(backend='numpy').extract_features_streaming(buffer.getvalue(), block_seconds=1)
+
+    for names in [['rms_q75', 'zcr_mean'], ['mfcc_2_std', 'delta2_mfcc_1_mean'],
+                  ['chroma_3_mean', 'contrast_2_mean', 'spectral_flatness_mean', 'onset_strength_max']]:
+        processor = AudioPreprocessor(backend='numpy', feature_plan=FeaturePlan(names))
+        features = processor.extract_features_streaming(buffer.getvalue(), block_seconds=1)
+        selected = np.isin(FEATURE_NAMES, names)
+        assert np.array_equal(features[selected], full[selected]), names
+        assert np.isnan(features[~selected]).all(), names
+    print("✅ Streamed extraction computes only the planned features")
+
+
+def test_plan_intermediates():
+    assert FeaturePlan(['rms_mean']).stft is False
+    assert FeaturePlan(['delta_mfcc_4_mean']).n_delta == 5
+    assert FeaturePlan(['spectral_bandwidth_mean']).centroid
+    assert FeaturePlan(['onset_strength_mean']).mel and not FeaturePlan(['chroma_0_mean']).mel
+    assert FeaturePlan().signature == 'full' and FeaturePlan.for_features([]).is_full
+    assert FeaturePlan(['zcr_mean']).signature != FeaturePlan(['rms_mean']).signature
+    try:
+        FeaturePlan(['not_a_feature'])
+        assert False, "unknown features should be rejected"
+    except ValueError:
+        pass
+    print("✅ Plans enable only the intermediates their features need")
+
+
+def test_plan_from_models():
+    loader = ModelLoader(model_base_path="../ml_models")
+    # The shipped gunshot XGBoost model splits on every column
+    assert loader.required_features() == list(FEATURE_NAMES)
+
+    # A forest of stumps reads only the columns it splits on
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((200, len(FEATURE_NAMES)))
+    labels = (X[:, FEATURE_NAMES.index('rms_mean')] + X[:, FEATURE_NAMES.index('mfcc_3_std')] > 0).astype(int)
+    forest = RandomForestClassifier(n_estimators=5, max_depth=1, max_features=None, random_state=0).fit(X, labels)
+    used = set(np.asarray(FEATURE_NAMES)[ModelLoader._used_columns(forest)])
+    assert used and used <= {'rms_mean', 'mfcc_3_std'}, used
+
+    loader.gunshot_models, loader.wildlife_models = {}, {'stumps': forest}
+    plan = FeaturePlan.for_features(loader.required_features())
+    assert set(plan.names) == used
+    assert plan.mfcc_frontend == ('mfcc_3_std' in used) and not plan.stft
+    print(f"✅ A different model set gets a different plan: {plan.names}")
+
+
+if __name__ == "__main__":
+    test_partial_plan_matches_full_extraction()
+    test_streaming_follows_the_plan()
+    test_plan_intermediates()
+    test_plan_from_models()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Test the FeatureVector type and the folded scaler used on the classify path
+"""
+
+import pickle
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+from feature_extraction import FEATURE_NAMES, FeatureVector
+from model_manager import ModelLoader
+
+
+def test_feature_vector():
+    values = np.arange(len(FEATURE_NAMES), dtype=np.float64)
+    vector = FeatureVector(values)
+
+    assert vector.dtype == np.float32 and vector.shape == (len(FEATURE_NAMES),)
+    assert vector.keys() == FEATURE_NAMES
+    assert vector['rms_q75'] == FEATURE_NAMES.index('rms_q75')
+    assert FeatureVector.from_mapping(dict(vector.items())).tolist() == vector.tolist()
+
+    # Derived arrays drop the schema; pickling (e.g. to worker processes) keeps it
+    assert type(vector * 2) is np.ndarray and type(vector[:5]) is np.ndarray
+    restored = pickle.loads(pickle.dumps(vector))
+    assert isinstance(restored, FeatureVector) and restored.names == vector.names
+
+    try:
+        FeatureVector(values[:-1])
+        assert False, "a short vector should be rejected"
+    except ValueError:
+        pass
+    print("✅ FeatureVector behaves as a named float32 vector")
+
+
+def test_folded_scaler_matches_transform():
+    rng = np.random.default_rng(0)
+    train = pd.DataFrame(rng.normal(3.0, 2.0, (100, len(FEATURE_NAMES))), columns=FEATURE_NAMES)
+    scaler = StandardScaler().fit(train)
+    features = FeatureVector(rng.normal(3.0, 2.0, len(FEATURE_NAMES)))
+
+    mean, scale = ModelLoader._fold_scaler(scaler)
+    expected = scaler.transform(pd.DataFrame([features.to_dict()]))[0]
+    assert np.allclose((features - mean) / scale, expected, rtol=1e-5, atol=1e-5)
+
+    # A scaler fitted on another schema is folded to the identity
+    other = StandardScaler().fit(train.rename(columns={FEATURE_NAMES[0]: 'other_feature'}))
+    mean, scale = ModelLoader._fold_scaler(other)
+    assert not mean.any() and (scale == 1).all()
+    print("✅ Folded scaler matches StandardScaler.transform")
+
+
+if __name__ == "__main__":
+    test_feature_vector()
+    test_folded_scaler_matches_transform()
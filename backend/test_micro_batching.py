@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test that the micro-batcher groups concurrent requests and returns the same
+predictions as calling the classifier directly
+"""
+
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from feature_extraction import FEATURE_NAMES
+from inference_batcher import MicroBatcher
+from model_manager import ModelLoader, AudioClassifier
+
+
+def make_classifier():
+    return AudioClassifier(ModelLoader(model_base_path="../ml_models"))
+
+
+def feature_rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal((n, len(FEATURE_NAMES))) * 50).astype(np.float32)
+
+
+def assert_same_predictions(batched, direct):
+    assert batched.keys() == direct.keys()
+    for model_name, result in direct.items():
+        assert batched[model_name]['prediction'] == result['prediction'], model_name
+        assert np.isclose(batched[model_name]['confidence'], result['confidence'], atol=1e-5), model_name
+
+
+def test_concurrent_requests_share_batches():
+    classifier = make_classifier()
+    batcher = MicroBatcher(classifier, max_batch=32, max_delay=0.05)
+    batcher.start()
+    rows = feature_rows(64)
+    try:
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            batched = list(pool.map(batcher.classify_audio, rows))
+    finally:
+        batcher.stop()
+
+    for row, result in zip(rows, batched):
+        direct = classifier.classify_audio(row)
+        assert result['success'] and result['total_models'] == direct['total_models']
+        assert_same_predictions(result['gunshot_predictions'], direct['gunshot_predictions'])
+        assert result['best_result']['best_prediction'] == direct['best_result']['best_prediction']
+
+    stats = batcher.stats()
+    assert stats['rows'] == len(rows) and stats['batches'] < len(rows), stats
+    assert sum(stats['batch_size_histogram'].values()) == stats['batches']
+    assert sum(stats['queue_depth_histogram'].values()) == len(rows)
+    assert stats['queue_depth'] == 0
+    print(f"✅ {len(rows)} concurrent requests ran in {stats['batches']} batches "
+          f"(mean {stats['mean_batch_size']:.1f} rows, histogram {stats['batch_size_histogram']})")
+
+
+def test_lone_request_and_fallback():
+    classifier = make_classifier()
+    row = feature_rows(1, seed=1)[0]
+
+    # Not started: the caller's thread classifies directly
+    idle = MicroBatcher(classifier)
+    assert_same_predictions(idle.predict_gunshot(row), classifier.predict_gunshot(row))
+
+    batcher = MicroBatcher(classifier, max_batch=32, max_delay=0.005)
+    batcher.start()
+    try:
+        start = time.perf_counter()
+        result = batcher.predict_gunshot(row)
+        elapsed = time.perf_counter() - start
+    finally:
+        batcher.stop()
+    assert_same_predictions(result, classifier.predict_gunshot(row))
+    assert batcher.stats()['batch_size_histogram'] == {'1': 1}
+    print(f"✅ A lone request is flushed after the latency threshold ({elapsed * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    test_concurrent_requests_share_batches()
+    test_lone_request_and_fallback()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Test that a request's models run concurrently under a deadline: a model that
+misses it is reported as timed out while the others are returned without
+waiting for it
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from feature_extraction import FEATURE_NAMES
+from ensemble_policy import make_policy
+from inference_batcher import MicroBatcher
+from model_manager import ModelLoader, AudioClassifier
+
+
+class SlowModel:
+    """A wildlife model that takes delay seconds per call"""
+    classes_ = np.array([0, 1])
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def predict_proba(self, X):
+        time.sleep(self.delay)
+        return np.tile([0.25, 0.75], (len(X), 1))
+
+    def predict(self, X):
+        return self.predict_proba(X).argmax(axis=1)
+
+
+def make_classifier(delay, **kwargs):
+    loader = ModelLoader(model_base_path="../ml_models")
+    loader.wildlife_models['slow_esc50'] = SlowModel(delay)
+    return AudioClassifier(loader, **kwargs)
+
+
+def feature_row(seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal(len(FEATURE_NAMES)) * 50).astype(np.float32)
+
+
+def test_slow_model_times_out():
+    classifier = make_classifier(0.5, model_workers=4, deadline=0.1)
+    row = feature_row()
+
+    start = time.perf_counter()
+    result = classifier.classify_audio(row)
+    elapsed = time.perf_counter() - start
+    assert elapsed < 0.4, elapsed
+
+    slow = result['wildlife_predictions']['slow_esc50']
+    assert slow['prediction'] == 'Error' and slow['timed_out'], slow
+    for model_name, prediction in result['gunshot_predictions'].items():
+        assert prediction['prediction'] != 'Error', (model_name, prediction)
+    assert result['best_result']['best_prediction'] != 'Error'
+
+    time.sleep(0.5)  # the timed-out call finishes in the background
+    stats = classifier.latency_stats()
+    assert stats['slow_esc50']['timeouts'] == 1 and stats['slow_esc50']['calls'] == 1, stats
+    assert stats['slow_esc50']['max_ms'] >= 500
+    assert all(stats[name]['calls'] == 1 for name in result['gunshot_predictions'])
+    print(f"✅ Slow model timed out; the rest returned in {elapsed * 1000:.0f} ms")
+
+
+def test_concurrent_matches_serial():
+    serial = make_classifier(0.0)
+    concurrent = make_classifier(0.0, model_workers=4, deadline=5.0)
+    row = feature_row(seed=1)
+    expected = serial.classify_audio(row)
+    result = concurrent.classify_audio(row)
+    for group in ('gunshot_predictions', 'wildlife_predictions'):
+        assert result[group].keys() == expected[group].keys()
+        for model_name, prediction in expected[group].items():
+            assert result[group][model_name]['prediction'] == prediction['prediction'], model_name
+            assert np.isclose(result[group][model_name]['confidence'], prediction['confidence']), model_name
+    print("✅ Concurrent evaluation matches running the models one after another")
+
+
+def test_batches_honour_deadline():
+    classifier = make_classifier(0.5, model_workers=4, deadline=0.1)
+    batcher = MicroBatcher(classifier, max_batch=8, max_delay=0.01)
+    batcher.start()
+    try:
+        gunshot, wildlife, _ = batcher.submit(feature_row(seed=2)).result(timeout=0.4)
+    finally:
+        batcher.stop()
+    assert wildlife['slow_esc50']['timed_out']
+    assert all(prediction['prediction'] != 'Error' for prediction in gunshot.values())
+    print("✅ Batched requests report models that miss the deadline as timed out")
+
+
+def test_timed_out_requests_free_the_pool():
+    # One pool thread shared by two concurrent requests, each with a slow model
+    classifier = make_classifier(0.4, model_workers=1, deadline=0.1)
+    with ThreadPoolExecutor(max_workers=2) as requests:
+        results = list(requests.map(classifier.classify_audio, [feature_row(seed=3), feature_row(seed=4)]))
+    assert all(result['wildlife_predictions']['slow_esc50']['timed_out'] for result in results)
+
+    # Only the slow call that had started runs on; the other request's was dropped
+    time.sleep(0.5)
+    stats = classifier.latency_stats()
+    assert stats['slow_esc50']['calls'] == 1 and stats['slow_esc50']['timeouts'] == 2, stats
+
+    # So the pool is free again for the next request
+    result = classifier.classify_audio(feature_row(seed=5))
+    for model_name, prediction in result['gunshot_predictions'].items():
+        assert prediction['prediction'] != 'Error', (model_name, prediction)
+    classifier.close()
+    print(f"✅ Calls that missed their request's deadline left the pool: {stats['slow_esc50']}")
+
+
+def test_later_stages_report_the_request_deadline():
+    # The slow wildlife model runs in the second stage, on what is left of the deadline
+    classifier = make_classifier(0.5, model_workers=4, deadline=0.2,
+                                 policy=make_policy('gunshot-first', threshold=1.01))
+    single = classifier.classify_audio(feature_row(seed=6))['wildlife_predictions']['slow_esc50']
+    (_, rows_wildlife, _), = classifier.classify_rows(feature_row(seed=6)[None, :])
+    for slow in (single, rows_wildlife['slow_esc50']):
+        assert slow['timed_out'] and slow['error'] == "Timed out after 200 ms", slow
+    classifier.close()
+    print("✅ Models timed out in a later stage report the request's deadline")
+
+
+if __name__ == "__main__":
+    test_slow_model_times_out()
+    test_concurrent_matches_serial()
+    test_batches_honour_deadline()
+    test_timed_out_requests_free_the_pool()
+    test_later_stages_report_the_request_deadline()
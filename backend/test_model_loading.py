@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Test parallel model loading, per-model load status and warm-up
+"""
+
+import shutil
+import tempfile
+from pathlib import Path
+from model_manager import ModelLoader, AudioClassifier
+
+
+def test_parallel_load_report():
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp)
+        shutil.copytree("../ml_models/gun_shots", base / "gun_shots")
+        # A corrupt wildlife model must fail on its own without stopping the others
+        (base / "wildlife").mkdir()
+        (base / "wildlife" / ModelLoader.WILDLIFE_MODEL_FILES['rf_esc50']).write_bytes(b"not a pickle")
+
+        loader = ModelLoader(model_base_path=str(base), compile_trees=True, mmap_mode='r', load=False)
+        assert loader.load_report() == {} and not loader.gunshot_models
+        loader.load_all_models()
+
+        report = loader.load_report()
+        assert report['xgboost']['state'] == 'loaded' and report['xgboost']['compiled'], report
+        assert report['rf_esc50']['state'] == 'failed' and report['rf_esc50']['error'], report
+        assert list(loader.gunshot_models) == ['xgboost'] and not loader.wildlife_models
+        assert 'gunshot' in loader.scaler_params
+        print(f"✅ Loaded in {loader.load_seconds:.2f}s; statuses: "
+              f"{ {name: status['state'] for name, status in report.items()} }")
+
+        seconds = AudioClassifier(loader).warm_up()
+        print(f"✅ Warm-up ran every model in {seconds * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    test_parallel_load_report()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test native model artifacts: export, reload and ModelLoader's preference for them
+"""
+
+import json
+import shutil
+import tempfile
+from pathlib import Path
+import numpy as np
+import lightgbm as lgb
+from sklearn.ensemble import RandomForestClassifier
+from xgboost import XGBClassifier
+from model_manager import ModelLoader
+from native_models import convert_group, load_model, read_manifest, MANIFEST_FILE
+from test_tree_engine import training_data
+
+
+def test_export_and_reload():
+    X, y = training_data(3)
+    Xb, yb = training_data(2, missing=True)
+    models = {
+        'xgb': XGBClassifier(n_estimators=20, max_depth=4).fit(X, y),
+        'lgbm_binary': lgb.LGBMClassifier(n_estimators=20, verbose=-1).fit(Xb, yb),
+        'forest': RandomForestClassifier(n_estimators=10, max_depth=6, random_state=0).fit(X, y),
+    }
+    Xt, _ = training_data(3, seed=1, missing=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        manifest = convert_group(models, Path(tmp), labels=lambda name: {0: 'a', 1: 'b', 2: 'c'})
+        assert read_manifest(tmp) == manifest
+        for name, model in models.items():
+            entry = manifest['models'][name]
+            native = load_model(tmp, entry)
+            assert np.allclose(native.predict_proba(Xt), model.predict_proba(Xt), atol=1e-6), name
+            assert np.array_equal(native.predict(Xt), model.predict(Xt)), name
+            assert entry['labels'][:2] == ['a', 'b']
+            print(f"✅ {name}: {entry['format']} artifact matches the fitted model")
+
+
+def test_loader_prefers_native_artifacts():
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp)
+        shutil.copytree("../ml_models/gun_shots", base / "gun_shots")
+        native_dir = base / "gun_shots" / "native"
+        assert (native_dir / MANIFEST_FILE).exists(), "run native_models.py on ../ml_models first"
+
+        native = ModelLoader(model_base_path=str(base))
+        pickled = ModelLoader(model_base_path=str(base), prefer_native=False)
+        assert native.load_report()['xgboost']['format'] == 'xgboost-ubj'
+        assert pickled.load_report()['xgboost']['format'] == 'pickle'
+        for params, expected in zip(native.scaler_params['gunshot'], pickled.scaler_params['gunshot']):
+            assert np.array_equal(params, expected)
+
+        X = (np.random.default_rng(0).standard_normal((32, 60)) * 50).astype(np.float32)
+        assert np.allclose(native.gunshot_models['xgboost'].predict_proba(X),
+                           pickled.gunshot_models['xgboost'].predict_proba(X), atol=1e-6)
+
+        # A manifest for another feature schema is ignored in favour of the pickles
+        manifest = json.loads((native_dir / MANIFEST_FILE).read_text())
+        manifest['feature_schema'] = -1
+        (native_dir / MANIFEST_FILE).write_text(json.dumps(manifest))
+        fallback = ModelLoader(model_base_path=str(base))
+        assert fallback.load_report()['xgboost']['format'] == 'pickle'
+        print(f"✅ Native artifacts load in {native.load_seconds:.2f}s "
+              f"(pickles {pickled.load_seconds:.2f}s); stale manifests fall back to pickles")
+
+
+def test_unreadable_artifacts_fall_back_to_pickles():
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp)
+        shutil.copytree("../ml_models/gun_shots", base / "gun_shots")
+        native_dir = base / "gun_shots" / "native"
+        manifest = json.loads((native_dir / MANIFEST_FILE).read_text())
+        X = (np.random.default_rng(1).standard_normal((32, 60)) * 50).astype(np.float32)
+        expected = ModelLoader(model_base_path=str(base), prefer_native=False).gunshot_models['xgboost']
+
+        # An artifact the installed library can't read: the pickle is loaded instead
+        (native_dir / manifest['models']['xgboost']['file']).write_bytes(b'not a model')
+        loader = ModelLoader(model_base_path=str(base))
+        status = loader.load_report()['xgboost']
+        assert status['state'] == 'loaded' and status['format'] == 'pickle' and status['native_error'], status
+        assert np.allclose(loader.gunshot_models['xgboost'].predict_proba(X), expected.predict_proba(X))
+
+        # An artifact from a newer library release is never tried
+        manifest['models']['xgboost']['library_version'] = '99.0.0'
+        (native_dir / MANIFEST_FILE).write_text(json.dumps(manifest))
+        assert 'xgboost' not in read_manifest(native_dir)['models']
+        status = ModelLoader(model_base_path=str(base)).load_report()['xgboost']
+        assert status['format'] == 'pickle' and 'native_error' not in status, status
+        print("✅ Unreadable or too-new native artifacts fall back to their pickles")
+
+
+if __name__ == "__main__":
+    test_export_and_reload()
+    test_loader_prefers_native_artifacts()
+    test_unreadable_artifacts_fall_back_to_pickles()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test the ONNX export and onnxruntime backend: exported graphs match their
+pickles, and a classifier using the backend predicts what it does without
+"""
+
+import tempfile
+import time
+import numpy as np
+import pytest
+from pathlib import Path
+from lightgbm import LGBMClassifier
+from sklearn.ensemble import RandomForestClassifier
+from feature_extraction import FEATURE_NAMES
+from model_manager import ModelLoader, AudioClassifier
+from onnx_models import OnnxBackend, check_parity, convert_group, load_model, PARITY_TOLERANCE
+from round_budget import RoundBudget, predict_proba_rounds
+
+
+def feature_rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal((n, len(FEATURE_NAMES))) * 50).astype(np.float32)
+
+
+def test_exported_graphs_match_models():
+    # The converters are export-time dependencies (requirements-export.txt)
+    pytest.importorskip("onnxmltools")
+    pytest.importorskip("skl2onnx")
+    X = feature_rows(512)
+    y = (X[:, 0] > 0).astype(int) + 2 * (X[:, 1] > 10).astype(int)
+    models = {
+        'lightgbm_esc50': LGBMClassifier(n_estimators=40, num_leaves=15, verbose=-1).fit(X, y),
+        'rf_esc50': RandomForestClassifier(n_estimators=20, max_depth=8, random_state=0).fit(X, y),
+    }
+    held_out = feature_rows(1024, seed=1)
+    with tempfile.TemporaryDirectory() as directory:
+        manifest = convert_group(models, Path(directory), held_out, labels=lambda name: {0: 'a', 1: 'b'})
+        assert set(manifest['models']) == set(models), manifest['models'].keys()
+        for model_name, entry in manifest['models'].items():
+            assert entry['labels'][:2] == ['a', 'b'] and entry['includes_scaler'] is False
+            onnx_model = load_model(Path(directory), entry)
+            error = check_parity(onnx_model, models[model_name], feature_rows(256, seed=2))
+            assert error <= PARITY_TOLERANCE, (model_name, error)
+            print(f"✅ {model_name} exported to ONNX, max |Δp| {error:.1e}")
+
+
+def test_backend_matches_library():
+    loader = ModelLoader(model_base_path="../ml_models")
+    backend = OnnxBackend("../ml_models")
+    assert 'xgboost' in backend
+    library = AudioClassifier(loader)
+    onnx = AudioClassifier(loader, onnx=backend)
+
+    rows = feature_rows(64, seed=3)
+    for row in rows:
+        expected = library.predict_gunshot(row)['xgboost']
+        result = onnx.predict_gunshot(row)['xgboost']
+        assert result['prediction'] == expected['prediction']
+        assert np.isclose(result['confidence'], expected['confidence'], atol=1e-5)
+    batch = onnx.classify_batch(rows)['xgboost']
+    assert np.allclose(batch['probabilities'], library.classify_batch(rows)['xgboost']['probabilities'], atol=1e-5)
+
+    row = rows[:1]
+    timings = {}
+    for name, classifier in (('library', library), ('onnx', onnx)):
+        model_input = classifier._model_input('gunshot', 'xgboost', {'gunshot': classifier._scale_gunshot(row),
+                                                                     'raw': row})
+        start = time.perf_counter()
+        for _ in range(200):
+            classifier._predict_proba('xgboost', loader.gunshot_models['xgboost'], model_input)
+        timings[name] = (time.perf_counter() - start) / 200 * 1000
+    print(f"✅ onnxruntime matches the library: one row in {timings['onnx']:.3f} ms "
+          f"against {timings['library']:.3f} ms")
+
+
+def test_latency_budget_bypasses_onnx():
+    loader = ModelLoader(model_base_path="../ml_models")
+    model = loader.gunshot_models['xgboost']
+    budget = RoundBudget({'xgboost': [model.get_booster().num_boosted_rounds(), 10]}, budget=1.0)
+    classifier = AudioClassifier(loader, onnx=OnnxBackend("../ml_models"), budget=budget)
+    rows = feature_rows(32, seed=4)
+    model_input = classifier._model_input('gunshot', 'xgboost', {'gunshot': classifier._scale_gunshot(rows),
+                                                                 'raw': rows})
+    full = classifier._predict_proba('xgboost', model, model_input)[1]
+    assert np.allclose(full, classifier.onnx.predict_proba('xgboost', rows)[1])
+
+    # While the budget cuts the model, it runs truncated on its scaled rows instead of the graph
+    budget.level = 1
+    truncated = classifier._predict_proba('xgboost', model, model_input)[1]
+    expected = predict_proba_rounds(model, classifier._scale_gunshot(rows), 10)
+    assert np.allclose(truncated, expected, atol=1e-5) and not np.allclose(truncated, full, atol=1e-5)
+    print("✅ Models the latency budget cuts run truncated instead of on onnxruntime")
+
+
+if __name__ == "__main__":
+    test_exported_graphs_match_models()
+    test_backend_matches_library()
+    test_latency_budget_bypasses_onnx()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test the compact top-k probability output and its float16 probability vector
+"""
+
+import base64
+import json
+import numpy as np
+from xgboost import XGBClassifier
+from feature_extraction import FEATURE_NAMES
+from model_manager import ModelLoader, AudioClassifier
+
+
+def wildlife_loader(n_classes=20):
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((600, len(FEATURE_NAMES))).astype(np.float32)
+    y = np.arange(600) % n_classes
+    X[:, 0] += y  # separable enough for the model to prefer a few classes
+    loader = ModelLoader(model_base_path="../ml_models", load=False)
+    loader.wildlife_models['xgboost_inat'] = XGBClassifier(n_estimators=10, max_depth=3).fit(X, y)
+    return loader, X
+
+
+def test_top_k_and_vector():
+    loader, X = wildlife_loader()
+    full = AudioClassifier(loader)
+    compact = AudioClassifier(loader, top_k=5, probability_vector=True)
+    labels = compact.model_labels()['xgboost_inat']
+    assert labels[:2] == ['Species_0', 'Species_1']
+
+    for row in X[:5]:
+        expected = full.predict_wildlife(row)['xgboost_inat']
+        result = compact.predict_wildlife(row)['xgboost_inat']
+        assert result['prediction'] == expected['prediction']
+
+        top = list(result['probabilities'].items())
+        assert len(top) == 5 and top[0][0] == expected['prediction']
+        assert [p for _, p in top] == sorted((p for _, p in top), reverse=True)
+        ranked = sorted(expected['probabilities'].items(), key=lambda item: -item[1])[:5]
+        assert [label for label, _ in ranked] == [label for label, _ in top]
+
+        vector = np.frombuffer(base64.b64decode(result['probability_vector']), dtype='<f2')
+        assert np.allclose(vector, [expected['probabilities'][label] for label in labels], atol=1e-3)
+
+    full_size = len(json.dumps(full.predict_wildlife(X[0])))
+    compact_size = len(json.dumps(AudioClassifier(loader, top_k=5).predict_wildlife(X[0])))
+    print(f"✅ Top-5 output matches the full distribution ({compact_size} vs {full_size} bytes of JSON)")
+
+
+def test_batched_rows_use_compact_output():
+    loader, X = wildlife_loader()
+    compact = AudioClassifier(loader, top_k=3)
+    batch = compact.classify_batch(X[:10], groups=('wildlife',))
+    for row in range(10):
+        _, wildlife = compact.row_predictions(batch, row, groups=('wildlife',))
+        batched, single = wildlife['xgboost_inat'], compact.predict_wildlife(X[row])['xgboost_inat']
+        assert batched['prediction'] == single['prediction']
+        assert list(batched['probabilities']) == list(single['probabilities'])
+        assert len(batched['probabilities']) == 3
+    print("✅ row_predictions emits the same compact output as predict_wildlife")
+
+
+if __name__ == "__main__":
+    test_top_k_and_vector()
+    test_batched_rows_use_compact_output()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Test "process" worker mode: every worker loads its pipeline at startup, and
+an upload runs end to end in a worker process without a model load
+"""
+
+import io
+import os
+import time
+import pytest
+import soundfile as sf
+from test_feature_parity import make_test_audio, SR
+
+# The server module needs the web and audio-capture dependencies
+main = pytest.importorskip("main")
+
+
+def wav_bytes(duration=5):
+    buffer = io.BytesIO()
+    sf.write(buffer, make_test_audio(duration), SR, format='WAV')
+    return buffer.getvalue()
+
+
+def test_upload_runs_in_warm_worker():
+    main.config.WORKER_MODE = "process"
+    main.config.MAX_WORKERS = 2
+    pool = main.create_executor()
+    try:
+        pids = main.warm_process_workers(pool, main.config.MAX_WORKERS)
+        assert len(set(pids)) == main.config.MAX_WORKERS and os.getpid() not in pids, pids
+
+        start = time.perf_counter()
+        result = pool.submit(main.process_single_audio, wav_bytes(), 'tone.wav').result(timeout=120)
+        elapsed = time.perf_counter() - start
+    finally:
+        pool.shutdown()
+    assert result['success'] and not result.get('quiet'), result
+    assert result['classification']['gunshot_predictions'], result
+    # The workers were warmed: the upload pays for extraction and inference only
+    assert elapsed < 5, elapsed
+    print(f"✅ {len(pids)} workers warmed up; an upload ran in a worker in {elapsed * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    test_upload_runs_in_warm_worker()
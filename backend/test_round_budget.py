@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test latency-budget inference: truncated boosting rounds match the
+libraries' own iteration ranges, calibration picks the levels, and the
+budget steps them down under load and back up once it passes
+"""
+
+import tempfile
+import numpy as np
+from feature_extraction import FEATURE_NAMES
+from model_manager import ModelLoader, AudioClassifier
+from round_budget import (
+    RoundBudget, calibrate_model, choose_levels, model_rounds, predict_proba_rounds,
+    read_calibration, write_calibration
+)
+
+
+def feature_rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal((n, len(FEATURE_NAMES))) * 50).astype(np.float32)
+
+
+def test_truncated_rounds_match_library():
+    loader = ModelLoader(model_base_path="../ml_models", compile_trees=True)
+    model = loader.gunshot_models['xgboost']
+    compiled = loader.compiled_models['xgboost']
+    assert model_rounds(model) == model_rounds(model, compiled) == compiled.n_rounds
+    X = AudioClassifier(loader)._scale_gunshot(feature_rows(64))
+    for rounds in (1, 20, compiled.n_rounds // 2, compiled.n_rounds):
+        expected = predict_proba_rounds(model, X, rounds)
+        assert np.allclose(compiled.predict_proba(X, n_rounds=rounds), expected, atol=1e-5), rounds
+    assert np.allclose(predict_proba_rounds(model, X, compiled.n_rounds), model.predict_proba(X))
+    print(f"✅ Compiled trees cut to K rounds match XGBoost's iteration_range (of {compiled.n_rounds})")
+
+
+def test_calibration_levels():
+    loader = ModelLoader(model_base_path="../ml_models", compile_trees=True)
+    X = AudioClassifier(loader)._scale_gunshot(feature_rows(256, seed=1))
+    points = calibrate_model(loader.gunshot_models['xgboost'], X, loader.compiled_models['xgboost'], repeats=5)
+    full = points[-1]
+    assert full['rounds'] == model_rounds(loader.gunshot_models['xgboost'])
+    assert full['agreement'] == 1.0 and full['mean_abs_error'] == 0.0
+    assert [point['rounds'] for point in points] == sorted(point['rounds'] for point in points)
+
+    levels = choose_levels(points, min_agreement=0.0)
+    assert levels[0] == full['rounds'] and levels == sorted(levels, reverse=True)
+    assert choose_levels(points, min_agreement=1.01) == []
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_calibration(directory, {'xgboost': points}, len(X))
+        assert read_calibration(directory) == {'xgboost': points}
+    for point in points:
+        print(f"   {point['rounds']:4d} rounds: agreement {point['agreement']:.3f}, "
+              f"{point['latency_ms']:.3f} ms/row")
+    print("✅ Calibration covers the full model and picks faster levels below it")
+
+
+def test_budget_steps_down_and_up():
+    loader = ModelLoader(model_base_path="../ml_models", compile_trees=True)
+    budget = RoundBudget({'xgboost': [200, 100, 40], 'rf_esc50': [1]}, budget=0.01, cooldown=3)
+    classifier = AudioClassifier(loader, budget=budget)
+    assert 'rf_esc50' not in budget.levels and budget.max_level == 2
+
+    for _ in range(10):
+        budget.observe(0.05)  # overloaded
+    assert budget.level == 2 and budget.rounds('xgboost') == 40, budget.stats()
+
+    row = feature_rows(1, seed=2)[0]
+    result = classifier.predict_gunshot(row)['xgboost']
+    model_input = classifier._scale_gunshot(row[None, :])
+    expected = predict_proba_rounds(loader.gunshot_models['xgboost'], model_input, 40)[0]
+    assert np.isclose(result['confidence'], expected.max(), atol=1e-5)
+
+    for _ in range(40):
+        budget.observe(0.001)  # idle
+    assert budget.level == 0 and budget.rounds('xgboost') is None
+    stats = budget.stats()
+    assert stats['steps_down'] == 2 and stats['steps_up'] == 2, stats
+
+    classifier.classify_audio(row)
+    assert budget.stats()['observations'] == 51
+    print("✅ Over budget the models drop to fewer rounds, and recover once load passes")
+
+
+if __name__ == "__main__":
+    test_truncated_rounds_match_library()
+    test_calibration_levels()
+    test_budget_steps_down_and_up()
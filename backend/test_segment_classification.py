@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Test sliding-window segment classification against classifying each window on its own
+"""
+
+import numpy as np
+from feature_extraction import AudioPreprocessor
+from model_manager import ModelLoader, AudioClassifier
+from test_feature_parity import make_test_audio, assert_close, SR
+
+
+def test_windows_match_single_extraction():
+    processor = AudioPreprocessor()
+    names = processor.get_feature_names()
+    y = make_test_audio(7.5)
+
+    starts, ends, features = processor.extract_features_windows(y[None, :], SR, window_seconds=2, hop_seconds=1.5)
+    # 0, 1.5, 3, 4.5 plus a final window aligned to the end of the clip
+    assert np.allclose(starts, [0, 1.5, 3, 4.5, 5.5]) and np.allclose(ends, starts + 2)
+    assert features.shape == (5, 60)
+
+    for i, (start, end) in enumerate(zip(starts, ends)):
+        single = processor.extract_features_enhanced(y[None, int(start * SR):int(end * SR)], SR)
+        assert_close(single, dict(zip(names, features[i])), names, label=f"window {i}: ")
+
+
+def test_timeline_matches_per_window_classification():
+    processor = AudioPreprocessor()
+    classifier = AudioClassifier(ModelLoader(model_base_path="../ml_models"))
+    y = np.concatenate([make_test_audio(4, seed=i) * gain for i, gain in enumerate([0.05, 1.0, 0.2])])
+
+    starts, ends, features = processor.extract_features_windows(y[None, :], SR)
+    result = classifier.classify_segments(features, starts, ends)
+    assert result['success'] and result['total_windows'] == len(features)
+
+    # Expand the timeline back to one prediction per window
+    expanded = [entry['prediction'] for entry in result['timeline'] for _ in range(entry['windows'])]
+    assert len(expanded) == len(features)
+    for i, window_features in enumerate(features):
+        best = classifier.classify_audio(window_features)['best_result']
+        assert expanded[i] == best['best_prediction'], f"window {i}"
+
+    # Consecutive timeline entries always differ, and cover the file end to end
+    timeline = result['timeline']
+    assert all(a['prediction'] != b['prediction'] for a, b in zip(timeline, timeline[1:]))
+    assert timeline[0]['start'] == 0 and timeline[-1]['end'] == len(y) / SR
+    print(f"✅ {len(features)} windows collapse into {len(timeline)} timeline entries")
+
+
+if __name__ == "__main__":
+    test_windows_match_single_extraction()
+    test_timeline_matches_per_window_classification()
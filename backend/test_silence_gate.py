@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test the silence gate that short-circuits near-silent audio
+"""
+
+import io
+import numpy as np
+import soundfile as sf
+from feature_extraction import AudioPreprocessor, SilenceGate, StreamingFeatureExtractor
+from model_manager import ModelLoader, AudioClassifier
+from test_feature_parity import make_test_audio, SR
+
+
+def test_gate_decisions():
+    gate = SilenceGate()
+    rng = np.random.default_rng(0)
+    n = 2 * SR
+    clips = {
+        'field recording': (make_test_audio(2), False),
+        'loud noise': (0.1 * rng.standard_normal(n), False),
+        'faint hiss': (1e-3 * rng.standard_normal(n), True),
+        'faint tone': (3e-3 * np.sin(np.arange(n) * 0.1), True),
+        'digital silence': (np.zeros(n), True),
+    }
+    for name, (y, expected) in clips.items():
+        result = gate.check(y.astype(np.float32), SR)
+        assert result['quiet'] == expected, f"{name}: {result}"
+
+    # The vectorized measurement agrees with clip-by-clip checks
+    batch = np.stack([y for y, _ in clips.values()]).astype(np.float32)
+    assert gate.measure(batch)['quiet'].tolist() == [expected for _, expected in clips.values()]
+
+    stats = gate.stats()
+    assert stats['checked'] == 5 and stats['quiet'] == 3
+    assert np.isclose(stats['skipped_audio_seconds'], 6.0)
+    print(f"✅ Silence gate decisions: {stats}")
+
+
+def test_quiet_windows_skip_the_pipeline():
+    processor = AudioPreprocessor()
+    classifier = AudioClassifier(ModelLoader(model_base_path="../ml_models"))
+    gate = SilenceGate()
+    # 4s of near-silence, 4s of activity, 4s of near-silence
+    y = np.concatenate([np.zeros(4 * SR), make_test_audio(4), np.zeros(4 * SR)]).astype(np.float32)
+
+    starts, ends, features = processor.extract_features_windows(y[None, :], SR, gate=gate)
+    quiet = np.isnan(features).all(axis=1)
+    assert quiet[:3].all() and not quiet[3:8].any() and quiet[-3:].all()
+
+    result = classifier.classify_segments(features, starts, ends)
+    assert result['success'] and result['quiet_windows'] == quiet.sum()
+    timeline = result['timeline']
+    assert timeline[0]['model'] == timeline[-1]['model'] == 'silence_gate'
+    assert timeline[0]['confidence'] == 0.0 and timeline[-1]['end'] == 12.0
+    assert result['best_result']['best_model'] != 'silence_gate'
+    print(f"✅ {quiet.sum()} of {len(features)} windows skipped extraction and inference")
+
+
+def test_streamed_recordings_are_gated():
+    rng = np.random.default_rng(1)
+    recordings = {
+        'faint hiss': ((1e-3 * rng.standard_normal(6 * SR)).astype(np.float32), True),
+        'field recording': (make_test_audio(6), False),
+    }
+    for name, (y, expected) in recordings.items():
+        # Measured block by block, the gate decides as it does on the whole clip
+        whole = SilenceGate().check(y, SR)
+        buffer = io.BytesIO()
+        sf.write(buffer, y, SR, format='WAV', subtype='FLOAT')
+        extractor = StreamingFeatureExtractor(block_seconds=1, gate=SilenceGate())
+        features = extractor.extract(buffer.getvalue())
+        result = extractor.gate_result
+        assert result['quiet'] == whole['quiet'] == expected, (name, result, whole)
+        assert np.isclose(result['rms_db'], whole['rms_db'], atol=1e-3)
+        assert np.isclose(result['peak_db'], whole['peak_db'])
+        assert (features is None) == expected
+    print("✅ Streamed recordings are gated before the accumulation pass")
+
+
+if __name__ == "__main__":
+    test_gate_decisions()
+    test_quiet_windows_skip_the_pipeline()
+    test_streamed_recordings_are_gated()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Test the closed-form delta and onset summaries against librosa's full matrices
+"""
+
+import io
+import numpy as np
+import librosa
+import soundfile as sf
+from feature_extraction import delta_means, onset_strength_stats, AudioPreprocessor
+from test_feature_parity import make_test_audio, SR
+
+
+def test_delta_means_match_librosa():
+    rng = np.random.default_rng(0)
+    lengths = [9, 12, 17, 18, 19, 40, 500]
+    data = np.zeros((len(lengths), 13, max(lengths)))
+    for i, n in enumerate(lengths):
+        # Random walk, so the deltas are far from zero
+        data[i, :, :n] = rng.standard_normal((13, n)).cumsum(axis=-1)
+
+    for order in (1, 2):
+        means = delta_means(data, lengths, order)
+        for i, n in enumerate(lengths):
+            expected = librosa.feature.delta(data[i, :, :n], width=9, order=order, axis=-1).mean(axis=-1)
+            assert np.allclose(means[i], expected, rtol=1e-9, atol=1e-12), (order, n)
+    print("✅ Delta means from edge frames match librosa.feature.delta")
+
+
+def test_onset_stats_match_librosa():
+    rng = np.random.default_rng(1)
+    lengths = [1, 3, 4, 50, 2049]
+    mel_db = np.full((len(lengths), 128, max(lengths)), -80.0)
+    for i, n in enumerate(lengths):
+        mel_db[i, :, :n] = rng.uniform(-80, 0, (128, n))
+
+    for block_frames in (7, 1024):
+        mean, peak = onset_strength_stats(mel_db, lengths, block_frames=block_frames)
+        for i, n in enumerate(lengths):
+            onset = librosa.onset.onset_strength(S=mel_db[i, :, :n], sr=SR)
+            assert np.isclose(mean[i], onset.mean()) and np.isclose(peak[i], onset.max()), (n, block_frames)
+    print("✅ Blocked onset mean/max match librosa.onset.onset_strength")
+
+
+def test_streaming_delta_means():
+    processor = AudioPreprocessor(backend='numpy')
+    for seconds in (0.1, 0.5, 4):
+        y = make_test_audio(seconds)
+        buffer = io.BytesIO()
+        sf.write(buffer, y, SR, format='WAV', subtype='FLOAT')
+        expected = processor.extract_features_enhanced(y[None, :], SR)
+        streamed = processor.extract_features_streaming(buffer.getvalue(), block_seconds=1)
+        names = [name for name in expected.keys() if name.startswith('delta')]
+        assert np.allclose([streamed[n] for n in names], [expected[n] for n in names], rtol=1e-3, atol=1e-4), seconds
+    print("✅ Streaming delta means match in-memory extraction, including very short clips")
+
+
+if __name__ == "__main__":
+    test_delta_means_match_librosa()
+    test_onset_stats_match_librosa()
+    test_streaming_delta_means()
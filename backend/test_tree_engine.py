@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test the compiled tree-ensemble engine against each library's predict_proba
+"""
+
+import time
+import numpy as np
+import lightgbm as lgb
+from sklearn.ensemble import RandomForestClassifier
+from xgboost import XGBClassifier
+from feature_extraction import FEATURE_NAMES
+from model_manager import ModelLoader, AudioClassifier
+from tree_engine import compile_model, verify_compiled
+
+N_FEATURES = len(FEATURE_NAMES)
+
+
+def training_data(n_classes, seed=0, missing=False):
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((400, N_FEATURES)).astype(np.float32)
+    y = (X[:, 0] + X[:, 1] * X[:, 2] > 0).astype(int) + (n_classes > 2) * (X[:, 3] > 0.5)
+    if missing:
+        X[rng.random(X.shape) < 0.1] = np.nan
+    return X, y
+
+
+def check(model, label):
+    compiled = compile_model(model)
+    error = verify_compiled(model, compiled, N_FEATURES)
+    X, _ = training_data(3, seed=1)
+    assert np.array_equal(compiled.predict(X), model.predict(X)), label
+    print(f"✅ {label}: {compiled.n_trees} trees, max |Δp| {error:.1e}")
+
+
+def test_compiled_ensembles_match():
+    X, y = training_data(3)
+    Xm, ym = training_data(2, missing=True)
+    check(XGBClassifier(n_estimators=20, max_depth=4).fit(X, y), "XGBoost multiclass")
+    check(XGBClassifier(n_estimators=20, max_depth=4).fit(Xm, ym), "XGBoost binary with missing values")
+    check(lgb.LGBMClassifier(n_estimators=20, verbose=-1).fit(X, y), "LightGBM multiclass")
+    check(lgb.LGBMClassifier(n_estimators=20, verbose=-1).fit(Xm, ym), "LightGBM binary with missing values")
+    check(lgb.LGBMClassifier(n_estimators=20, verbose=-1, zero_as_missing=True).fit(X, y), "LightGBM zero as missing")
+    check(RandomForestClassifier(n_estimators=10, max_depth=6, random_state=0).fit(X, y), "Random forest")
+
+
+def test_shipped_model_and_classifier():
+    loader = ModelLoader(model_base_path="../ml_models", compile_trees=True)
+    assert 'xgboost' in loader.compiled_models
+
+    compiled_classifier = AudioClassifier(loader)
+    library_classifier = AudioClassifier(loader, compiled_max_rows=0)
+    rng = np.random.default_rng(2)
+    X = (rng.standard_normal((16, N_FEATURES)) * 50).astype(np.float32)
+
+    for row in X[:4]:
+        compiled = compiled_classifier.predict_gunshot(row)['xgboost']
+        library = library_classifier.predict_gunshot(row)['xgboost']
+        assert compiled['prediction'] == library['prediction']
+        assert np.allclose(list(compiled['probabilities'].values()), list(library['probabilities'].values()),
+                           atol=1e-5)
+
+    compiled_matrix = compiled_classifier.predict_matrix(X)['xgboost']['probabilities']
+    library_matrix = library_classifier.predict_matrix(X)['xgboost']['probabilities']
+    assert np.allclose(compiled_matrix, library_matrix, atol=1e-5)
+
+    model, engine = loader.gunshot_models['xgboost'], loader.compiled_models['xgboost']
+    start = time.perf_counter()
+    for row in X:
+        engine.predict_proba(row[None])
+    compiled_time = (time.perf_counter() - start) / len(X)
+    start = time.perf_counter()
+    for row in X:
+        model.predict_proba(row[None])
+    library_time = (time.perf_counter() - start) / len(X)
+    print(f"✅ Shipped gunshot model: {compiled_time * 1e6:.0f} µs per row compiled, "
+          f"{library_time * 1e6:.0f} µs with predict_proba")
+
+
+if __name__ == "__main__":
+    test_compiled_ensembles_match()
+    test_shipped_model_and_classifier()
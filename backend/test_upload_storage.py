@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Test that /upload/single stores every model's prediction and that they can
+be read back from the detections endpoint
+"""
+
+import io
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import pytest
+import soundfile as sf
+from test_feature_parity import make_test_audio, SR
+
+# The server module needs the web and audio-capture dependencies
+main = pytest.importorskip("main")
+from fastapi.testclient import TestClient
+from database_manager import AudioDetectionDB
+
+
+def test_upload_results_are_stored():
+    buffer = io.BytesIO()
+    sf.write(buffer, make_test_audio(5), SR, format='WAV')
+
+    main.load_pipeline()
+    main.pipeline_status['state'] = 'ready'
+    main.executor = ThreadPoolExecutor(max_workers=1)
+    with tempfile.TemporaryDirectory() as directory:
+        main.database = AudioDetectionDB(str(Path(directory) / "detections.db"))
+        try:
+            # Without the context manager the client skips the startup hook (recorder, pool, loader)
+            client = TestClient(main.app)
+            response = client.post("/upload/single", files={'file': ('tone.wav', buffer.getvalue(), 'audio/wav')})
+            assert response.status_code == 200, response.text
+            classification = response.json()['classification']
+
+            stored = client.get("/detections/recent", params={'limit': 50}).json()['detections']
+        finally:
+            main.executor.shutdown()
+            main.executor = main.database = None
+
+    expected = {
+        (detection_type, model_name, result['prediction'])
+        for detection_type, key in (('gunshot', 'gunshot_predictions'), ('wildlife', 'wildlife_predictions'))
+        for model_name, result in classification[key].items()
+        if result['prediction'] != 'Error'
+    }
+    assert expected, classification
+    assert {(d['detection_type'], d['model_name'], d['prediction']) for d in stored} == expected, stored
+    assert all(d['audio_filename'] == 'tone.wav' and not d['is_live_recording'] for d in stored)
+    for d in stored:
+        key = 'gunshot_predictions' if d['detection_type'] == 'gunshot' else 'wildlife_predictions'
+        assert d['probabilities'] == pytest.approx(classification[key][d['model_name']]['probabilities'])
+    print(f"✅ {len(stored)} predictions from an upload were stored and read back")
+
+
+if __name__ == "__main__":
+    test_upload_results_are_stored()
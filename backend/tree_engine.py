@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Compiled tree-ensemble inference: XGBoost, LightGBM and scikit-learn forests
+flattened into NumPy node arrays and evaluated for a whole batch of rows at once
+"""
+
+import json
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# How a split routes NaN inputs
+MISSING_DEFAULT = 0  # NaN takes the node's default direction
+MISSING_AS_ZERO = 1  # NaN is compared as 0.0 (LightGBM missing_type "None")
+MISSING_ZERO = 2  # NaN and 0.0 take the default direction (LightGBM missing_type "Zero")
+# LightGBM drops |x| <= kZeroThreshold (the float 1e-35f) from a row, i.e. reads it as 0.0
+LIGHTGBM_ZERO_THRESHOLD = float(np.float32(1e-35))
+
+
+class CompiledTreeEnsemble:
+    """
+    A tree ensemble as flat node arrays (feature, threshold, children, leaf values).
+
+    Nodes are renumbered breadth-first per tree so that every right child sits
+    right after its sibling: one step is node = left[node] + goes_right. Leaves
+    point to themselves with a NaN threshold (never goes right), so stepping
+    max_depth levels from the roots leaves each (row, tree) pair on its leaf
+    without per-node branching. Boosted trees add their leaf value to one
+    output column each and go through the model's link (softmax or sigmoid);
+    forests average per-leaf class distributions.
+    """
+    def __init__(self, feature, threshold, left, right, value, roots, classes, link,
+                 output_column=None, default_left=None, missing=None, strict=False,
+                 input_dtype=np.float32, zero_threshold=None):
+        feature, left, right = np.asarray(feature), np.asarray(left), np.asarray(right)
+        n_nodes = len(feature)
+        default_left = np.zeros(n_nodes, dtype=bool) if default_left is None else np.asarray(default_left, dtype=bool)
+        missing = np.full(n_nodes, MISSING_DEFAULT, dtype=np.int8) if missing is None else np.asarray(missing)
+        order, depth = self._breadth_first(left, right, roots)
+        new_index = np.empty(n_nodes, dtype=np.intp)
+        new_index[order] = np.arange(n_nodes)
+
+        is_leaf = left[order] < 0
+        self.left = np.where(is_leaf, np.arange(n_nodes), new_index[np.maximum(left[order], 0)]).astype(np.intp)
+        self.feature = np.where(is_leaf, 0, feature[order]).astype(np.intp)
+        self.threshold = self._round_thresholds(np.where(is_leaf, np.nan, np.asarray(threshold)[order]),
+                                                input_dtype, strict)
+        self.default_left = default_left[order] | is_leaf
+        self.missing = np.where(is_leaf, MISSING_DEFAULT, missing[order]).astype(np.int8)
+        self.value = np.asarray(value)[order]
+        self.roots = new_index[np.asarray(roots, dtype=np.intp)]
+        self.max_depth = int(depth.max(initial=0))
+        self.classes = np.asarray(classes)
+        self.link = link
+        self.strict = strict  # XGBoost goes left on x < threshold, the others on x <= threshold
+        self.input_dtype = input_dtype
+        # LightGBM reads inputs this close to zero as exactly 0.0
+        self.zero_threshold = zero_threshold
+        self.has_zero_missing = bool((self.missing == MISSING_ZERO).any())
+        self.bias = 0.0
+
+        if output_column is not None:
+            # (n_trees, n_outputs) indicator summing each tree into its output column
+            n_outputs = int(np.max(output_column)) + 1
+            self.output_matrix = np.zeros((len(self.roots), n_outputs), dtype=self.value.dtype)
+            self.output_matrix[np.arange(len(self.roots)), output_column] = 1.0
+        else:
+            self.output_matrix = None
+
+    # Everything predict_proba needs, as saved by to_arrays
+    _ARRAYS = ('feature', 'threshold', 'left', 'default_left', 'missing', 'value', 'roots', 'classes', 'bias')
+
+    def to_arrays(self):
+        """
+        The renumbered node arrays and settings as a {name: ndarray} dict that
+        np.savez can store and from_arrays restores without recompiling
+        """
+        arrays = {name: np.asarray(getattr(self, name)) for name in self._ARRAYS}
+        if self.output_matrix is not None:
+            arrays['output_column'] = self.output_matrix.argmax(axis=1)
+        arrays['settings'] = np.array(json.dumps({
+            'link': self.link,
+            'strict': self.strict,
+            'input_dtype': np.dtype(self.input_dtype).name,
+            'zero_threshold': self.zero_threshold,
+            'max_depth': self.max_depth
+        }))
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Inverse of to_arrays; accepts the mapping np.load returns for an .npz"""
+        compiled = cls.__new__(cls)
+        for name in cls._ARRAYS:
+            setattr(compiled, name, np.asarray(arrays[name]))
+        settings = json.loads(str(arrays['settings']))
+        compiled.link = settings['link']
+        compiled.strict = settings['strict']
+        compiled.input_dtype = np.dtype(settings['input_dtype']).type
+        compiled.zero_threshold = settings['zero_threshold']
+        compiled.max_depth = settings['max_depth']
+        compiled.has_zero_missing = bool((compiled.missing == MISSING_ZERO).any())
+        compiled.output_matrix = None
+        if 'output_column' in arrays:
+            output_column = np.asarray(arrays['output_column'])
+            compiled.output_matrix = np.zeros((len(compiled.roots), int(output_column.max()) + 1),
+                                              dtype=compiled.value.dtype)
+            compiled.output_matrix[np.arange(len(compiled.roots)), output_column] = 1.0
+        return compiled
+
+    @staticmethod
+    def _breadth_first(left, right, roots):
+        """Node order with siblings adjacent, and each node's depth"""
+        order = []
+        depth = np.zeros(len(left), dtype=np.intp)
+        for root in roots:
+            order.append(root)
+            position = len(order) - 1
+            while position < len(order):
+                node = order[position]
+                if left[node] >= 0:
+                    order.extend((left[node], right[node]))
+                    depth[[left[node], right[node]]] = depth[node] + 1
+                position += 1
+        if len(order) != len(left):
+            raise ValueError("Tree nodes are not all reachable from the roots")
+        return np.asarray(order, dtype=np.intp), depth
+
+    @staticmethod
+    def _round_thresholds(threshold, dtype, strict):
+        """
+        Cast thresholds to the input dtype without changing any split: inputs of
+        that dtype are compared as if against the original (wider) threshold
+        """
+        threshold = np.asarray(threshold, dtype=np.float64)
+        rounded = threshold.astype(dtype)
+        if strict:
+            # x < t  <=>  x < smallest representable value >= t
+            low = rounded < threshold
+            rounded[low] = np.nextafter(rounded[low], np.inf)
+        else:
+            # x <= t  <=>  x <= largest representable value <= t
+            high = rounded > threshold
+            rounded[high] = np.nextafter(rounded[high], -np.inf)
+        return rounded
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_rounds(self):
+        """Boosting rounds (one tree per output column each), None for forests"""
+        return None if self.output_matrix is None else self.n_trees // self.output_matrix.shape[1]
+
+    def leaves(self, X, n_trees=None):
+        """(n_rows, n_trees) index of the leaf each row reaches in each of the first n_trees trees"""
+        roots = self.roots if n_trees is None else self.roots[:n_trees]
+        X = np.ascontiguousarray(X, dtype=self.input_dtype)
+        if self.zero_threshold is not None:
+            X = np.where(np.abs(X) <= self.zero_threshold, 0.0, X).astype(self.input_dtype)
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        row_offsets = (np.arange(n_rows) * n_features)[:, None]
+        node = np.repeat(roots[None, :], n_rows, axis=0)
+        check_missing = self.has_zero_missing or bool(np.isnan(flat).any())
+
+        for _ in range(self.max_depth):
+            x = np.take(flat, row_offsets + np.take(self.feature, node))
+            threshold = np.take(self.threshold, node)
+            # NaN thresholds (leaves) never go right
+            goes_right = x >= threshold if self.strict else x > threshold
+            if check_missing:
+                goes_right = self._route_missing(x, node, threshold, goes_right)
+            node = np.take(self.left, node) + goes_right
+        return node
+
+    def _route_missing(self, x, node, threshold, goes_right):
+        mode = np.take(self.missing, node)
+        nan = np.isnan(x)
+        as_zero = nan & (mode == MISSING_AS_ZERO)
+        if as_zero.any():
+            zero_goes_right = 0.0 >= threshold if self.strict else 0.0 > threshold
+            goes_right = np.where(as_zero, zero_goes_right, goes_right)
+        use_default = nan & (mode != MISSING_AS_ZERO)
+        if self.has_zero_missing:
+            use_default |= (mode == MISSING_ZERO) & (x == 0.0)
+        return np.where(use_default, ~np.take(self.default_left, node), goes_right)
+
+    def raw_output(self, X, n_rounds=None):
+        """
+        Summed leaf values per output column (boosting) or mean class
+        distribution (forests). n_rounds keeps only the first boosting rounds.
+        """
+        if self.output_matrix is None or n_rounds is None:
+            leaf_values = self.value[self.leaves(X)]
+            if self.output_matrix is None:
+                return leaf_values.mean(axis=1)
+            return leaf_values @ self.output_matrix + self.bias
+        # Trees are stored round by round, one per output column
+        n_trees = min(n_rounds, self.n_rounds) * self.output_matrix.shape[1]
+        return self.value[self.leaves(X, n_trees)] @ self.output_matrix[:n_trees] + self.bias
+
+    def predict_proba(self, X, n_rounds=None):
+        output = self.raw_output(X, n_rounds)
+        if self.link == 'softmax':
+            output = np.exp(output - output.max(axis=1, keepdims=True))
+            return output / output.sum(axis=1, keepdims=True)
+        if self.link == 'sigmoid':
+            positive = 1.0 / (1.0 + np.exp(-output[:, 0]))
+            return np.stack([1.0 - positive, positive], axis=1)
+        return output
+
+    def predict(self, X, n_rounds=None):
+        return self.classes[self.predict_proba(X, n_rounds).argmax(axis=1)]
+
+
+def compile_model(model):
+    """
+    Compile a fitted XGBClassifier, LGBMClassifier or scikit-learn tree/forest
+    classifier. Raises ValueError for anything else.
+    """
+    if getattr(model, 'compiled_ensemble', None) is not None:
+        # Loaded from a native array dump: already compiled
+        return model.compiled_ensemble
+    if hasattr(model, 'get_booster'):
+        return _compile_xgboost(model)
+    if hasattr(model, 'booster_'):
+        return _compile_lightgbm(model)
+    if hasattr(model, 'estimators_') or hasattr(model, 'tree_'):
+        return _compile_sklearn(model)
+    raise ValueError(f"{type(model).__name__} is not a supported tree ensemble")
+
+
+def verify_compiled(model, compiled, n_features, n_rows=256, rtol=1e-4, atol=1e-5, seed=0):
+    """
+    Check compiled.predict_proba against model.predict_proba on rows built from
+    the ensemble's own thresholds (so both sides of many splits are taken),
+    plus rows with missing values. Returns the largest absolute difference;
+    raises ValueError if it is out of tolerance.
+    """
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((n_rows, n_features)).astype(np.float32)
+    split = ~np.isnan(compiled.threshold)
+    for f in range(n_features):
+        thresholds = compiled.threshold[split & (compiled.feature == f)]
+        if len(thresholds):
+            picks = rng.choice(thresholds, n_rows).astype(np.float32)
+            X[:, f] = picks + rng.choice([-1.0, 0.0, 1.0], n_rows) * np.maximum(np.abs(picks), 1e-3) * 1e-3
+    X[:n_rows // 8, rng.choice(n_features, max(1, n_features // 10), replace=False)] = np.nan
+
+    expected = model.predict_proba(X)
+    actual = compiled.predict_proba(X)
+    error = float(np.abs(expected - actual).max())
+    if not np.allclose(actual, expected, rtol=rtol, atol=atol):
+        raise ValueError(f"compiled probabilities differ from predict_proba by up to {error:.2e}")
+    return error
+
+
+def _calibrate(compiled, raw_margin, n_features):
+    """
+    Fold the booster's base margin into the compiled bias, measured on an
+    all-zero row so it doesn't depend on how the library stores base_score
+    """
+    zero = np.zeros((1, n_features), dtype=np.float32)
+    compiled.bias = np.asarray(raw_margin(zero), dtype=np.float64).reshape(1, -1)[0] - compiled.raw_output(zero)[0]
+    return compiled
+
+
+def _compile_xgboost(model):
+    booster = model.get_booster()
+    learner = json.loads(booster.save_raw('json'))['learner']
+    objective = learner['objective']['name']
+    if objective in ('multi:softprob', 'multi:softmax'):
+        link = 'softmax'
+    elif objective == 'binary:logistic':
+        link = 'sigmoid'
+    else:
+        raise ValueError(f"Unsupported XGBoost objective: {objective}")
+    gbm = learner['gradient_booster']
+    if gbm['name'] != 'gbtree':
+        raise ValueError(f"Unsupported XGBoost booster: {gbm['name']}")
+
+    trees = gbm['model']['trees']
+    tree_info = gbm['model']['tree_info']
+    # predict_proba stops at best_iteration when the model was early-stopped
+    n_rounds = booster.num_boosted_rounds()
+    if _has_best_iteration(model) and model.best_iteration + 1 < n_rounds:
+        n_rounds = model.best_iteration + 1
+        end = gbm['model']['iteration_indptr'][n_rounds]
+        trees, tree_info = trees[:end], tree_info[:end]
+
+    feature, threshold, left, right, value, default_left, roots = [], [], [], [], [], [], []
+    offset = 0
+    for tree in trees:
+        if any(tree['split_type']):
+            raise ValueError("Categorical XGBoost splits are not supported")
+        children_left = np.asarray(tree['left_children'])
+        roots.append(offset)
+        feature.append(tree['split_indices'])
+        # Leaves store their value in split_conditions
+        threshold.append(np.asarray(tree['split_conditions'], dtype=np.float32))
+        value.append(np.asarray(tree['split_conditions'], dtype=np.float32))
+        left.append(np.where(children_left < 0, -1, children_left + offset))
+        right.append(np.where(children_left < 0, -1, np.asarray(tree['right_children']) + offset))
+        default_left.append(tree['default_left'])
+        offset += len(children_left)
+
+    compiled = CompiledTreeEnsemble(
+        np.concatenate(feature), np.concatenate(threshold), np.concatenate(left), np.concatenate(right),
+        np.concatenate(value).astype(np.float64), roots, model.classes_, link,
+        output_column=tree_info, default_left=np.concatenate(default_left), strict=True
+    )
+    return _calibrate(
+        compiled,
+        lambda X: booster.inplace_predict(X, predict_type='margin', iteration_range=(0, n_rounds)),
+        model.n_features_in_
+    )
+
+
+def _has_best_iteration(model):
+    try:
+        return model.best_iteration is not None
+    except AttributeError:
+        return False
+
+
+def _compile_lightgbm(model):
+    booster = model.booster_
+    dump = booster.dump_model()
+    if dump.get('average_output') or dump.get('linear_tree'):
+        raise ValueError("LightGBM random forest and linear-tree models are not supported")
+    objective = dump.get('objective', '')
+    if objective.startswith(('multiclass', 'softmax')):
+        link = 'softmax'
+    elif objective.startswith('binary'):
+        if 'sigmoid:1' not in objective:
+            raise ValueError(f"Unsupported LightGBM sigmoid scale: {objective}")
+        link = 'sigmoid'
+    else:
+        raise ValueError(f"Unsupported LightGBM objective: {objective}")
+
+    per_iteration = dump['num_tree_per_iteration']
+    tree_info = dump['tree_info']
+    best_iteration = getattr(model, 'best_iteration_', None)
+    if best_iteration:
+        tree_info = tree_info[:best_iteration * per_iteration]
+
+    nodes = {'feature': [], 'threshold': [], 'left': [], 'right': [], 'value': [],
+             'default_left': [], 'missing': []}
+
+    def add(node):
+        """Append node and its subtree in preorder; returns its index"""
+        index = len(nodes['feature'])
+        for key in nodes:
+            nodes[key].append(0)
+        if 'leaf_value' in node:
+            nodes['left'][index] = nodes['right'][index] = -1
+            nodes['value'][index] = node['leaf_value']
+            return index
+        if node['decision_type'] != '<=':
+            raise ValueError("Categorical LightGBM splits are not supported")
+        nodes['feature'][index] = node['split_feature']
+        nodes['threshold'][index] = node['threshold']
+        nodes['default_left'][index] = node['default_left']
+        nodes['missing'][index] = {'None': MISSING_AS_ZERO, 'Zero': MISSING_ZERO}.get(
+            node['missing_type'], MISSING_DEFAULT
+        )
+        nodes['left'][index] = add(node['left_child'])
+        nodes['right'][index] = add(node['right_child'])
+        return index
+
+    roots = [add(tree['tree_structure']) for tree in tree_info]
+    compiled = CompiledTreeEnsemble(
+        nodes['feature'], np.asarray(nodes['threshold'], dtype=np.float64), nodes['left'], nodes['right'],
+        np.asarray(nodes['value'], dtype=np.float64), roots, model.classes_, link,
+        output_column=np.arange(len(roots)) % per_iteration,
+        default_left=nodes['default_left'], missing=nodes['missing'], input_dtype=np.float64,
+        zero_threshold=LIGHTGBM_ZERO_THRESHOLD
+    )
+    return _calibrate(
+        compiled,
+        lambda X: booster.predict(X, raw_score=True, num_iteration=len(tree_info) // per_iteration),
+        model.n_features_in_
+    )
+
+
+def _compile_sklearn(model):
+    estimators = list(np.ravel(getattr(model, 'estimators_', [model])))
+    if not hasattr(model, 'classes_') or getattr(model, 'n_outputs_', 1) != 1:
+        raise ValueError("Only single-output scikit-learn classifiers are supported")
+    if any(not hasattr(estimator, 'tree_') for estimator in estimators):
+        raise ValueError(f"{type(model).__name__} is not a forest of decision trees")
+
+    feature, threshold, left, right, value, default_left, roots = [], [], [], [], [], [], []
+    offset = 0
+    for estimator in estimators:
+        tree = estimator.tree_
+        roots.append(offset)
+        feature.append(tree.feature)
+        threshold.append(tree.threshold)
+        left.append(np.where(tree.children_left < 0, -1, tree.children_left + offset))
+        right.append(np.where(tree.children_right < 0, -1, tree.children_right + offset))
+        # predict_proba normalises each leaf's class weights
+        leaf_value = tree.value[:, 0, :]
+        value.append(leaf_value / np.maximum(leaf_value.sum(axis=1, keepdims=True), 1e-300))
+        default_left.append(getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=bool)))
+        offset += tree.node_count
+
+    return CompiledTreeEnsemble(
+        np.concatenate(feature), np.concatenate(threshold), np.concatenate(left), np.concatenate(right),
+        np.concatenate(value), roots, model.classes_, link='average',
+        default_left=np.concatenate(default_left)
+    )